@@ -0,0 +1,189 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import torch
+import whisper
+
+from pipeline import Transcription
+
+_STOP = object()
+
+
+class _PendingRequest:
+    __slots__ = ("mel", "language", "future", "enqueued_at")
+
+    def __init__(self, mel, language):
+        self.mel = mel
+        self.language = language
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class _WordRequest:
+    __slots__ = ("audio", "language", "prompt", "future", "enqueued_at")
+
+    def __init__(self, audio, language, prompt):
+        self.audio = audio
+        self.language = language
+        self.prompt = prompt
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class WhisperBatchScheduler:
+    """Menggabungkan ucapan dari semua sesi menjadi satu batch inferensi Whisper
+
+    Log-mel spectrogram dihitung di thread pemanggil (paralel antar sesi),
+    lalu satu worker mengumpulkan request yang menunggu paling lama
+    `max_wait_ms` sejak request pertama atau sampai `max_batch_size`,
+    menumpuknya dan menjalankan encoder+decoder sekali untuk seluruh batch.
+    Request dengan bahasa berbeda didekode dalam sub-batch terpisah karena
+    DecodingOptions berlaku untuk satu batch; language None berarti deteksi
+    otomatis per ucapan (satu pass tambahan encoder+decoder), jadi pemanggil
+    sebaiknya memberi bahasa jika sudah diketahui.
+
+    Whisper memproses jendela 30 detik, sehingga ucapan yang lebih panjang
+    terpotong. Segmenter VAD sudah membatasi panjang ucapan di bawah itu.
+
+    Decoding Whisper memasang hook kv-cache di modul model, sehingga dua
+    decode pada model yang sama tidak boleh berjalan bersamaan. Decode per
+    kata untuk transkripsi streaming (submit_words) juga lewat antrian yang
+    sama: worker menjalankan batch ucapan yang terkumpul lebih dulu, lalu
+    decode per kata satu per satu, sehingga decode streaming tidak menahan
+    model di luar giliran worker. Decode per kata tidak bisa dibatch dan
+    dibatasi satu pass (temperature 0, tanpa fallback) agar biayanya
+    terbatas; panjangnya dibatasi jendela StreamingTranscriber. Pemakai lain
+    model ini di luar worker harus memegang `model_lock`.
+    """
+    def __init__(self, model, max_batch_size=8, max_wait_ms=30, fp16=None):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        # fp16 hanya jika model memang di GPU (model CPU/int8 selalu fp32)
+        self.fp16 = model.device.type == "cuda" if fp16 is None else fp16
+        self.n_mels = model.dims.n_mels
+        self.queue = queue.Queue()
+        self.thread = None
+        self.model_lock = threading.Lock()
+
+        # Statistik untuk memantau efektivitas batching
+        self.batches = 0
+        self.items = 0
+        self.stats_lock = threading.Lock()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="whisper-batcher")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        if self.thread is not None:
+            self.queue.put(_STOP)
+            self.thread.join(timeout)
+            self.thread = None
+
+    def submit(self, audio, language=None):
+        """Antrikan audio float32 16kHz, return Future berisi Transcription"""
+        audio = whisper.pad_or_trim(torch.from_numpy(audio))
+        mel = whisper.log_mel_spectrogram(audio, n_mels=self.n_mels)
+        request = _PendingRequest(mel, language)
+        self.queue.put(request)
+        return request.future
+
+    def transcribe(self, audio, language=None, timeout=None):
+        """Versi blocking dari submit()"""
+        return self.submit(audio, language).result(timeout)
+
+    def submit_words(self, audio, language=None, prompt=""):
+        """Antrikan decode dengan timestamp per kata, return Future berisi hasil model.transcribe()"""
+        request = _WordRequest(audio, language, prompt)
+        self.queue.put(request)
+        return request.future
+
+    def transcribe_words(self, audio, language=None, prompt="", timeout=None):
+        """Versi blocking dari submit_words()"""
+        return self.submit_words(audio, language, prompt).result(timeout)
+
+    def average_batch_size(self):
+        with self.stats_lock:
+            return self.items / self.batches if self.batches else 0.0
+
+    def _collect_batch(self, first):
+        """Kumpulkan request sampai batch penuh atau batas tunggu tercapai"""
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+        stop = False
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is _STOP:
+                stop = True
+                break
+            batch.append(request)
+        return batch, stop
+
+    def _run(self):
+        while True:
+            first = self.queue.get()
+            if first is _STOP:
+                break
+            batch, stop = self._collect_batch(first)
+            words = [request for request in batch if isinstance(request, _WordRequest)]
+            if len(words) < len(batch):
+                self._run_batch([request for request in batch if not isinstance(request, _WordRequest)])
+            for request in words:
+                self._run_words(request)
+            if stop:
+                break
+
+    def _run_batch(self, batch):
+        groups = {}
+        for request in batch:
+            groups.setdefault(request.language, []).append(request)
+
+        for language, requests in groups.items():
+            try:
+                mel = torch.stack([r.mel for r in requests]).to(self.model.device)
+                options = whisper.DecodingOptions(
+                    language=language, fp16=self.fp16, without_timestamps=True
+                )
+                with self.model_lock, torch.no_grad():
+                    results = whisper.decode(self.model, mel, options)
+                for request, result in zip(requests, results):
+                    probability = None
+                    if result.language_probs:
+                        probability = result.language_probs.get(result.language)
+                    request.future.set_result(Transcription(
+                        result.text, result.language, probability, result.avg_logprob
+                    ))
+            except Exception as e:
+                for request in requests:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+        with self.stats_lock:
+            self.batches += 1
+            self.items += len(batch)
+
+    def _run_words(self, request):
+        try:
+            with self.model_lock, torch.no_grad():
+                result = self.model.transcribe(
+                    request.audio,
+                    language=request.language,
+                    word_timestamps=True,
+                    condition_on_previous_text=False,
+                    initial_prompt=request.prompt or None,
+                    temperature=0.0,
+                    fp16=self.fp16,
+                )
+            request.future.set_result(result)
+        except Exception as e:
+            request.future.set_exception(e)
@@ -0,0 +1,119 @@
+import zlib
+
+import numpy as np
+
+# Format sampel payload audio (field sample_fmt di header frame)
+FMT_FLOAT32 = 1   # float32 little-endian, 4 byte/sampel
+FMT_INT16 = 2     # PCM int16 little-endian, 2 byte/sampel
+FMT_MULAW = 3     # mu-law 8-bit, 1 byte/sampel (lossy, ~38 dB SNR)
+FMT_ZLIB16 = 4    # PCM int16 di-delta lalu zlib; lossless terhadap int16
+
+CODEC_NAMES = {
+    FMT_FLOAT32: "float32",
+    FMT_INT16: "int16",
+    FMT_MULAW: "mulaw",
+    FMT_ZLIB16: "zlib16",
+}
+CODEC_IDS = {name: fmt for fmt, name in CODEC_NAMES.items()}
+
+# Urutan preferensi default client: lossless dulu, lalu yang paling hemat
+DEFAULT_PREFERENCE = ("zlib16", "int16", "mulaw", "float32")
+
+_MU = 255.0
+_INT16_SCALE = 32767.0
+# Tabel decode mu-law: kode 0..255 -> float32
+_MULAW_TABLE = (
+    np.sign(np.linspace(-1.0, 1.0, 256))
+    * ((1.0 + _MU) ** np.abs(np.linspace(-1.0, 1.0, 256)) - 1.0) / _MU
+).astype(np.float32)
+
+
+class CodecError(ValueError):
+    """Payload audio tidak bisa di-decode dengan format yang disebut header"""
+
+
+def _to_int16(audio):
+    scaled = np.multiply(np.clip(audio, -1.0, 1.0), _INT16_SCALE, dtype=np.float32)
+    return np.rint(scaled).astype("<i2")
+
+
+def _output(out, n):
+    if out is None:
+        return np.empty(n, dtype=np.float32)
+    if len(out) < n:
+        raise CodecError(f"Buffer output terlalu kecil: {len(out)} < {n} sampel")
+    return out[:n]
+
+
+def encode(fmt, audio):
+    """Encode sampel float32 [-1, 1] menjadi bytes payload untuk format `fmt`"""
+    audio = np.asarray(audio, dtype=np.float32)
+    if fmt == FMT_FLOAT32:
+        return np.ascontiguousarray(audio, dtype="<f4").tobytes()
+    if fmt == FMT_INT16:
+        return _to_int16(audio).tobytes()
+    if fmt == FMT_MULAW:
+        x = np.clip(audio, -1.0, 1.0)
+        y = np.sign(x) * np.log1p(_MU * np.abs(x)) / np.log1p(_MU)
+        return np.rint((y + 1.0) * 127.5).astype(np.uint8).tobytes()
+    if fmt == FMT_ZLIB16:
+        pcm = _to_int16(audio)
+        # Selisih antar sampel (wrap-around int16) lebih kecil dan lebih mudah dikompres;
+        # byte rendah dan tinggi dipisah agar byte tinggi yang hampir konstan jadi run panjang
+        delta = np.diff(pcm, prepend=np.int16(0)).astype("<i2")
+        planes = delta.view(np.uint8).reshape(-1, 2).T
+        return zlib.compress(np.ascontiguousarray(planes).tobytes(), 1)
+    raise CodecError(f"Format sampel tidak dikenal: {fmt}")
+
+
+def decode(fmt, payload, out=None, max_samples=None):
+    """Decode payload menjadi float32, ditulis ke `out` jika diberikan
+
+    Return array float32 (view dari `out` sepanjang jumlah sampel, atau
+    array baru). `max_samples` membatasi hasil dekompresi zlib16.
+    """
+    if fmt == FMT_FLOAT32:
+        if len(payload) % 4:
+            raise CodecError("Panjang payload float32 bukan kelipatan 4")
+        samples = np.frombuffer(payload, dtype="<f4")
+        result = _output(out, len(samples))
+        result[:] = samples
+        return result
+    if fmt == FMT_INT16:
+        if len(payload) % 2:
+            raise CodecError("Panjang payload int16 bukan kelipatan 2")
+        pcm = np.frombuffer(payload, dtype="<i2")
+        return np.multiply(pcm, np.float32(1.0 / _INT16_SCALE), out=_output(out, len(pcm)))
+    if fmt == FMT_MULAW:
+        codes = np.frombuffer(payload, dtype=np.uint8)
+        return np.take(_MULAW_TABLE, codes, out=_output(out, len(codes)))
+    if fmt == FMT_ZLIB16:
+        limit = 2 * max_samples if max_samples else 0
+        decompressor = zlib.decompressobj()
+        try:
+            raw = decompressor.decompress(payload, limit)
+        except zlib.error as e:
+            raise CodecError(f"Payload zlib16 rusak: {e}") from e
+        if decompressor.unconsumed_tail or len(raw) % 2:
+            raise CodecError("Payload zlib16 terlalu besar atau terpotong")
+        n = len(raw) // 2
+        planes = np.frombuffer(raw, dtype=np.uint8).reshape(2, n)
+        delta = np.empty((n, 2), dtype=np.uint8)
+        delta[:, 0] = planes[0]
+        delta[:, 1] = planes[1]
+        # cumsum int16 membungkus overflow sama seperti np.diff saat encode
+        pcm = np.cumsum(delta.view("<i2").ravel(), dtype=np.int16)
+        return np.multiply(pcm, np.float32(1.0 / _INT16_SCALE), out=_output(out, n))
+    raise CodecError(f"Format sampel tidak dikenal: {fmt}")
+
+
+def choose_codec(offered, supported=None):
+    """Pilih codec pertama dari preferensi client yang juga didukung server
+
+    Return nama codec; "float32" jika tidak ada yang cocok (selalu didukung).
+    """
+    supported = CODEC_NAMES.values() if supported is None else supported
+    for name in offered:
+        if name in CODEC_IDS and name in supported:
+            return name
+    return "float32"
@@ -0,0 +1,227 @@
+import queue
+import threading
+import time
+import wave
+
+import numpy as np
+
+from ring_buffer import AudioRingBuffer
+
+_STOP = object()
+
+
+class NullSink:
+    """Sink yang membuang audio, untuk server headless
+
+    Dengan realtime=True, write() menunggu selama durasi audio sehingga
+    pacing-nya sama dengan perangkat sungguhan.
+    """
+    def __init__(self, sample_rate, realtime=False):
+        self.sample_rate = sample_rate
+        self.realtime = realtime
+        self.samples_written = 0
+
+    def start(self):
+        pass
+
+    def write(self, audio):
+        self.samples_written += len(audio)
+        if self.realtime:
+            time.sleep(len(audio) / self.sample_rate)
+
+    def close(self):
+        pass
+
+
+class WavFileSink:
+    """Sink yang menulis audio ke file WAV 16-bit mono"""
+    def __init__(self, sample_rate, path):
+        self.sample_rate = sample_rate
+        self.path = path
+        self._wav = None
+
+    def start(self):
+        self._wav = wave.open(self.path, "wb")
+        self._wav.setnchannels(1)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(self.sample_rate)
+
+    def write(self, audio):
+        pcm = (np.clip(audio, -1.0, 1.0) * 32767.0).astype(np.int16)
+        self._wav.writeframes(pcm.tobytes())
+
+    def close(self):
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
+
+
+class SoundDeviceSink:
+    """Sink ke sd.OutputStream persisten yang dibaca callback dari ring buffer
+
+    write() hanya menyalin ke ring buffer dan menunggu jika ring penuh;
+    callback PortAudio mengambil data per blok dan mengisi nol jika ring
+    kosong (dihitung sebagai underrun jika terjadi di tengah audio).
+    """
+    def __init__(self, sample_rate, device=None, buffer_s=5.0, blocksize=512):
+        self.sample_rate = sample_rate
+        self.device = device
+        self.blocksize = blocksize
+        self.ring = AudioRingBuffer(int(sample_rate * buffer_s))
+        self.stream = None
+        self.underruns = 0
+
+    @staticmethod
+    def check_device(device=None):
+        """Pastikan perangkat output (None = default) bisa dibuka, raise ValueError jika tidak"""
+        try:
+            import sounddevice as sd
+            sd.check_output_settings(device=device, channels=1, dtype="float32")
+        except Exception as e:
+            raise ValueError(f"Perangkat output {device!r} tidak bisa dipakai: {e}") from e
+
+    def start(self):
+        import sounddevice as sd
+        self.stream = sd.OutputStream(
+            samplerate=self.sample_rate, channels=1, dtype="float32",
+            device=self.device, blocksize=self.blocksize, callback=self._callback,
+        )
+        self.stream.start()
+
+    def _callback(self, outdata, frames, time_info, status):
+        n = self.ring.read_into(outdata[:, 0])
+        if n < frames:
+            outdata[n:, 0] = 0.0
+            if n:
+                self.underruns += 1
+
+    def write(self, audio):
+        pos = 0
+        while pos < len(audio):
+            written = self.ring.write(audio[pos:])
+            pos += written
+            if not written:
+                time.sleep(self.blocksize / self.sample_rate)
+
+    def close(self, drain_timeout=10.0):
+        deadline = time.monotonic() + drain_timeout
+        while self.ring.available() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+
+class AudioOutput:
+    """Stage output dengan thread sendiri di depan sebuah sink
+
+    play() tidak pernah memblok: segmen masuk antrian dan thread output yang
+    menulis ke sink. Segmen berurutan dari ucapan yang sama (misalnya
+    potongan terjemahan streaming) disambung dengan crossfade pendek,
+    sedangkan antar ucapan berbeda disisipkan jeda `gap_ms`. Jika antrian
+    penuh, segmen tertua dibuang agar pipeline di depannya tidak tertahan.
+    """
+    def __init__(self, sink, sample_rate, crossfade_ms=15, gap_ms=120, max_queue=32):
+        self.sink = sink
+        self.sample_rate = sample_rate
+        self.fade_len = max(1, int(sample_rate * crossfade_ms / 1000))
+        self.gap = np.zeros(int(sample_rate * gap_ms / 1000), dtype=np.float32)
+        self.fade_in = np.linspace(0.0, 1.0, self.fade_len, dtype=np.float32)
+        self.fade_out = self.fade_in[::-1].copy()
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.thread = None
+        self.dropped = 0
+        self.segments_played = 0
+
+    def start(self):
+        self.sink.start()
+        self.thread = threading.Thread(target=self._run, name="audio-output")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def play(self, audio, utterance_id=None, sample_rate=None):
+        """Antrikan segmen audio tanpa memblok pemanggil
+
+        Audio dengan sample rate berbeda (misalnya dari model TTS bahasa lain)
+        di-resample linear ke sample rate sink.
+        """
+        if audio is None or not len(audio):
+            return
+        audio = np.asarray(audio, dtype=np.float32)
+        if sample_rate and sample_rate != self.sample_rate:
+            n = int(round(len(audio) * self.sample_rate / sample_rate))
+            audio = np.interp(
+                np.arange(n) * (sample_rate / self.sample_rate), np.arange(len(audio)), audio
+            ).astype(np.float32)
+        item = (audio, utterance_id)
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def close(self, timeout=None):
+        """Putar sisa antrian lalu tutup sink"""
+        if self.thread is None:
+            return
+        self.queue.put(_STOP)
+        self.thread.join(timeout)
+        self.thread = None
+        self.sink.close()
+
+    def _run(self):
+        n = self.fade_len
+        tail = None  # Ekor segmen sebelumnya yang ditahan untuk crossfade
+        last_id = None
+        while True:
+            try:
+                item = self.queue.get(timeout=0.05)
+            except queue.Empty:
+                # Tidak ada segmen lanjutan, selesaikan ekor dengan fade-out
+                if tail is not None:
+                    self.sink.write(tail * self.fade_out)
+                    tail = None
+                continue
+            if item is _STOP:
+                break
+
+            audio, utterance_id = item
+            audio = audio.copy()
+            continuation = last_id is not None and utterance_id == last_id
+            if tail is not None and continuation and len(audio) >= n:
+                audio[:n] = tail * self.fade_out + audio[:n] * self.fade_in
+            else:
+                if tail is not None:
+                    self.sink.write(tail * self.fade_out)
+                if last_id is not None and not continuation:
+                    self.sink.write(self.gap)
+                m = min(n, len(audio))
+                audio[:m] *= self.fade_in[:m]
+            tail = None
+
+            if len(audio) > 2 * n:
+                tail = audio[-n:].copy()
+                audio = audio[:-n]
+            self.sink.write(audio)
+            last_id = utterance_id
+            self.segments_played += 1
+
+        if tail is not None:
+            self.sink.write(tail * self.fade_out)
+
+
+def create_sink(kind, sample_rate, device=None, path=None):
+    """Buat sink dari nama: "device", "null" atau "file" """
+    if kind == "device":
+        return SoundDeviceSink(sample_rate, device)
+    if kind == "file":
+        return WavFileSink(sample_rate, path)
+    if kind == "null":
+        return NullSink(sample_rate)
+    raise ValueError(f"Jenis output sink tidak dikenal: {kind}")
@@ -0,0 +1,254 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+from client_connection import ClientConnection
+from metrics import Histogram, LATENCY_BUCKETS, ServerMetrics
+from protocol import MSG_TTS_AUDIO, now_us
+from replay_audio import SAMPLE_RATE, load_replay_audio, paced_chunks
+from stub_models import StubASR, StubTTS
+from translation_backend import StubBackend
+
+
+def model_options(args):
+    """Opsi ModelPool: model stub kecuali diminta model asli"""
+    options = {
+        "translation_cache_path": ":memory:",
+        "tts_cache_dir": None,
+    }
+    if not args.real_asr:
+        options["asr_loader"] = lambda name, language: StubASR(
+            args.asr_latency, args.asr_rtf, phrases=args.asr_phrases
+        )
+    if not args.real_tts:
+        options["tts_loader"] = lambda name, language: StubTTS(args.tts_latency, args.tts_rtf)
+    if not args.real_translation:
+        options["translation_backend"] = StubBackend(
+            latency_s=args.translate_latency, token_latency_s=args.token_latency,
+            prompt_token_latency_s=args.prompt_token_latency,
+        )
+    return options
+
+
+def stubbed_models(args):
+    """Model yang diganti stub; stub menunggu dengan sleep, bukan memakai CPU"""
+    real = {"asr": args.real_asr, "translation": args.real_translation, "tts": args.real_tts}
+    return [name for name, is_real in real.items() if not is_real]
+
+
+def run_processor_session(models, metrics, audio, args):
+    """Satu sesi langsung lewat AudioProcessor.process_audio_stream (tanpa socket)"""
+    from server import AudioProcessor
+
+    processor = AudioProcessor(
+        models, streaming_asr=args.streaming_asr,
+        streaming_translation=args.streaming_translation,
+        output_sink="null", metrics=metrics,
+    )
+    processor.start_pipeline()
+    for _, chunk in paced_chunks(audio, args.chunk, args.speed):
+        processor.process_audio_stream(
+            chunk, args.source_lang, args.target_lang, timestamp_us=now_us()
+        )
+    processor.flush_audio_stream(args.source_lang, args.target_lang)
+    processor.stop_pipeline()
+
+
+def run_socket_session(session_id, audio, args, client_latency):
+    """Satu sesi lewat socket TranslationServer, seperti client sungguhan"""
+    connection = ClientConnection(args.host, args.port, session_id)
+
+    def receive():
+        for header, _ in connection.frames():
+            if header.msg_type == MSG_TTS_AUDIO and header.timestamp_us:
+                client_latency.observe((now_us() - header.timestamp_us) / 1e6)
+
+    receiver = threading.Thread(target=receive, daemon=True)
+    receiver.start()
+    for _, chunk in paced_chunks(audio, args.chunk, args.speed):
+        connection.send_audio(chunk, args.source_lang, args.target_lang)
+    # Tutup arah kirim; server mem-flush ucapan terakhir lalu menutup koneksi
+    connection.finish_sending()
+    receiver.join()
+    connection.close()
+
+
+def run_processor_mode(args, audio):
+    from server import ModelPool
+
+    models = ModelPool(**model_options(args))
+    models.initialize_models()
+    if not models.ready.is_set():
+        raise RuntimeError(f"Model gagal dimuat: {models.readiness()['models']}")
+    metrics = ServerMetrics()
+    threads = [
+        threading.Thread(target=run_processor_session, args=(models, metrics, audio, args))
+        for _ in range(args.sessions)
+    ]
+    wall, cpu = run_threads(threads)
+    cache_stats = models.translation_cache.stats()
+    models.shutdown()
+    return metrics, wall, cpu, None, cache_stats
+
+
+def run_server_mode(args, audio):
+    from server import TranslationServer
+
+    server = TranslationServer(
+        args.host, args.port, streaming_asr=args.streaming_asr,
+        streaming_translation=args.streaming_translation, output_sink="client",
+        model_options=model_options(args), max_sessions=max(32, args.sessions),
+        metrics_port=None,
+    )
+    server_thread = threading.Thread(target=server.start_server)
+    server_thread.start()
+    if not server.models.ready.wait(600):
+        server.stop_server()
+        raise RuntimeError("Model tidak siap dalam 600 detik")
+
+    client_latency = Histogram(LATENCY_BUCKETS)
+    threads = [
+        threading.Thread(target=run_socket_session, args=(i + 1, audio, args, client_latency))
+        for i in range(args.sessions)
+    ]
+    wall, cpu = run_threads(threads)
+    server.stop_server()
+    server_thread.join()
+    return server.metrics, wall, cpu, client_latency, server.models.translation_cache.stats()
+
+
+def run_threads(threads):
+    """Jalankan semua sesi bersamaan, return (detik wall, detik CPU proses)"""
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+
+def summarize(args, audio, metrics, wall, cpu, client_latency, cache_stats):
+    stats = metrics.to_dict()
+    audio_seconds = len(audio) / SAMPLE_RATE * args.sessions
+    stubs = stubbed_models(args)
+    result = {
+        "config": {k: v for k, v in vars(args).items() if k != "json"},
+        "cpu_count": os.cpu_count(),
+        "sessions": args.sessions,
+        "audio_seconds": audio_seconds,
+        "wall_seconds": wall,
+        "cpu_seconds": cpu,
+        "stub_models": stubs,
+        "utterances": stats["utterances"],
+        # Waktu komputasi model (ASR+terjemahan+TTS) per detik audio
+        "rtf": stats["rtf"],
+        # Detik CPU proses per detik audio; dengan model stub hanya overhead pipeline
+        # (denoiser, VAD, protokol, antrian) karena stub tidak memakai CPU
+        "cpu_per_audio_s": cpu / audio_seconds if audio_seconds else 0.0,
+        # Sesi real-time yang sanggup dilayani satu core; hanya berarti dengan model asli
+        "sessions_per_core": None if stubs else (audio_seconds / cpu if cpu else 0.0),
+        "stages": stats["stages"],
+        "stage_rtf": stats["stage_rtf"],
+        "prompt_tokens": stats["prompt_tokens"],
+        "translation_cache": cache_stats,
+    }
+    if client_latency is not None:
+        snapshot = client_latency.snapshot()
+        del snapshot["buckets"]
+        result["client_latency"] = snapshot
+    return result
+
+
+def print_report(result):
+    if result["sessions_per_core"] is None:
+        capacity = f"sesi/core n/a (stub: {', '.join(result['stub_models'])})"
+    else:
+        capacity = f"{result['sessions_per_core']:.1f} sesi/core"
+    print(
+        f"\n{result['sessions']} sesi, {result['audio_seconds']:.1f} detik audio, "
+        f"{result['utterances']} ucapan | wall {result['wall_seconds']:.1f} s "
+        f"| CPU {result['cpu_seconds']:.1f} s ({1000 * result['cpu_per_audio_s']:.1f} ms/detik audio) "
+        f"| RTF {result['rtf']:.3f} | {capacity}"
+    )
+    print(f"{'stage':20s} {'n':>6s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}")
+    rows = dict(result["stages"])
+    if "client_latency" in result:
+        rows["client_latency"] = result["client_latency"]
+    for name, s in rows.items():
+        print(
+            f"{name:20s} {s['count']:6d} {1000 * s['p50']:9.1f} "
+            f"{1000 * s['p95']:9.1f} {1000 * s['p99']:9.1f}"
+        )
+    cache = result["translation_cache"]
+    print(
+        f"cache terjemahan: hit rate {100 * cache['hit_rate']:.0f}% "
+        f"({cache['memory_hits'] + cache['disk_hits']} hit, {cache['misses']} miss)"
+    )
+    # Token prompt per terjemahan; "evaluated" seharusnya tetap kecil walau "prompt" tumbuh
+    for name, s in result["prompt_tokens"].items():
+        print(
+            f"{'tokens_' + name:20s} {s['count']:6d} {s['p50']:9.0f} "
+            f"{s['p95']:9.0f} {s['p99']:9.0f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark replay offline untuk seluruh pipeline terjemahan"
+    )
+    parser.add_argument("wav", nargs="*", help="File WAV input (default sinyal uji sintetis)")
+    parser.add_argument("--mode", choices=("processor", "server"), default="processor",
+                        help="processor: AudioProcessor langsung; server: lewat socket TranslationServer")
+    parser.add_argument("--sessions", type=int, default=1)
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Kecepatan replay relatif real-time (0 = secepatnya)")
+    parser.add_argument("--duration", type=float, default=20.0,
+                        help="Durasi sinyal uji sintetis jika tanpa WAV")
+    parser.add_argument("--chunk", type=int, default=4096, help="Ukuran chunk dalam sampel")
+    parser.add_argument("--source-lang", default="id")
+    parser.add_argument("--target-lang", default="en")
+    parser.add_argument("--streaming-asr", action="store_true")
+    parser.add_argument("--streaming-translation", action="store_true")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=12445)
+
+    stubs = parser.add_argument_group("model stub (latensi dalam detik)")
+    stubs.add_argument("--asr-latency", type=float, default=0.05)
+    stubs.add_argument("--asr-rtf", type=float, default=0.1)
+    stubs.add_argument("--asr-phrases", type=int, default=0,
+                       help="Stub ASR mengulang sejumlah kalimat tetap (0 = setiap ucapan unik)")
+    stubs.add_argument("--translate-latency", type=float, default=0.1)
+    stubs.add_argument("--token-latency", type=float, default=0.01)
+    stubs.add_argument("--prompt-token-latency", type=float, default=0.0005,
+                       help="Waktu evaluasi per token prompt yang tidak ada di cache prefix")
+    stubs.add_argument("--tts-latency", type=float, default=0.05)
+    stubs.add_argument("--tts-rtf", type=float, default=0.2)
+    stubs.add_argument("--real-asr", action="store_true", help="Pakai Whisper sungguhan")
+    stubs.add_argument("--real-translation", action="store_true", help="Pakai Ollama sungguhan")
+    stubs.add_argument("--real-tts", action="store_true", help="Pakai Coqui TTS sungguhan")
+
+    parser.add_argument("--json", default=None, help="Simpan hasil ke file JSON ('-' = stdout)")
+    args = parser.parse_args()
+
+    audio = load_replay_audio(args.wav, args.duration)
+    print(f"Input {len(audio) / SAMPLE_RATE:.1f} detik audio, {args.sessions} sesi, mode {args.mode}")
+    runner = run_server_mode if args.mode == "server" else run_processor_mode
+    metrics, wall, cpu, client_latency, cache_stats = runner(args, audio)
+    result = summarize(args, audio, metrics, wall, cpu, client_latency, cache_stats)
+    print_report(result)
+
+    if args.json == "-":
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Hasil disimpan ke {args.json}")
+
+
+if __name__ == "__main__":
+    main()
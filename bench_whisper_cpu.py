@@ -0,0 +1,157 @@
+import argparse
+import glob
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def normalize_words(text):
+    """Huruf kecil, tanpa tanda baca, dipecah per kata"""
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    """WER = (substitusi + sisipan + hapusan) / jumlah kata referensi"""
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word),
+            )
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def load_clips(clips_dir):
+    """Baca semua WAV di folder; transkrip referensi dari file .txt bernama sama jika ada"""
+    import whisper
+    clips = []
+    for path in sorted(glob.glob(os.path.join(clips_dir, "*.wav"))):
+        text_path = os.path.splitext(path)[0] + ".txt"
+        reference = None
+        if os.path.exists(text_path):
+            with open(text_path, encoding="utf-8") as f:
+                reference = f.read().strip()
+        clips.append({
+            "name": os.path.basename(path),
+            "audio": whisper.load_audio(path, SAMPLE_RATE),
+            "reference": reference,
+        })
+    return clips
+
+
+def run_mode(model_name, mode, clips, language, threads, interop_threads):
+    """Transkripsi semua clip dengan satu mode, return hasil per clip dan ringkasan waktu"""
+    import torch
+    from model_registry import estimate_model_bytes
+    from whisper_cpu import configure_torch_threads, load_whisper_model, uses_fp16
+
+    configure_torch_threads(threads, interop_threads)
+    start = time.perf_counter()
+    model = load_whisper_model(model_name, mode)
+    load_time = time.perf_counter() - start
+    fp16 = uses_fp16(model)
+
+    # Satu decode warm-up agar alokasi pertama tidak ikut diukur
+    with torch.no_grad():
+        model.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), language=language, fp16=fp16)
+
+    results = []
+    total_audio = 0.0
+    total_time = 0.0
+    for clip in clips:
+        start = time.perf_counter()
+        with torch.no_grad():
+            text = model.transcribe(
+                clip["audio"], language=language, fp16=fp16,
+                temperature=0.0, condition_on_previous_text=False,
+            )["text"].strip()
+        elapsed = time.perf_counter() - start
+        duration = len(clip["audio"]) / SAMPLE_RATE
+        total_audio += duration
+        total_time += elapsed
+        results.append({"clip": clip["name"], "text": text, "seconds": elapsed,
+                        "rtf": elapsed / duration if duration else 0.0})
+
+    return {
+        "mode": mode,
+        "threads": torch.get_num_threads(),
+        "load_time_s": load_time,
+        "model_mb": estimate_model_bytes(model) / 2**20,
+        "rtf": total_time / total_audio if total_audio else 0.0,
+        "clips": results,
+    }
+
+
+def score(runs, clips):
+    """Hitung WER tiap mode terhadap transkrip referensi
+
+    Clip tanpa .txt dibandingkan dengan hasil mode pertama (biasanya "cpu"
+    fp32), sehingga angkanya menunjukkan seberapa jauh mode lain bergeser
+    dari baseline, bukan akurasi absolut.
+    """
+    baseline = {r["clip"]: r["text"] for r in runs[0]["clips"]}
+    for run in runs:
+        errors = []
+        for clip, result in zip(clips, run["clips"]):
+            reference = clip["reference"]
+            result["against"] = "reference" if reference is not None else "baseline"
+            if reference is None:
+                reference = baseline[clip["name"]]
+            result["wer"] = word_error_rate(reference, result["text"])
+            errors.append(result["wer"])
+        run["wer"] = float(np.mean(errors)) if errors else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bandingkan akurasi dan kecepatan Whisper di CPU: fp32 vs int8 dinamis"
+    )
+    parser.add_argument("clips", help="Folder berisi clip *.wav (opsional *.txt berisi transkrip referensi)")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--modes", nargs="+", default=["cpu", "cpu-int8"])
+    parser.add_argument("--language", default=None, help="Kode bahasa Whisper, default deteksi otomatis")
+    parser.add_argument("--threads", type=int, default=None, help="Thread intra-op torch")
+    parser.add_argument("--interop-threads", type=int, default=None, help="Thread inter-op torch")
+    parser.add_argument("--json", default=None, help="Simpan hasil lengkap ke file JSON")
+    args = parser.parse_args()
+
+    clips = load_clips(args.clips)
+    if not clips:
+        parser.error(f"Tidak ada file .wav di {args.clips}")
+    total_audio = sum(len(c["audio"]) for c in clips) / SAMPLE_RATE
+    print(f"{len(clips)} clip, total {total_audio:.1f} detik audio, model {args.model}")
+
+    runs = [
+        run_mode(args.model, mode, clips, args.language, args.threads, args.interop_threads)
+        for mode in args.modes
+    ]
+    score(runs, clips)
+
+    for run in runs:
+        print(
+            f"{run['mode']:9s} | thread {run['threads']:2d} | muat {run['load_time_s']:5.1f} s "
+            f"| {run['model_mb']:6.0f} MB | RTF {run['rtf']:.3f} | WER {100 * run['wer']:5.1f}%"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"model": args.model, "audio_seconds": total_audio, "runs": runs},
+                      f, indent=2, ensure_ascii=False)
+        print(f"Hasil disimpan ke {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,88 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import socket
-import json
+from tkinter import ttk, messagebox, scrolledtext, filedialog
+import queue
 import threading
+import wave
 import sounddevice as sd
-import numpy as np
-from collections import deque
+from protocol import (
+    ProtocolError, MSG_TRANSCRIPT, MSG_TRANSLATION, MSG_TTS_AUDIO, MSG_STATUS,
+    FLAG_PARTIAL, payload_to_text, payload_to_tts_audio, payload_to_status, now_us,
+)
+from ring_buffer import AudioRingBuffer
+from audio_codec import DEFAULT_PREFERENCE
+from client_connection import ClientConnection, CaptureSender
+from replay_audio import load_wav
+
+class PlaybackBuffer:
+    """Pemutar audio terjemahan dengan jitter buffer di depan OutputStream
+
+    Thread penerima menulis ke ring buffer, callback PortAudio membaca
+    darinya. Pemutaran baru dimulai setelah `prebuffer_ms` audio terkumpul
+    sehingga jeda antar frame dari jaringan tidak langsung terdengar sebagai
+    putus-putus; jika ring habis di tengah audio, buffer kembali menunggu
+    prebuffer dan kejadiannya dihitung sebagai underrun.
+    """
+    def __init__(self, sample_rate, device=None, prebuffer_ms=200, buffer_s=10.0):
+        self.sample_rate = sample_rate
+        self.device = device
+        self.prebuffer = int(sample_rate * prebuffer_ms / 1000)
+        self.ring = AudioRingBuffer(int(sample_rate * buffer_s))
+        self.playing = False
+        self.underruns = 0
+        self.dropped = 0
+        self.stream = sd.OutputStream(
+            samplerate=sample_rate, channels=1, dtype="float32",
+            device=device, callback=self._callback,
+        )
+        self.stream.start()
+    
+    def _callback(self, outdata, frames, time_info, status):
+        if status.output_underflow:
+            self.underruns += 1
+        if not self.playing:
+            if self.ring.available() < self.prebuffer:
+                outdata.fill(0)
+                return
+            self.playing = True
+        n = self.ring.read_into(outdata[:, 0])
+        if n < frames:
+            outdata[n:, 0] = 0.0
+            self.playing = False
+            if n:
+                self.underruns += 1
+    
+    def write(self, audio):
+        """Antrikan audio; sisa yang tidak muat di ring dibuang"""
+        written = self.ring.write(audio)
+        self.dropped += len(audio) - written
+    
+    def close(self):
+        self.stream.stop()
+        self.stream.close()
 
 class TranslationClient:
     def __init__(self, root):
         self.root = root
         self.root.title("Realtime Speech-to-Speech Translation")
-        self.root.geometry("600x500")
+        self.root.geometry("600x650")
         
         # Variabel untuk koneksi dan pengaturan
         self.is_connected = False
         self.is_recording = False
-        self.socket = None
-        self.audio_buffer = deque(maxlen=48000)
+        self.connection = None
+        self.stream = None
+        self.sender = None  # CaptureSender selama merekam
         self.sample_rate = 16000
         
+        # Hasil dari server: thread penerima -> antrian -> GUI
+        self.receiver_thread = None
+        self.ui_events = queue.Queue()
+        self.playback = None
+        # Salinan pilihan output device, ditulis di thread Tk dan dibaca thread penerima
+        self.output_device_id = None
+        self.last_latency_ms = None
+        self.server_status = None
+        
         # Setup GUI
         self.setup_gui()
         
@@ -42,8 +105,17 @@ class TranslationClient:
         self.port_entry.insert(0, "12345")
         self.port_entry.grid(row=0, column=3, padx=5)
         
+        # Codec audio ke server; "auto" menawarkan semua codec dan server yang memilih
+        ttk.Label(connection_frame, text="Codec:").grid(row=0, column=4, sticky="w", padx=(10, 0))
+        self.codec_var = tk.StringVar(value="auto")
+        self.codec_combo = ttk.Combobox(
+            connection_frame, textvariable=self.codec_var, width=8, state="readonly",
+            values=("auto",) + DEFAULT_PREFERENCE,
+        )
+        self.codec_combo.grid(row=0, column=5, padx=5)
+        
         self.connect_button = ttk.Button(connection_frame, text="Connect", command=self.toggle_connection)
-        self.connect_button.grid(row=0, column=4, padx=(10, 0))
+        self.connect_button.grid(row=0, column=6, padx=(10, 0))
         
         # Frame pengaturan audio
         audio_frame = ttk.LabelFrame(self.root, text="Pengaturan Audio", padding=10)
@@ -62,6 +134,10 @@ class TranslationClient:
         self.refresh_devices_button = ttk.Button(audio_frame, text="Refresh Devices", command=self.refresh_audio_devices)
         self.refresh_devices_button.grid(row=2, column=1, pady=5, sticky="e")
         
+        # Rekaman suara pengguna agar terjemahan diucapkan dengan suaranya sendiri
+        self.voice_button = ttk.Button(audio_frame, text="Suara Saya...", command=self.send_voice_sample)
+        self.voice_button.grid(row=2, column=0, pady=5, sticky="w")
+        
         # Frame pengaturan bahasa
         language_frame = ttk.LabelFrame(self.root, text="Pengaturan Bahasa", padding=10)
         language_frame.pack(fill="x", padx=10, pady=5)
@@ -79,6 +155,8 @@ class TranslationClient:
         self.target_lang_combo['values'] = ('en', 'id', 'ja', 'ko', 'ar')
         self.target_lang_combo.set('en')
         self.target_lang_combo.grid(row=0, column=3, padx=5, pady=5)
+        for combo in (self.source_lang_combo, self.target_lang_combo, self.output_device_combo):
+            combo.bind("<<ComboboxSelected>>", lambda event: self.update_sender_settings())
         
         # Frame kontrol
         control_frame = ttk.Frame(self.root)
@@ -87,6 +165,14 @@ class TranslationClient:
         self.record_button = ttk.Button(control_frame, text="Start Recording", command=self.toggle_recording, state="disabled")
         self.record_button.pack(pady=10)
         
+        # Frame transkrip dan terjemahan dari server
+        transcript_frame = ttk.LabelFrame(self.root, text="Transkrip", padding=10)
+        transcript_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        self.transcript_text = scrolledtext.ScrolledText(transcript_frame, height=8, state="disabled", wrap=tk.WORD)
+        self.transcript_text.pack(fill="both", expand=True)
+        self.partial_var = tk.StringVar()
+        ttk.Label(transcript_frame, textvariable=self.partial_var, foreground="gray").pack(fill="x")
+        
         # Status bar
         self.status_var = tk.StringVar()
         self.status_var.set("Ready")
@@ -115,6 +201,7 @@ class TranslationClient:
                 self.input_device_combo.set(f"{input_devices[0][0]}: {input_devices[0][1]}")
             if output_devices:
                 self.output_device_combo.set(f"{output_devices[0][0]}: {output_devices[0][1]}")
+            self.update_sender_settings()
                 
         except Exception as e:
             messagebox.showerror("Error", f"Gagal mendapatkan daftar perangkat audio: {e}")
@@ -141,13 +228,24 @@ class TranslationClient:
             host = self.host_entry.get()
             port = int(self.port_entry.get())
             
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.connect((host, port))
+            codec = self.codec_var.get()
+            codecs = None if codec == "auto" else (codec,)
+            self.connection = ClientConnection(host, port, codecs=codecs)
             
             self.is_connected = True
+            # Antrian baru per koneksi agar event dari koneksi lama tidak terbawa
+            self.ui_events = queue.Queue()
+            self.server_status = None
+            self.last_latency_ms = None
+            self.receiver_thread = threading.Thread(
+                target=self.receive_loop, args=(self.connection, self.ui_events)
+            )
+            self.receiver_thread.daemon = True
+            self.receiver_thread.start()
+            self.root.after(50, self.poll_ui_events)
             self.connect_button.config(text="Disconnect")
             self.record_button.config(state="normal")
-            self.status_var.set(f"Connected to {host}:{port}")
+            self.status_var.set(f"Connected to {host}:{port} (codec {self.connection.codec})")
             
         except Exception as e:
             messagebox.showerror("Error", f"Gagal terhubung ke server: {e}")
@@ -156,10 +254,13 @@ class TranslationClient:
         """Putuskan koneksi dari server"""
         try:
             self.stop_recording()
-            if self.socket:
-                self.socket.close()
-            
             self.is_connected = False
+            if self.connection:
+                self.connection.close()
+            if self.playback:
+                self.playback.close()
+                self.playback = None
+            
             self.connect_button.config(text="Connect")
             self.record_button.config(state="disabled")
             self.status_var.set("Disconnected")
@@ -175,9 +276,20 @@ class TranslationClient:
             self.stop_recording()
     
     def start_recording(self):
-        """Mulai merekam dan mengirim audio ke server"""
+        """Mulai merekam dan mengirim audio ke server
+
+        Callback audio hanya menyalin ke ring buffer CaptureSender; encode
+        dan kirim dilakukan thread pengirim.
+        """
         try:
             input_device = self.get_device_id(self.input_device_var.get())
+            events = self.ui_events
+            self.sender = CaptureSender(
+                self.connection, self.sample_rate,
+                on_error=lambda e: events.put(("send_error", e)),
+            )
+            self.update_sender_settings()
+            self.sender.start()
             self.is_recording = True
             self.record_button.config(text="Stop Recording")
             self.status_var.set("Recording...")
@@ -195,53 +307,170 @@ class TranslationClient:
             
         except Exception as e:
             messagebox.showerror("Error", f"Gagal memulai recording: {e}")
-            self.is_recording = False
-            self.record_button.config(text="Start Recording")
+            self.stop_recording()
     
     def stop_recording(self):
-        """Hentikan recording"""
-        if hasattr(self, 'stream') and self.stream:
+        """Hentikan recording; audio yang masih di ring tetap dikirim"""
+        if self.stream:
             self.stream.stop()
             self.stream.close()
+            self.stream = None
+        if self.sender is not None:
+            # Sender yang sudah berhenti tidak dipakai lagi (pengaturan, counter status bar)
+            self.sender.stop()
+            self.sender = None
         
         self.is_recording = False
         self.record_button.config(text="Start Recording")
         self.status_var.set("Recording stopped")
     
-    def audio_callback(self, indata, frames, time, status):
-        """Callback untuk menangani data audio yang masuk"""
-        if status:
-            print(f"Audio callback status: {status}")
-        
-        # Tambahkan audio ke buffer
-        audio_data = indata[:, 0].copy()  # Ambil channel pertama
-        self.audio_buffer.extend(audio_data)
-        
-        # Kirim data audio ke server jika terhubung dan buffer cukup penuh
-        if self.is_connected and self.socket and len(self.audio_buffer) >= 4096:
-            try:
-                # Siapkan data untuk dikirim
-                source_lang = self.source_lang_var.get()
-                target_lang = self.target_lang_var.get()
-                output_device = self.get_device_id(self.output_device_var.get())
-                
-                # Ambil data dari buffer
-                audio_chunk = np.array(self.audio_buffer)
-                self.audio_buffer.clear()  # Kosongkan buffer setelah mengambil data
-                
-                message = {
-                    'audio_data': audio_chunk.tobytes().hex(),
-                    'source_lang': source_lang,
-                    'target_lang': target_lang,
-                    'output_device': output_device
-                }
-                
-                # Kirim ke server
-                self.socket.sendall(json.dumps(message).encode())
+    def send_voice_sample(self):
+        """Kirim rekaman suara (WAV) ke server untuk suara TTS sesi ini"""
+        if self.connection is None:
+            messagebox.showwarning("Suara", "Hubungkan ke server terlebih dahulu")
+            return
+        path = filedialog.askopenfilename(
+            title="Pilih rekaman suara (WAV 16-bit, 2-30 detik)", filetypes=[("WAV", "*.wav")]
+        )
+        if not path:
+            return
+        try:
+            audio = load_wav(path, self.sample_rate)
+            self.connection.send_voice(audio, self.sample_rate)
+        except (OSError, ValueError, wave.Error) as e:
+            messagebox.showerror("Error", f"Gagal mengirim rekaman suara: {e}")
+            return
+        self.status_var.set("Rekaman suara dikirim, menunggu server...")
+    
+    def update_sender_settings(self):
+        """Salin pilihan bahasa/perangkat dari widget ke sender dan playback (di thread Tk)"""
+        self.output_device_id = self.get_device_id(self.output_device_var.get())
+        if self.sender is not None:
+            self.sender.set_languages(
+                self.source_lang_var.get(), self.target_lang_var.get(), self.output_device_id
+            )
+    
+    def receive_loop(self, connection, events):
+        """Thread penerima: baca frame hasil dari server sampai koneksi ditutup"""
+        try:
+            for header, payload in connection.frames():
+                latency_ms = (now_us() - header.timestamp_us) / 1000 if header.timestamp_us else None
                 
+                if header.msg_type == MSG_TTS_AUDIO:
+                    sample_rate, audio = payload_to_tts_audio(header, payload)
+                    self.play_received_audio(audio, sample_rate)
+                    events.put(("latency", latency_ms))
+                elif header.msg_type == MSG_STATUS:
+                    events.put(("status", payload_to_status(payload)))
+                elif header.msg_type in (MSG_TRANSCRIPT, MSG_TRANSLATION):
+                    text = payload_to_text(payload)
+                    partial = bool(header.flags & FLAG_PARTIAL)
+                    events.put((header.msg_type, header.seq, text, partial))
+        except (OSError, ProtocolError) as e:
+            if self.is_connected:
+                print(f"Error menerima dari server: {e}")
+        events.put(("closed",))
+    
+    def play_received_audio(self, audio, sample_rate):
+        """Tulis audio TTS ke jitter buffer, buat ulang stream jika sample rate berubah"""
+        # Dipanggil dari thread penerima: jangan baca variabel Tk di sini
+        output_device = self.output_device_id
+        playback = self.playback
+        if playback is None or playback.sample_rate != sample_rate or playback.device != output_device:
+            if playback is not None:
+                playback.close()
+            try:
+                playback = PlaybackBuffer(sample_rate, output_device)
             except Exception as e:
-                print(f"Error mengirim audio: {e}")
+                print(f"Gagal membuka output audio: {e}")
+                self.playback = None
+                return
+            self.playback = playback
+        playback.write(audio)
+    
+    def poll_ui_events(self):
+        """Terapkan event dari thread penerima ke widget (hanya di thread Tk)"""
+        closed = False
+        while True:
+            try:
+                event = self.ui_events.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] == "closed":
+                closed = True
+            elif event[0] == "send_error":
+                print(f"Error mengirim audio: {event[1]}")
+                closed = True
+            elif event[0] == "latency":
+                self.last_latency_ms = event[1]
+            elif event[0] == "status":
+                if "error" in event[1]:
+                    # Error protokol atau rekaman suara ditolak, bukan status model
+                    self.status_var.set(f"Server: {event[1]['error']}")
+                    continue
+                if event[1].get("state") == "voice_ready":
+                    self.status_var.set("Server: suara Anda dipakai untuk terjemahan")
+                    continue
+                self.server_status = event[1]
+                self.show_server_status()
+            else:
+                msg_type, utterance_id, text, partial = event
+                if partial:
+                    self.partial_var.set(text)
+                    continue
+                if msg_type == MSG_TRANSCRIPT:
+                    self.partial_var.set("")
+                    line = f"[{utterance_id}] {text}\n"
+                else:
+                    line = f"    -> {text}\n"
+                self.transcript_text.config(state="normal")
+                self.transcript_text.insert(tk.END, line)
+                self.transcript_text.see(tk.END)
+                self.transcript_text.config(state="disabled")
+        
+        loading = self.server_status is not None and self.server_status.get("state") != "ready"
+        if self.is_connected and not loading and (self.is_recording or self.last_latency_ms is not None):
+            self.update_status_bar()
+        
+        if closed:
+            if self.is_connected:
                 self.disconnect_from_server()
+        elif self.is_connected:
+            self.root.after(50, self.poll_ui_events)
+    
+    def update_status_bar(self):
+        """Status bar: latensi terakhir dan counter overrun capture / underrun playback"""
+        parts = ["Recording" if self.is_recording else "Connected"]
+        if self.connection is not None:
+            parts.append(f"codec {self.connection.codec}")
+        if self.last_latency_ms is not None:
+            parts.append(f"latensi {self.last_latency_ms:.0f} ms")
+        if self.sender is not None:
+            parts.append(f"overrun {self.sender.overruns + self.sender.input_overflows}")
+        parts.append(f"underrun {self.playback.underruns if self.playback else 0}")
+        self.status_var.set(" | ".join(parts))
+    
+    def show_server_status(self):
+        """Tampilkan progres pemuatan model server di status bar"""
+        status = self.server_status
+        if status.get("state") == "ready":
+            self.status_var.set("Server siap")
+            return
+        models = ", ".join(f"{name}: {state}" for name, state in status.get("models", {}).items())
+        if status.get("state") == "error":
+            self.status_var.set(f"Server gagal memuat model ({models})")
+        else:
+            self.status_var.set(f"Server memuat model ({models})...")
+    
+    def audio_callback(self, indata, frames, time, status):
+        """Callback PortAudio: hanya salin blok ke ring buffer sender
+
+        Berjalan di thread audio real-time, jadi tidak boleh memblok,
+        mengalokasi buffer besar, print, mengirim ke socket atau menyentuh Tk.
+        """
+        sender = self.sender
+        if sender is not None:
+            sender.capture(indata[:, 0], status.input_overflow)
 
 if __name__ == "__main__":
     root = tk.Tk()
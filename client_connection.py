@@ -0,0 +1,212 @@
+import random
+import socket
+import threading
+import time
+
+import numpy as np
+
+from audio_codec import CODEC_IDS, DEFAULT_PREFERENCE, FMT_FLOAT32
+from protocol import (
+    FrameReader, MSG_HELLO, encode_audio_frame, encode_hello_frame, encode_voice_frame, now_us,
+    payload_to_hello,
+)
+from ring_buffer import AudioRingBuffer
+
+
+class ClientConnection:
+    """Koneksi client ke server penerjemah tanpa GUI
+
+    Dipakai bersama oleh TranslationClient (GUI) dan load generator
+    headless, sehingga keduanya mengirim frame dengan cara yang sama. Satu
+    thread boleh mengirim sementara thread lain membaca frames().
+
+    Saat terhubung, client menawarkan `codecs` (urut preferensi, default
+    DEFAULT_PREFERENCE) lewat MSG_HELLO dan menunggu balasan server paling
+    lama `negotiate_timeout` detik. Jika server tidak membalas, atau
+    codecs=("float32",), audio dikirim sebagai float32; balasan yang
+    terlambat tetap diterapkan oleh frames(). Frame lain
+    yang datang selama negosiasi (misalnya MSG_STATUS) disimpan dan
+    dikembalikan lebih dulu oleh frames().
+    """
+    def __init__(self, host, port, session_id=None, timeout=None, codecs=None,
+                 negotiate_timeout=2.0):
+        self.host = host
+        self.port = port
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.session_id = random.getrandbits(32) if session_id is None else session_id
+        self.seq = 0
+        self.bytes_sent = 0  # Byte frame audio (header + payload) yang sudah dikirim
+        self._send_lock = threading.Lock()
+        self._reader = FrameReader(self.sock)
+        self._pending = []
+        self.codec = "float32"
+        self.sample_fmt = FMT_FLOAT32
+        codecs = tuple(DEFAULT_PREFERENCE if codecs is None else codecs)
+        if codecs and codecs != ("float32",):
+            self._negotiate(codecs, negotiate_timeout)
+        self.sock.settimeout(None)
+
+    def _negotiate(self, codecs, timeout):
+        """Kirim MSG_HELLO dan baca frame sampai balasan hello datang"""
+        self.sock.sendall(encode_hello_frame({"codecs": list(codecs)}, self.session_id))
+        self.sock.settimeout(timeout)
+        try:
+            while True:
+                frame = self._reader.read_frame()
+                if frame is None:
+                    return
+                header, payload = frame
+                if header.msg_type != MSG_HELLO:
+                    # Payload menunjuk ke buffer reader, salin sebelum frame berikutnya
+                    self._pending.append((header, bytes(payload)))
+                    continue
+                self._apply_hello(payload)
+                return
+        except socket.timeout:
+            pass  # Server lama atau lambat: float32 sampai balasan hello datang di frames()
+
+    def _apply_hello(self, payload):
+        """Pakai codec dari balasan hello server (server hanya menerima codec ini)"""
+        codec = payload_to_hello(payload).get("codec")
+        if codec in CODEC_IDS:
+            # Satu assignment per atribut; send_audio membaca sample_fmt di bawah lock kirim
+            with self._send_lock:
+                self.codec = codec
+                self.sample_fmt = CODEC_IDS[codec]
+
+    def send_audio(self, audio, source_lang, target_lang, output_device=None,
+                   timestamp_us=None):
+        """Kirim satu chunk audio float32 dengan codec hasil negosiasi, return (seq, timestamp_us)"""
+        if timestamp_us is None:
+            timestamp_us = now_us()
+        with self._send_lock:
+            seq = self.seq
+            self.seq += 1
+            frame = encode_audio_frame(
+                audio, self.session_id, seq, source_lang, target_lang,
+                output_device, timestamp_us, self.sample_fmt
+            )
+            self.sock.sendall(frame)
+            self.bytes_sent += len(frame)
+        return seq, timestamp_us
+
+    def send_voice(self, audio, sample_rate):
+        """Kirim rekaman suara referensi; server membalas MSG_STATUS voice_ready/voice_error"""
+        frame = encode_voice_frame(audio, sample_rate, self.session_id)
+        with self._send_lock:
+            self.sock.sendall(frame)
+
+    def frames(self):
+        """Iterator (header, payload) dari server sampai koneksi ditutup
+
+        OSError/ProtocolError diteruskan ke pemanggil.
+        """
+        while self._pending:
+            yield self._pending.pop(0)
+        while True:
+            frame = self._reader.read_frame()
+            if frame is None:
+                return
+            if frame[0].msg_type == MSG_HELLO:
+                # Balasan hello yang datang setelah negosiasi timeout
+                self._apply_hello(frame[1])
+                continue
+            yield frame
+
+    def finish_sending(self):
+        """Tutup arah kirim; server memproses sisa ucapan lalu menutup koneksi"""
+        try:
+            self.sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class CaptureSender:
+    """Jalur kirim audio mikrofon yang aman untuk callback real-time
+
+    Callback PortAudio hanya memanggil capture(): menyalin blok ke
+    AudioRingBuffer yang sudah dialokasikan, tanpa lock, alokasi array,
+    I/O atau print. Thread pengirim menguras ring per `frame_samples`,
+    meng-encode dan mengirim lewat ClientConnection. Jika pengirim
+    tertinggal dan ring penuh, sisa blok dibuang dan dihitung sebagai
+    overrun; overflow input yang dilaporkan PortAudio juga dihitung.
+
+    Error kirim tidak menyentuh GUI; `on_error(exc)` dipanggil dari thread
+    pengirim dan pemanggil yang memutuskan apa yang dilakukan.
+    """
+    def __init__(self, connection, sample_rate=16000, frame_samples=4096, buffer_s=5.0,
+                 on_error=None):
+        self.connection = connection
+        self.sample_rate = sample_rate
+        self.frame_samples = frame_samples
+        self.ring = AudioRingBuffer(int(sample_rate * buffer_s))
+        self.on_error = on_error
+        self.settings = ("auto", "en", None)  # (bahasa sumber, bahasa tujuan, output device)
+        self.poll_interval = frame_samples / sample_rate / 4
+        self.thread = None
+        self.is_running = False
+
+        # Ditulis hanya oleh callback audio
+        self.overruns = 0
+        self.dropped_samples = 0
+        self.input_overflows = 0
+        # Ditulis hanya oleh thread pengirim
+        self.frames_sent = 0
+
+    def set_languages(self, source_lang, target_lang, output_device=None):
+        """Ganti bahasa/perangkat untuk frame berikutnya (satu assignment atomik)"""
+        self.settings = (source_lang, target_lang, output_device)
+
+    def capture(self, block, input_overflow=False):
+        """Dipanggil dari callback audio: salin blok ke ring tanpa memblok"""
+        if input_overflow:
+            self.input_overflows += 1
+        written = self.ring.write(block)
+        if written < len(block):
+            self.overruns += 1
+            self.dropped_samples += len(block) - written
+
+    def start(self):
+        self.is_running = True
+        self.thread = threading.Thread(target=self._run, name="capture-sender")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, timeout=2.0):
+        """Hentikan thread; sisa audio di ring tetap dikirim"""
+        self.is_running = False
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def _send(self, audio):
+        # Timestamp capture sampel terakhir: sekarang dikurangi audio yang masih antre di ring
+        timestamp_us = now_us() - int(self.ring.available() * 1_000_000 / self.sample_rate)
+        source_lang, target_lang, output_device = self.settings
+        self.connection.send_audio(audio, source_lang, target_lang, output_device, timestamp_us)
+        self.frames_sent += 1
+
+    def _run(self):
+        frame = np.zeros(self.frame_samples, dtype=np.float32)
+        try:
+            while self.is_running:
+                if self.ring.available() < self.frame_samples:
+                    time.sleep(self.poll_interval)
+                    continue
+                self.ring.read_into(frame)
+                self._send(frame)
+            # Kirim sisa audio setelah stream berhenti
+            while self.ring.available():
+                n = self.ring.read_into(frame)
+                self._send(frame[:n])
+        except OSError as e:
+            self.is_running = False
+            if self.on_error is not None:
+                self.on_error(e)
@@ -1,23 +1,98 @@
+import re
+from collections import namedtuple
+from translation_cache import make_cache_key
+from translation_backend import OllamaBackend
+
+SYSTEM_PROMPT = (
+    'Anda adalah penerjemah yang ahli. Terjemahkan teks dengan mempertimbangkan '
+    'percakapan sebelumnya sebagai konteks. Pastikan terjemahan terdengar alami. '
+    'Hanya kembalikan terjemahannya saja tanpa tambahan apapun.'
+)
+
+# Satu giliran percakapan yang sudah diterjemahkan; tokens = perkiraan token pesannya
+ContextTurn = namedtuple("ContextTurn", ["text", "target_lang", "translation", "tokens"])
+
+# Akhir kalimat: tanda baca diikuti spasi (agar "3.5" tidak terpotong)
+SENTENCE_BOUNDARY = re.compile(r'[.!?]+["\')\]]*\s+|[。！？]+')
+# Batas klausa, hanya dipakai jika potongan sudah cukup panjang
+CLAUSE_BOUNDARY = re.compile(r'[,;:]\s+|[，；：、]')
+
+def split_ready_segments(buffer, min_clause_chars=40):
+    """Pisahkan bagian buffer yang sudah membentuk kalimat/klausa utuh
+
+    Return (list potongan siap, sisa buffer yang belum lengkap).
+    """
+    segments = []
+    while True:
+        match = SENTENCE_BOUNDARY.search(buffer)
+        if match is None:
+            match = CLAUSE_BOUNDARY.search(buffer, min_clause_chars)
+        if match is None:
+            break
+        segment = buffer[:match.end()].strip()
+        buffer = buffer[match.end():]
+        if segment:
+            segments.append(segment)
+    return segments, buffer
+
+def request_message(text, target_lang):
+    """Isi pesan user untuk menerjemahkan satu kalimat"""
+    return f'Terjemahkan kalimat berikut ke {target_lang}: "{text}"'
+
 class ContextAwareTranslator:
-    def __init__(self, max_context_length=5):
-        self.context_history = []
-        self.max_context_length = max_context_length
+    """Penerjemah dengan konteks percakapan yang dibatasi anggaran token
+
+    Konteks dikirim sebagai giliran chat sungguhan (pesan user lalu
+    terjemahan assistant) di belakang system prompt yang tetap. Setiap
+    request karena itu berawalan persis sama dengan request sebelumnya
+    ditambah jawabannya, sehingga backend yang menyimpan KV cache per
+    prefix (Ollama dengan `keep_alive`) hanya perlu mengevaluasi giliran
+    terakhir, bukan seluruh riwayat.
+
+    Jika perkiraan token riwayat melewati `max_context_tokens`, giliran
+    terlama dibuang sekaligus sampai tersisa `trim_ratio` dari anggaran.
+    Prefix hanya berubah saat pemangkasan itu, bukan di setiap ucapan.
+    Statistik token panggilan terakhir ada di `last_usage`.
+
+    Key cache terjemahan hanya memuat `cache_context_turns` giliran terakhir
+    (dan tanpa konteks untuk frasa pendek sampai `short_phrase_words` kata),
+    bukan seluruh riwayat, agar frasa yang berulang dalam satu meeting tetap
+    bisa kena cache.
+    """
+    def __init__(self, max_context_tokens=1024, cache=None, backend=None, trim_ratio=0.5,
+                 system_prompt=SYSTEM_PROMPT, cache_context_turns=1, short_phrase_words=3):
+        self.cache = cache  # TranslationCache opsional, boleh dipakai bersama antar sesi
+        self.backend = backend if backend is not None else OllamaBackend()
+        self.max_context_tokens = max_context_tokens
+        self.trim_ratio = trim_ratio
+        self.system_prompt = system_prompt
+        self.cache_context_turns = cache_context_turns
+        self.short_phrase_words = short_phrase_words
+        self.context_history = []  # ContextTurn, terlama di depan
+        self.context_tokens = 0
         self.current_context = ""
+        self.last_usage = None
     
-    def update_context(self, new_text):
-        """Update konteks dengan teks baru"""
+    def update_context(self, new_text, target_lang=None, translation=None):
+        """Tambahkan giliran baru ke konteks, pangkas jika melewati anggaran token"""
         if not new_text.strip():
             return self.current_context
-            
-        # Tambahkan teks baru ke history
-        self.context_history.append(new_text.strip())
         
-        # Pertahankan ukuran history sesuai batas
-        if len(self.context_history) > self.max_context_length:
-            self.context_history.pop(0)
-            
-        # Perbarui konteks saat ini
-        self.current_context = " ".join(self.context_history)
+        turn_text = new_text.strip()
+        tokens = self.backend.count_tokens(request_message(turn_text, target_lang or ""))
+        if translation:
+            tokens += self.backend.count_tokens(translation)
+        self.context_history.append(ContextTurn(turn_text, target_lang, translation, tokens))
+        self.context_tokens += tokens
+        
+        if self.context_tokens > self.max_context_tokens:
+            # Pangkas sekaligus ke bawah anggaran agar prefix stabil untuk beberapa giliran berikutnya
+            target = self.max_context_tokens * self.trim_ratio
+            while self.context_history and self.context_tokens > target:
+                self.context_tokens -= self.context_history.pop(0).tokens
+        
+        # Teks sumber dalam konteks, dipakai juga sebagai bagian key cache
+        self.current_context = " ".join(turn.text for turn in self.context_history)
         return self.current_context
     
     def get_context(self):
@@ -27,47 +102,125 @@ class ContextAwareTranslator:
     def clear_context(self):
         """Bersihkan konteks"""
         self.context_history = []
+        self.context_tokens = 0
         self.current_context = ""
         return self.current_context
     
+    def cache_context(self, text):
+        """Potongan konteks yang ikut menentukan key cache untuk `text`"""
+        if len(text.split()) <= self.short_phrase_words or self.cache_context_turns <= 0:
+            return ""
+        recent = self.context_history[-self.cache_context_turns:]
+        return " ".join(turn.text for turn in recent)
+    
+    def build_messages(self, text, target_lang):
+        """Susun pesan chat: system prompt tetap, giliran konteks, lalu kalimat baru"""
+        messages = [{'role': 'system', 'content': self.system_prompt}]
+        for turn in self.context_history:
+            if not turn.translation:
+                continue
+            messages.append({
+                'role': 'user', 'content': request_message(turn.text, turn.target_lang)
+            })
+            messages.append({'role': 'assistant', 'content': turn.translation})
+        messages.append({'role': 'user', 'content': request_message(text, target_lang)})
+        return messages
+    
+    def _start_usage(self, messages):
+        """Dict usage untuk satu panggilan backend, diisi backend setelah selesai"""
+        usage = {
+            'prompt_tokens': sum(self.backend.count_tokens(m['content']) for m in messages),
+            'context_tokens': self.context_tokens,
+        }
+        self.last_usage = usage
+        return usage
+    
     def translate_with_context(self, text, ollama_model, target_lang):
-        """Terjemahkan teks dengan mempertimbangkan konteks"""
+        """Terjemahkan teks dengan mempertimbangkan konteks
+
+        ollama_model=None memakai model default backend.
+        """
         if not text.strip():
             return ""
-            
-        # Siapkan prompt dengan konteks
-        if self.current_context:
-            prompt = f"""
-            Konteks sebelumnya: {self.current_context}
-            Terjemahkan kalimat berikut ke {target_lang}: "{text}"
-            Pastikan terjemahan sesuai dengan konteks dan terdengar alami.
-            Hanya kembalikan terjemahannya saja tanpa tambahan apapun.
-            """
-        else:
-            prompt = f"""
-            Terjemahkan kalimat berikut ke {target_lang}: "{text}"
-            Hanya kembalikan terjemahannya saja tanpa tambahan apapun.
-            """
+        ollama_model = ollama_model or self.backend.model
         
-        # Gunakan Ollama untuk terjemahan
-        try:
-            response = ollama.chat(model=ollama_model, messages=[
-                {
-                    'role': 'system',
-                    'content': 'Anda adalah penerjemah yang ahli. Terjemahkan teks dengan mempertimbangkan konteks yang diberikan.'
-                },
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ])
+        # Cek cache sebelum memanggil LLM
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_cache_key(text, target_lang, ollama_model, self.cache_context(text))
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.last_usage = None
+                self.update_context(text, target_lang, cached)
+                return cached
             
-            translated_text = response['message']['content'].strip()
+        # Gunakan backend LLM untuk terjemahan
+        try:
+            messages = self.build_messages(text, target_lang)
+            translated_text = self.backend.chat(
+                messages, model=ollama_model, usage=self._start_usage(messages)
+            ).strip()
+            if cache_key is not None and translated_text:
+                self.cache.put(cache_key, translated_text)
             
-            # Perbarui konteks dengan teks asli (bukan terjemahan)
-            self.update_context(text)
+            # Terjemahan ikut masuk konteks sebagai jawaban assistant
+            self.update_context(text, target_lang, translated_text)
             
             return translated_text
         except Exception as e:
             print(f"Error dalam terjemahan: {e}")
-            return text  # Fallback ke teks asli jika terjemahan gagal
\ No newline at end of file
+            return text  # Fallback ke teks asli jika terjemahan gagal
+    
+    def translate_with_context_stream(self, text, ollama_model, target_lang, min_clause_chars=40):
+        """Terjemahkan secara streaming, yield tiap kalimat/klausa begitu selesai
+
+        Token dari backend dikumpulkan dan dipotong di batas kalimat (atau
+        klausa yang cukup panjang) sehingga TTS bisa mulai mengucapkan potongan
+        pertama selagi LLM masih menghasilkan sisanya. Konteks dan cache
+        diperbarui setelah terjemahan lengkap diterima.
+        """
+        if not text.strip():
+            return
+        ollama_model = ollama_model or self.backend.model
+        
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_cache_key(text, target_lang, ollama_model, self.cache_context(text))
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.last_usage = None
+                self.update_context(text, target_lang, cached)
+                yield cached
+                return
+        
+        messages = self.build_messages(text, target_lang)
+        usage = self._start_usage(messages)
+        pieces = []
+        raw = []
+        buffer = ""
+        try:
+            for token in self.backend.chat(messages, model=ollama_model, stream=True, usage=usage):
+                raw.append(token)
+                buffer += token
+                segments, buffer = split_ready_segments(buffer, min_clause_chars)
+                for segment in segments:
+                    pieces.append(segment)
+                    yield segment
+            
+            if buffer.strip():
+                pieces.append(buffer.strip())
+                yield buffer.strip()
+        except Exception as e:
+            print(f"Error dalam terjemahan streaming: {e}")
+            if pieces:
+                self.update_context(text, target_lang, " ".join(pieces))
+            else:
+                yield text  # Fallback ke teks asli jika terjemahan gagal
+            return
+        
+        translated_text = " ".join(pieces)
+        if cache_key is not None and translated_text:
+            self.cache.put(cache_key, translated_text)
+        
+        # Konteks menyimpan keluaran mentah LLM agar prefix request berikutnya sama persis
+        self.update_context(text, target_lang, "".join(raw).strip())
\ No newline at end of file
@@ -0,0 +1,80 @@
+AUTO_LANGUAGES = (None, "", "auto")
+
+
+class SessionLanguage:
+    """Bahasa sumber yang dipakai Whisper untuk satu sesi
+
+    Jika client memilih bahasa sumber, bahasa itu langsung dipakai sehingga
+    Whisper tidak menjalankan deteksi bahasa. Di mode "auto", setiap decode
+    awalnya mendeteksi bahasa; setelah `confirmations` deteksi berturut-turut
+    dengan bahasa sama dan probabilitas minimal `min_probability`, bahasa itu
+    dikunci dan dipakai untuk decode berikutnya. Kunci dilepas (kembali
+    mendeteksi) jika `misses_to_redetect` decode berturut-turut punya
+    avg_logprob di bawah `min_logprob`, tanda bahasa yang dikunci tidak
+    cocok lagi dengan ucapan.
+
+    Tidak thread-safe; dipakai dari satu stage ASR milik sesi.
+    """
+    def __init__(self, requested=None, confirmations=3, min_probability=0.8,
+                 min_logprob=-1.0, misses_to_redetect=2):
+        self.confirmations = confirmations
+        self.min_probability = min_probability
+        self.min_logprob = min_logprob
+        self.misses_to_redetect = misses_to_redetect
+        self.requested = None
+        self._reset()
+        self.set_requested(requested)
+
+    def _reset(self):
+        self.locked = None
+        self.candidate = None
+        self.streak = 0
+        self.misses = 0
+
+    def set_requested(self, language):
+        """Bahasa sumber dari client; perubahan me-reset deteksi"""
+        language = None if language in AUTO_LANGUAGES else language
+        if language != self.requested:
+            self.requested = language
+            self._reset()
+
+    @property
+    def auto(self):
+        return self.requested is None
+
+    def decode_language(self):
+        """Bahasa untuk decode berikutnya, None berarti Whisper harus mendeteksi"""
+        return self.requested or self.locked
+
+    def observe(self, language, probability=None, avg_logprob=None):
+        """Perbarui status dari hasil decode (abaikan hasil tanpa teks)
+
+        probability None berarti Whisper tidak melaporkan probabilitas
+        deteksi (misalnya transcribe() per jendela); deteksi semacam itu
+        tetap dihitung.
+        """
+        if not self.auto:
+            return
+        if self.locked is not None:
+            if avg_logprob is not None and avg_logprob < self.min_logprob:
+                self.misses += 1
+                if self.misses >= self.misses_to_redetect:
+                    print(f"Keyakinan rendah untuk bahasa {self.locked}, deteksi ulang")
+                    self._reset()
+            else:
+                self.misses = 0
+            return
+
+        if not language or (probability is not None and probability < self.min_probability):
+            self.candidate = None
+            self.streak = 0
+            return
+        if language == self.candidate:
+            self.streak += 1
+        else:
+            self.candidate = language
+            self.streak = 1
+        if self.streak >= self.confirmations:
+            self.locked = language
+            self.misses = 0
+            print(f"Bahasa sumber terdeteksi dan dikunci: {language}")
@@ -0,0 +1,265 @@
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+
+from audio_codec import DEFAULT_PREFERENCE
+from client_connection import ClientConnection
+from protocol import (
+    ProtocolError, MSG_TRANSCRIPT, MSG_TRANSLATION, MSG_TTS_AUDIO, MSG_STATUS, FLAG_PARTIAL,
+    now_us, payload_to_status, payload_to_text,
+)
+from replay_audio import SAMPLE_RATE, load_replay_audio, paced_chunks
+
+MESSAGE_NAMES = {
+    MSG_TRANSCRIPT: "transcript",
+    MSG_TRANSLATION: "translation",
+    MSG_TTS_AUDIO: "tts_audio",
+    MSG_STATUS: "status",
+}
+
+
+class LoadSession:
+    """Satu client headless: kirim audio dengan pacing real-time, catat semua respons
+
+    Mengirim lewat ClientConnection yang sama dengan client GUI. Setiap
+    frame yang dikirim dicatat (seq, timestamp), setiap frame dari server
+    dicatat beserta latensinya (waktu terima - timestamp capture yang
+    dibawa balik server).
+    """
+    def __init__(self, index, host, port, source_lang, target_lang, chunk=4096, speed=1.0,
+                 codecs=None):
+        self.index = index
+        self.host = host
+        self.port = port
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.chunk = chunk
+        self.speed = speed
+        self.codecs = codecs
+        self.codec = None
+        self.bytes_sent = 0
+        self.sends = []
+        self.responses = []
+        self.error = None
+
+    def run(self, audio, start_delay=0.0, drain_timeout=60.0):
+        time.sleep(start_delay)
+        try:
+            connection = ClientConnection(self.host, self.port, timeout=10.0, codecs=self.codecs)
+        except OSError as e:
+            self.error = f"connect: {e}"
+            return
+        self.codec = connection.codec
+        receiver = threading.Thread(target=self._receive, args=(connection,), daemon=True)
+        receiver.start()
+        try:
+            for _, chunk in paced_chunks(audio, self.chunk, self.speed):
+                seq, timestamp_us = connection.send_audio(chunk, self.source_lang, self.target_lang)
+                self.sends.append((seq, timestamp_us))
+        except OSError as e:
+            self.error = f"send: {e}"
+        self.bytes_sent = connection.bytes_sent
+        connection.finish_sending()
+        receiver.join(drain_timeout)
+        connection.close()
+
+    def _receive(self, connection):
+        try:
+            for header, payload in connection.frames():
+                received_us = now_us()
+                response = {
+                    "type": MESSAGE_NAMES.get(header.msg_type, header.msg_type),
+                    "utterance": header.seq,
+                    "received_us": received_us,
+                }
+                if header.msg_type == MSG_STATUS:
+                    response["status"] = payload_to_status(payload)
+                else:
+                    response["capture_us"] = header.timestamp_us
+                    response["latency_ms"] = (
+                        (received_us - header.timestamp_us) / 1000 if header.timestamp_us else None
+                    )
+                    response["partial"] = bool(header.flags & FLAG_PARTIAL)
+                    if header.msg_type in (MSG_TRANSCRIPT, MSG_TRANSLATION):
+                        response["text"] = payload_to_text(payload)
+                    else:
+                        response["bytes"] = len(payload)
+                self.responses.append(response)
+        except (OSError, ProtocolError) as e:
+            if self.error is None:
+                self.error = f"receive: {e}"
+
+    def latencies(self, kind):
+        return [
+            r["latency_ms"] for r in self.responses
+            if r["type"] == kind and not r.get("partial") and r.get("latency_ms") is not None
+        ]
+
+    def to_dict(self):
+        return {
+            "index": self.index,
+            "source_lang": self.source_lang,
+            "target_lang": self.target_lang,
+            "error": self.error,
+            "codec": self.codec,
+            "bytes_sent": self.bytes_sent,
+            "sends": [{"seq": seq, "timestamp_us": ts} for seq, ts in self.sends],
+            "responses": self.responses,
+        }
+
+
+def latency_summary(values):
+    if not values:
+        return {"count": 0}
+    values = np.asarray(values)
+    return {
+        "count": int(len(values)),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
+
+
+def parse_pairs(text):
+    """"id:en,en:ja" -> [("id", "en"), ("en", "ja")]"""
+    pairs = []
+    for item in text.split(","):
+        source, _, target = item.strip().partition(":")
+        if not source or not target:
+            raise argparse.ArgumentTypeError(f"Pasangan bahasa tidak valid: {item!r}")
+        pairs.append((source, target))
+    return pairs
+
+
+def run_step(args, audio, count):
+    """Jalankan `count` sesi bersamaan selama satu langkah beban"""
+    sessions = []
+    threads = []
+    for i in range(count):
+        source, target = args.pairs[i % len(args.pairs)]
+        session = LoadSession(
+            i, args.host, args.port, source, target, args.chunk, args.speed, args.codecs
+        )
+        # Awal sesi diacak agar ucapan antar sesi tidak selalu bersamaan
+        delay = random.uniform(0, args.stagger)
+        thread = threading.Thread(target=session.run, args=(audio, delay, args.drain_timeout))
+        sessions.append(session)
+        threads.append(thread)
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies = {
+        kind: latency_summary([v for s in sessions for v in s.latencies(kind)])
+        for kind in ("transcript", "translation", "tts_audio")
+    }
+    errors = [f"sesi {s.index}: {s.error}" for s in sessions if s.error]
+    sla_value = latencies[args.sla_metric].get(f"p{args.sla_percentile}_ms")
+    return {
+        "sessions": count,
+        "wall_seconds": wall,
+        "frames_sent": sum(len(s.sends) for s in sessions),
+        "bytes_sent": sum(s.bytes_sent for s in sessions),
+        "codecs": sorted({s.codec for s in sessions if s.codec}),
+        "responses": sum(len(s.responses) for s in sessions),
+        "latency": latencies,
+        "errors": errors,
+        "sla_ms": args.sla_ms,
+        "sla_value_ms": sla_value,
+        "within_sla": sla_value is not None and sla_value <= args.sla_ms and not errors,
+        "session_logs": [s.to_dict() for s in sessions],
+    }
+
+
+def print_step(step):
+    tts = step["latency"]["tts_audio"]
+    transcript = step["latency"]["transcript"]
+    verdict = "OK" if step["within_sla"] else "MELEWATI SLA"
+    print(
+        f"{step['sessions']:4d} sesi | frame {step['frames_sent']:6d} | respons {step['responses']:6d} "
+        f"| transkrip p95 {transcript.get('p95_ms', float('nan')):8.0f} ms "
+        f"| audio p50 {tts.get('p50_ms', float('nan')):8.0f} ms p95 {tts.get('p95_ms', float('nan')):8.0f} ms "
+        f"| uplink {step['bytes_sent'] / 1024:8.0f} KB {'/'.join(step['codecs'])} "
+        f"| error {len(step['errors'])} | {verdict}"
+    )
+    for error in step["errors"][:5]:
+        print(f"    {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load generator headless: banyak sesi client dengan audio replay"
+    )
+    parser.add_argument("wav", nargs="*", help="File WAV input (default sinyal uji sintetis)")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=12345)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16],
+                        help="Jumlah sesi per langkah beban, dijalankan berurutan")
+    parser.add_argument("--pairs", type=parse_pairs, default=parse_pairs("id:en,en:id,ja:en,ko:en"),
+                        help="Pasangan bahasa sumber:tujuan, dibagi bergiliran ke sesi")
+    parser.add_argument("--duration", type=float, default=60.0,
+                        help="Lama setiap sesi mengirim audio (detik), input diulang jika kurang")
+    parser.add_argument("--speed", type=float, default=1.0, help="Pacing relatif real-time")
+    parser.add_argument("--chunk", type=int, default=4096,
+                        help="Sampel per frame (sama dengan client GUI)")
+    parser.add_argument("--codec", choices=("auto",) + DEFAULT_PREFERENCE, default="auto",
+                        help="Codec audio ke server; auto = server memilih dari semua codec")
+    parser.add_argument("--stagger", type=float, default=2.0,
+                        help="Awal sesi diacak dalam rentang ini (detik)")
+    parser.add_argument("--drain-timeout", type=float, default=60.0,
+                        help="Waktu tunggu respons setelah audio habis dikirim")
+    parser.add_argument("--sla-ms", type=float, default=3000.0)
+    parser.add_argument("--sla-metric", choices=("transcript", "translation", "tts_audio"),
+                        default="tts_audio")
+    parser.add_argument("--sla-percentile", type=int, choices=(50, 95, 99), default=95)
+    parser.add_argument("--keep-going", action="store_true",
+                        help="Lanjutkan langkah berikutnya walau SLA sudah terlewati")
+    parser.add_argument("--json", default=None,
+                        help="Simpan hasil lengkap (termasuk log kirim/terima per sesi) ke file JSON")
+    args = parser.parse_args()
+    args.codecs = None if args.codec == "auto" else (args.codec,)
+
+    audio = load_replay_audio(args.wav, args.duration)
+    audio = np.resize(audio, int(args.duration * SAMPLE_RATE))
+    print(
+        f"{args.duration:.0f} detik audio per sesi, pasangan bahasa "
+        f"{', '.join(f'{s}->{t}' for s, t in args.pairs)}, SLA {args.sla_metric} "
+        f"p{args.sla_percentile} <= {args.sla_ms:.0f} ms"
+    )
+
+    steps = []
+    max_within_sla = 0
+    for count in args.sessions:
+        step = run_step(args, audio, count)
+        steps.append(step)
+        print_step(step)
+        if step["within_sla"]:
+            max_within_sla = max(max_within_sla, count)
+        elif not args.keep_going:
+            break
+
+    print(f"Sesi maksimum dalam SLA: {max_within_sla}")
+    if args.json:
+        result = {
+            "config": {k: v for k, v in vars(args).items() if k != "json"},
+            "max_sessions_within_sla": max_within_sla,
+            "steps": steps,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Hasil disimpan ke {args.json}")
+    return 0 if max_within_sla else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+
+from protocol import now_us
+
+# Batas bucket histogram latensi (detik) dan real-time factor
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0)
+# Batas bucket jumlah token prompt LLM per terjemahan
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+# Urutan titik waktu dalam satu ucapan; durasi stage = selisih dua titik berurutan
+TRACE_POINTS = (
+    "received", "vad", "asr_start", "asr", "translate_start", "translate",
+    "tts_start", "tts", "playback",
+)
+STAGE_NAMES = {
+    ("received", "vad"): "vad",
+    ("vad", "asr_start"): "asr_queue",
+    ("asr_start", "asr"): "asr",
+    ("asr", "translate_start"): "translate_queue",
+    ("translate_start", "translate"): "translate",
+    ("translate", "tts_start"): "tts_queue",
+    ("tts_start", "tts"): "tts",
+    ("tts", "playback"): "playback",
+}
+# Stage yang dikerjakan ulang per potongan terjemahan streaming
+PIECE_STAGES = ("translate", "tts_queue", "tts", "playback")
+
+
+class Histogram:
+    """Histogram kumulatif (gaya Prometheus) plus sampel terakhir untuk persentil"""
+    def __init__(self, buckets, recent=1024):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Bucket terakhir = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=recent)
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            index = len(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    index = i
+                    break
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            self.recent.append(value)
+
+    def snapshot(self):
+        """Ringkasan: count, sum, mean, p50/p95/p99 dari sampel terakhir, bucket kumulatif"""
+        with self._lock:
+            recent = sorted(self.recent)
+            counts = list(self.counts)
+            count, total = self.count, self.sum
+
+        def percentile(q):
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(q * len(recent)))]
+
+        cumulative = []
+        running = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            running += n
+            cumulative.append((bound, running))
+        return {
+            "count": count,
+            "sum": total,
+            "mean": total / count if count else 0.0,
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "buckets": cumulative,
+        }
+
+
+class UtteranceTrace:
+    """Titik waktu satu ucapan dari capture di client sampai diputar/dikirim
+
+    capture_us memakai jam client (time.time() mikrodetik); titik lain
+    memakai time.perf_counter() server. audio_s adalah durasi audio input
+    (untuk RTF ASR), speech_s durasi audio hasil TTS. asr_s adalah total
+    waktu decode ASR untuk ucapan ini jika berbeda dari durasi stage "asr",
+    misalnya ASR streaming yang men-decode ulang jendelanya di setiap potongan.
+
+    Di terjemahan streaming satu ucapan menghasilkan beberapa trace.
+    Potongan kedua dan seterusnya (primary=False, lihat next_piece) hanya
+    menyumbang durasi terjemahan dan TTS miliknya sendiri ke metrik.
+    """
+    __slots__ = ("capture_us", "points", "audio_s", "speech_s", "asr_s", "primary")
+
+    def __init__(self, capture_us=None, received=None):
+        self.capture_us = capture_us
+        self.points = {}
+        if received is not None:
+            self.points["received"] = received
+        self.audio_s = None
+        self.speech_s = None
+        self.asr_s = None
+        self.primary = True
+
+    def mark(self, point):
+        self.points[point] = time.perf_counter()
+
+    def copy(self):
+        """Salinan untuk potongan terjemahan dari ucapan yang sama"""
+        trace = UtteranceTrace(self.capture_us)
+        trace.points = dict(self.points)
+        trace.audio_s = self.audio_s
+        trace.speech_s = self.speech_s
+        trace.asr_s = self.asr_s
+        trace.primary = self.primary
+        return trace
+
+    def next_piece(self, translate_start):
+        """Trace potongan terjemahan berikutnya; durasi terjemahannya dihitung sejak `translate_start`
+
+        translate_start biasanya titik "translate" potongan sebelumnya.
+        """
+        trace = self.copy()
+        trace.primary = False
+        trace.audio_s = None
+        trace.asr_s = None
+        trace.points["translate_start"] = translate_start
+        return trace
+
+    def durations(self):
+        """Durasi per stage (detik) untuk titik yang tercatat"""
+        present = [p for p in TRACE_POINTS if p in self.points]
+        result = {}
+        for start, end in zip(present, present[1:]):
+            name = STAGE_NAMES.get((start, end))
+            if name is not None:
+                result[name] = self.points[end] - self.points[start]
+        return result
+
+
+class ServerMetrics:
+    """Agregasi latensi per stage, RTF dan gauge server dalam proses
+
+    record() dipanggil dari thread pipeline setelah ucapan selesai. Gauge
+    (jumlah sesi, antrian, statistik cache, ...) dibaca saat diminta dari
+    collector: fungsi tanpa argumen yang return list (nama, label, nilai).
+    """
+    def __init__(self):
+        self.started = time.time()
+        self.stages = {}
+        self.rtf = {}
+        # Token prompt per terjemahan: "evaluated" = dievaluasi backend (di luar
+        # prefix ter-cache), "prompt" = perkiraan ukuran seluruh prompt
+        self.prompt_tokens = {}
+        self.utterances = 0
+        self.audio_seconds = 0.0
+        self.compute_seconds = 0.0
+        self.collectors = []
+        self._lock = threading.Lock()
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def _histogram(self, table, name, buckets):
+        with self._lock:
+            histogram = table.get(name)
+            if histogram is None:
+                histogram = table[name] = Histogram(buckets)
+            return histogram
+
+    def observe_stage(self, stage, seconds):
+        self._histogram(self.stages, stage, LATENCY_BUCKETS).observe(seconds)
+
+    def observe_rtf(self, stage, value):
+        self._histogram(self.rtf, stage, RTF_BUCKETS).observe(value)
+
+    def observe_prompt(self, usage):
+        """Masukkan statistik token satu panggilan LLM (ContextAwareTranslator.last_usage)"""
+        if usage.get("prompt_eval_count") is not None:
+            self._histogram(self.prompt_tokens, "evaluated", TOKEN_BUCKETS).observe(
+                usage["prompt_eval_count"]
+            )
+        if usage.get("prompt_tokens") is not None:
+            self._histogram(self.prompt_tokens, "prompt", TOKEN_BUCKETS).observe(
+                usage["prompt_tokens"]
+            )
+        if usage.get("prompt_eval_s") is not None:
+            self.observe_stage("prompt_eval", usage["prompt_eval_s"])
+
+    def record(self, trace):
+        """Masukkan trace ucapan yang sudah selesai ke histogram
+
+        Trace potongan lanjutan (primary=False) hanya menambah durasi
+        PIECE_STAGES dan waktu komputasinya, tanpa menghitung ulang ucapan,
+        durasi audio, VAD/ASR atau latensi end-to-end.
+        """
+        durations = trace.durations()
+        if not trace.primary:
+            durations = {k: v for k, v in durations.items() if k in PIECE_STAGES}
+        for stage, seconds in durations.items():
+            self.observe_stage(stage, seconds)
+        points = trace.points
+        if trace.primary and "received" in points and "playback" in points:
+            self.observe_stage("server_total", points["playback"] - points["received"])
+        if trace.primary and trace.capture_us:
+            self.observe_stage("capture_to_playback", (now_us() - trace.capture_us) / 1e6)
+
+        asr = durations.get("asr", 0.0) if trace.asr_s is None else trace.asr_s
+        compute = asr + durations.get("translate", 0.0) + durations.get("tts", 0.0)
+        if trace.primary and trace.audio_s:
+            if "asr" in durations:
+                self.observe_rtf("asr", asr / trace.audio_s)
+            self.observe_rtf("pipeline", compute / trace.audio_s)
+        if trace.speech_s and "tts" in durations:
+            self.observe_rtf("tts", durations["tts"] / trace.speech_s)
+        with self._lock:
+            if trace.primary:
+                self.utterances += 1
+            if trace.audio_s:
+                self.audio_seconds += trace.audio_s
+            self.compute_seconds += compute
+
+    def gauges(self):
+        samples = []
+        for collector in self.collectors:
+            try:
+                samples.extend(collector())
+            except Exception as e:
+                print(f"Error membaca metrik: {e}")
+        return samples
+
+    def to_dict(self):
+        with self._lock:
+            stages = dict(self.stages)
+            rtf = dict(self.rtf)
+            prompt_tokens = dict(self.prompt_tokens)
+            summary = {
+                "uptime_s": time.time() - self.started,
+                "utterances": self.utterances,
+                "audio_seconds": self.audio_seconds,
+                "rtf": self.compute_seconds / self.audio_seconds if self.audio_seconds else 0.0,
+            }
+
+        def strip(snapshot):
+            snapshot = dict(snapshot)
+            del snapshot["buckets"]
+            return snapshot
+
+        summary["stages"] = {name: strip(h.snapshot()) for name, h in stages.items()}
+        summary["stage_rtf"] = {name: strip(h.snapshot()) for name, h in rtf.items()}
+        summary["prompt_tokens"] = {name: strip(h.snapshot()) for name, h in prompt_tokens.items()}
+        gauges = {}
+        for name, labels, value in self.gauges():
+            key = name + "".join(f"[{k}={v}]" for k, v in sorted(labels.items()))
+            gauges[key] = value
+        summary["gauges"] = gauges
+        return summary
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self):
+        """Format eksposisi teks Prometheus 0.0.4"""
+        lines = []
+        with self._lock:
+            stages = dict(self.stages)
+            rtf = dict(self.rtf)
+            prompt_tokens = dict(self.prompt_tokens)
+            utterances = self.utterances
+            audio_seconds = self.audio_seconds
+            compute_seconds = self.compute_seconds
+
+        for metric, table, label in (
+            ("translator_stage_latency_seconds", stages, "stage"),
+            ("translator_real_time_factor", rtf, "stage"),
+            ("translator_prompt_tokens", prompt_tokens, "kind"),
+        ):
+            lines.append(f"# TYPE {metric} histogram")
+            for name, histogram in sorted(table.items()):
+                snapshot = histogram.snapshot()
+                for bound, count in snapshot["buckets"]:
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{metric}_bucket{{{label}="{name}",le="{le}"}} {count}')
+                lines.append(f'{metric}_sum{{{label}="{name}"}} {snapshot["sum"]}')
+                lines.append(f'{metric}_count{{{label}="{name}"}} {snapshot["count"]}')
+
+        for metric, value in (
+            ("translator_utterances_total", utterances),
+            ("translator_audio_seconds_total", audio_seconds),
+            ("translator_compute_seconds_total", compute_seconds),
+        ):
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+
+        # Sampel satu metrik harus berurutan di bawah satu baris TYPE
+        grouped = {}
+        for name, labels, value in self.gauges():
+            grouped.setdefault(name, []).append((labels, value))
+        for name, samples in grouped.items():
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+async def serve_metrics(metrics, host, port):
+    """Server HTTP minimal di port samping: /metrics (Prometheus) dan /stats (JSON)"""
+    async def handle(reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), 5.0)
+            # Abaikan header sampai baris kosong
+            while True:
+                line = await asyncio.wait_for(reader.readline(), 5.0)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+            parts = request.decode("latin-1").split()
+            path = parts[1].split("?")[0] if len(parts) >= 2 else "/"
+            if path == "/metrics":
+                status, content_type, body = "200 OK", "text/plain; version=0.0.4", metrics.to_prometheus()
+            elif path in ("/", "/stats"):
+                status, content_type, body = "200 OK", "application/json", metrics.to_json()
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", "not found\n"
+            body = body.encode("utf-8")
+            writer.write(
+                f"HTTP/1.0 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1")
+                + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    print(f"Metrik tersedia di http://{host}:{port}/metrics dan /stats")
+    return server
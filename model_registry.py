@@ -0,0 +1,267 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+def estimate_model_bytes(model):
+    """Perkirakan memori model dari parameter dan buffer torch di dalamnya
+
+    Menerima nn.Module atau objek pembungkus yang menyimpan modul di atribut
+    (misalnya Synthesizer.tts_model atau WhisperBatchScheduler.model).
+    Return 0 jika tidak ada tensor yang bisa dihitung.
+    """
+    seen = set()
+    total = 0
+    stack = [model]
+    while stack:
+        obj = stack.pop()
+        if obj is None or id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if hasattr(obj, "parameters") and hasattr(obj, "buffers"):
+            tensors = list(obj.parameters()) + list(obj.buffers())
+            # Bobot layer terkuantisasi (misalnya Linear int8 dinamis) disimpan
+            # sebagai packed params, bukan parameter
+            for module in obj.modules():
+                if hasattr(module, "_weight_bias"):
+                    tensors.extend(t for t in module._weight_bias() if t is not None)
+            total += sum(t.numel() * t.element_size() for t in tensors)
+            continue
+        for name in ("model", "tts_model", "vocoder_model", "synthesizer"):
+            stack.append(getattr(obj, name, None))
+    return total
+
+
+class _Entry:
+    __slots__ = ("key", "model", "size", "refs", "loaded", "error", "last_used")
+
+    def __init__(self, key):
+        self.key = key
+        self.model = None
+        self.size = 0
+        self.refs = 0
+        self.loaded = threading.Event()
+        self.error = None
+        self.last_used = time.monotonic()
+
+
+class ModelRegistry:
+    """Model yang dimuat sesuai permintaan dengan anggaran memori dan eviksi LRU
+
+    Model diidentifikasi dengan key (kind, name, language); language None
+    berarti model multibahasa. Setiap kind punya loader(name, language) dan
+    opsional unloader(model) yang dipanggil saat model dikeluarkan (misalnya
+    untuk menghentikan thread worker). Ukuran model diukur setelah dimuat
+    dengan estimate_model_bytes, atau memakai `size_hint` loader jika tidak
+    bisa diukur; size_hint juga dipakai untuk mengosongkan ruang sebelum
+    memuat.
+
+    Model yang sedang dipakai (acquire() tanpa release()) atau di-pin tidak
+    pernah dikeluarkan. Jika semua model resident sedang dipakai, anggaran
+    boleh terlampaui sementara daripada menolak request. Beberapa thread yang
+    meminta model yang sama saat sedang dimuat menunggu satu pemuatan yang
+    sama.
+    """
+    def __init__(self, memory_budget_bytes):
+        self.memory_budget = memory_budget_bytes
+        self._loaders = {}  # kind -> (loader, unloader, size_hint)
+        self._entries = OrderedDict()  # key -> _Entry, urutan LRU (terlama di depan)
+        self._pinned = set()
+        self._lock = threading.Lock()
+
+        self.loads = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_errors = 0
+        self.load_time = 0.0
+
+    def register_loader(self, kind, loader, unloader=None, size_hint=0):
+        """Daftarkan cara memuat model jenis `kind`
+
+        size_hint boleh berupa angka atau fungsi(name, language) -> byte.
+        """
+        self._loaders[kind] = (loader, unloader, size_hint)
+
+    def acquire(self, kind, name, language=None):
+        """Ambil model (memuat jika perlu) dan pin sampai release() dipanggil"""
+        key = (kind, name, language)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refs += 1
+                self._entries.move_to_end(key)
+                self.hits += 1
+                load = False
+            else:
+                entry = _Entry(key)
+                entry.refs = 1
+                self._entries[key] = entry
+                self.misses += 1
+                load = True
+
+        if load:
+            self._load(entry)
+        else:
+            entry.loaded.wait()
+
+        if entry.error is not None:
+            self._release_entry(entry)
+            raise entry.error
+        return entry.model
+
+    def release(self, kind, name, language=None):
+        """Lepas pin dari acquire(); model tetap resident sampai perlu dikeluarkan"""
+        with self._lock:
+            entry = self._entries.get((kind, name, language))
+        if entry is not None:
+            self._release_entry(entry)
+
+    def _release_entry(self, entry):
+        evicted = []
+        with self._lock:
+            entry.refs -= 1
+            entry.last_used = time.monotonic()
+            if entry.error is not None:
+                # Pemuatan gagal: buang entri agar request berikutnya mencoba lagi
+                if entry.refs <= 0 and self._entries.get(entry.key) is entry:
+                    del self._entries[entry.key]
+            else:
+                evicted = self._evict_locked(0)
+        self._unload(evicted)
+
+    def use(self, kind, name, language=None):
+        """Context manager: `with registry.use("asr", "base") as model: ...`"""
+        return _ModelUse(self, kind, name, language)
+
+    def pin(self, kind, name, language=None):
+        """Tahan model agar tidak pernah dikeluarkan (misalnya model default)"""
+        with self._lock:
+            self._pinned.add((kind, name, language))
+
+    def unpin(self, kind, name, language=None):
+        with self._lock:
+            self._pinned.discard((kind, name, language))
+
+    def is_loaded(self, kind, name, language=None):
+        with self._lock:
+            entry = self._entries.get((kind, name, language))
+            return entry is not None and entry.loaded.is_set() and entry.error is None
+
+    def _size_hint(self, kind, name, language):
+        hint = self._loaders[kind][2]
+        return hint(name, language) if callable(hint) else hint
+
+    def _load(self, entry):
+        kind, name, language = entry.key
+        try:
+            if kind not in self._loaders:
+                raise KeyError(f"Tidak ada loader untuk model jenis {kind}")
+            loader = self._loaders[kind][0]
+            hint = self._size_hint(kind, name, language)
+
+            # Kosongkan ruang dulu agar puncak memori saat memuat tetap di bawah anggaran;
+            # selama dimuat, entri dihitung dengan ukuran perkiraan
+            with self._lock:
+                evicted = self._evict_locked(hint)
+                entry.size = hint
+            self._unload(evicted)
+
+            print(f"Memuat model {kind} {name} ({language or 'multibahasa'})...")
+            start = time.perf_counter()
+            model = loader(name, language)
+            elapsed = time.perf_counter() - start
+
+            size = estimate_model_bytes(model) or hint
+            with self._lock:
+                entry.model = model
+                entry.size = size
+                self.loads += 1
+                self.load_time += elapsed
+                evicted = self._evict_locked(0)
+            self._unload(evicted)
+            print(f"Model {kind} {name} dimuat dalam {elapsed:.1f} detik ({size / 2**20:.0f} MB)")
+        except Exception as e:
+            print(f"Gagal memuat model {kind} {name}: {e}")
+            with self._lock:
+                self.load_errors += 1
+            entry.error = e
+        finally:
+            entry.loaded.set()
+
+    def _resident_bytes_locked(self):
+        return sum(entry.size for entry in self._entries.values())
+
+    def _evict_locked(self, incoming):
+        """Pilih model LRU yang tidak dipakai sampai muat `incoming` byte tambahan"""
+        evicted = []
+        used = self._resident_bytes_locked()
+        for key in list(self._entries):
+            if used + incoming <= self.memory_budget:
+                break
+            entry = self._entries[key]
+            if entry.refs > 0 or key in self._pinned or not entry.loaded.is_set():
+                continue
+            del self._entries[key]
+            used -= entry.size
+            self.evictions += 1
+            evicted.append(entry)
+        return evicted
+
+    def _unload(self, entries):
+        """Panggil unloader di luar lock (bisa lambat, misalnya join thread)"""
+        for entry in entries:
+            kind, name, language = entry.key
+            unloader = self._loaders.get(kind, (None, None, 0))[1]
+            print(f"Mengeluarkan model {kind} {name} dari memori ({entry.size / 2**20:.0f} MB)")
+            if unloader is not None and entry.model is not None:
+                try:
+                    unloader(entry.model)
+                except Exception as e:
+                    print(f"Error mengeluarkan model {kind} {name}: {e}")
+            entry.model = None
+
+    def close(self):
+        """Keluarkan semua model (saat server berhenti)"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        self._unload([entry for entry in entries if entry.loaded.is_set()])
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "loads": self.loads,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "load_errors": self.load_errors,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "load_time_s": self.load_time,
+                "resident_bytes": self._resident_bytes_locked(),
+                "memory_budget": self.memory_budget,
+                "models": [
+                    {
+                        "kind": entry.key[0], "name": entry.key[1], "language": entry.key[2],
+                        "bytes": entry.size, "in_use": entry.refs,
+                        "pinned": entry.key in self._pinned,
+                    }
+                    for entry in self._entries.values()
+                ],
+            }
+
+
+class _ModelUse:
+    __slots__ = ("registry", "key")
+
+    def __init__(self, registry, kind, name, language):
+        self.registry = registry
+        self.key = (kind, name, language)
+
+    def __enter__(self):
+        return self.registry.acquire(*self.key)
+
+    def __exit__(self, *exc):
+        self.registry.release(*self.key)
+        return False
@@ -0,0 +1,341 @@
+import numpy as np
+
+# Coba import RNNoise, jika tidak tersedia gunakan denoiser spektral
+try:
+    from rnnoise import RNNoise
+    RNNOISE_AVAILABLE = True
+except ImportError:
+    RNNOISE_AVAILABLE = False
+
+# scipy (terpasang bersama librosa) dipakai untuk filter resampling RNNoise
+try:
+    from scipy.signal import firwin, lfilter
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+# numpy >= 2.0 bisa menulis hasil FFT ke buffer yang sudah ada (argumen out);
+# di versi lama rfft/irfft selalu mengalokasikan array hasil
+_FFT_HAS_OUT = np.lib.NumpyVersion(np.__version__) >= "2.0.0"
+
+
+class SpectralDenoiser:
+    """Noise suppression spektral streaming dengan profil noise berjalan
+
+    Audio diproses per frame `n_fft` dengan hop `n_fft // 2` dan jendela
+    sqrt-Hann di analisis maupun sintesis, sehingga overlap-add antar frame
+    (termasuk antar chunk) merekonstruksi sinyal tanpa klik di sambungan.
+    Sisa sampel yang belum genap satu hop disimpan untuk chunk berikutnya;
+    output tertinggal `n_fft - hop` sampel dari input.
+
+    Estimasi noise memakai minimum statistics: spektrum daya yang dihaluskan
+    dilacak minimumnya selama `min_window_s`, dan profil noise hanya
+    diperbarui ke arah minimum itu pada frame yang dianggap bukan ucapan
+    (daya di bawah `speech_ratio` kali profil noise). Jika minimum itu sendiri
+    bertahan di atas ambang selama setengah jendela, noise ruangan dianggap
+    naik dan frame diperlakukan sebagai non-ucapan agar profil tidak macet.
+    Gain dihitung dengan aturan Wiener decision-directed dan dibatasi
+    `gain_floor` agar tidak muncul musical noise.
+
+    Per hop tidak ada alokasi array: semua operasi menulis ke buffer yang
+    dialokasikan di __init__, kecuali FFT pada numpy < 2.0 yang belum
+    mendukung argumen `out`.
+    """
+    def __init__(self, sample_rate=16000, n_fft=512, min_window_s=1.5, subwindows=8,
+                 smoothing=0.85, noise_update=0.9, min_bias=1.5, speech_ratio=3.0,
+                 dd_alpha=0.98, gain_floor=0.1, init_frames=8):
+        self.sample_rate = sample_rate
+        self.n_fft = n_fft
+        self.hop = n_fft // 2
+        self.bins = n_fft // 2 + 1
+        self.smoothing = smoothing
+        self.noise_update = noise_update
+        self.min_bias = min_bias
+        self.speech_ratio = speech_ratio
+        self.dd_alpha = dd_alpha
+        self.gain_floor = gain_floor
+        self.init_frames = init_frames
+
+        window_frames = max(subwindows, int(min_window_s * sample_rate / self.hop))
+        self.subwindows = subwindows
+        self.subwindow_len = max(1, window_frames // subwindows)
+        self.recover_frames = max(1, window_frames // 2)
+
+        n = np.arange(n_fft)
+        self.window = np.sqrt(0.5 - 0.5 * np.cos(2.0 * np.pi * n / n_fft)).astype(np.float32)
+
+        # Semua buffer dialokasikan sekali di awal
+        self._pending = np.zeros(self.hop, dtype=np.float32)
+        self._input = np.zeros(n_fft, dtype=np.float32)
+        self._frame = np.zeros(n_fft, dtype=np.float64)
+        self._spectrum = np.zeros(self.bins, dtype=np.complex128)
+        self._synth = np.zeros(n_fft, dtype=np.float64)
+        self._ola = np.zeros(n_fft, dtype=np.float32)
+        self._power = np.zeros(self.bins, dtype=np.float64)
+        self._smoothed = np.zeros(self.bins, dtype=np.float64)
+        self._noise = np.zeros(self.bins, dtype=np.float64)
+        self._sub_min = np.zeros(self.bins, dtype=np.float64)
+        self._min_hist = np.zeros((subwindows, self.bins), dtype=np.float64)
+        self._post_snr = np.zeros(self.bins, dtype=np.float64)
+        self._prio_snr = np.zeros(self.bins, dtype=np.float64)
+        self._prev_clean = np.zeros(self.bins, dtype=np.float64)
+        self._gain = np.ones(self.bins, dtype=np.float64)
+        self._safe_noise = np.zeros(self.bins, dtype=np.float64)
+        self._floor = np.zeros(self.bins, dtype=np.float64)
+        self._scratch = np.zeros(self.bins, dtype=np.float64)
+
+        self.reset()
+
+    def reset(self):
+        """Buang semua state, termasuk profil noise"""
+        self._pending_len = 0
+        self._input[:] = 0.0
+        self._ola[:] = 0.0
+        self._prev_clean[:] = 0.0
+        self._frames = 0
+        self._sub_count = 0
+        self._hist_pos = 0
+        self._hist_filled = 0
+        self._floor_run = 0
+        self._freeze_noise = False
+        self.speech_frames = 0
+
+    @property
+    def latency(self):
+        """Delay output terhadap input dalam sampel"""
+        return self.n_fft - self.hop
+
+    def process(self, audio):
+        """Masukkan chunk audio, return audio bersih yang sudah siap (panjang kelipatan hop)"""
+        audio = np.asarray(audio, dtype=np.float32)
+        n_out = (self._pending_len + len(audio)) // self.hop
+        out = np.empty(n_out * self.hop, dtype=np.float32)
+        pos = 0
+        written = 0
+        while pos < len(audio):
+            take = min(self.hop - self._pending_len, len(audio) - pos)
+            self._pending[self._pending_len:self._pending_len + take] = audio[pos:pos + take]
+            self._pending_len += take
+            pos += take
+            if self._pending_len == self.hop:
+                self._process_hop(self._pending, out[written:written + self.hop])
+                written += self.hop
+                self._pending_len = 0
+        return out
+
+    def flush(self):
+        """Keluarkan sisa audio yang masih tertahan di buffer lalu reset state stream
+
+        Profil noise dipertahankan karena biasanya kondisi ruangan tidak berubah.
+        """
+        tail_len = self._pending_len + self.latency
+        # Padding nol tidak boleh ikut masuk ke estimasi noise
+        self._freeze_noise = True
+        try:
+            tail = self.process(np.zeros(self.n_fft, dtype=np.float32))[:tail_len]
+        finally:
+            self._freeze_noise = False
+        self._pending_len = 0
+        self._input[:] = 0.0
+        self._ola[:] = 0.0
+        return tail
+
+    def _process_hop(self, hop_samples, out):
+        hop = self.hop
+        self._input[:-hop] = self._input[hop:]
+        self._input[-hop:] = hop_samples
+        np.multiply(self._input, self.window, out=self._frame)
+
+        if _FFT_HAS_OUT:
+            spectrum = np.fft.rfft(self._frame, out=self._spectrum)
+        else:
+            spectrum = np.fft.rfft(self._frame)
+        np.abs(spectrum, out=self._power)
+        np.square(self._power, out=self._power)
+
+        if not self._freeze_noise:
+            self._update_noise()
+
+        # Gain Wiener dengan SNR a-priori decision-directed
+        noise = np.maximum(self._noise, 1e-12, out=self._safe_noise)
+        np.divide(self._power, noise, out=self._post_snr)
+        np.divide(self._prev_clean, noise, out=self._prio_snr)
+        self._prio_snr *= self.dd_alpha
+        # prio += (1 - alpha) * max(post - 1, 0), memakai _scratch sebagai buffer
+        np.subtract(self._post_snr, 1.0, out=self._scratch)
+        np.maximum(self._scratch, 0.0, out=self._scratch)
+        self._scratch *= 1.0 - self.dd_alpha
+        self._prio_snr += self._scratch
+        np.add(self._prio_snr, 1.0, out=self._gain)
+        np.divide(self._prio_snr, self._gain, out=self._gain)
+        np.maximum(self._gain, self.gain_floor, out=self._gain)
+        np.square(self._gain, out=self._prev_clean)
+        self._prev_clean *= self._power
+
+        spectrum *= self._gain
+        if _FFT_HAS_OUT:
+            synth = np.fft.irfft(spectrum, n=self.n_fft, out=self._synth)
+        else:
+            synth = np.fft.irfft(spectrum, n=self.n_fft)
+        synth *= self.window
+        np.add(self._ola, synth, out=self._ola, casting="same_kind")
+        out[:] = self._ola[:hop]
+        self._ola[:-hop] = self._ola[hop:]
+        self._ola[-hop:] = 0.0
+
+    def _update_noise(self):
+        """Perbarui minimum statistics dan profil noise dari spektrum frame ini"""
+        self._frames += 1
+        if self._frames == 1:
+            self._smoothed[:] = self._power
+            self._sub_min[:] = self._power
+        else:
+            self._smoothed *= self.smoothing
+            np.multiply(self._power, 1.0 - self.smoothing, out=self._scratch)
+            self._smoothed += self._scratch
+            np.minimum(self._sub_min, self._smoothed, out=self._sub_min)
+
+        # Minimum per sub-jendela disimpan di ring; minimum jendela penuh = min semua
+        self._sub_count += 1
+        if self._sub_count >= self.subwindow_len:
+            self._min_hist[self._hist_pos] = self._sub_min
+            self._hist_pos = (self._hist_pos + 1) % self.subwindows
+            self._hist_filled = min(self._hist_filled + 1, self.subwindows)
+            self._sub_min[:] = self._smoothed
+            self._sub_count = 0
+        floor = self._floor
+        floor[:] = self._sub_min
+        if self._hist_filled:
+            self._min_hist[:self._hist_filled].min(axis=0, out=self._scratch)
+            np.minimum(floor, self._scratch, out=floor)
+        floor *= self.min_bias
+
+        if self._frames <= self.init_frames:
+            # Bootstrap: anggap frame awal adalah noise
+            np.subtract(self._smoothed, self._noise, out=self._scratch)
+            self._scratch /= self._frames
+            self._noise += self._scratch
+            return
+
+        # Frame dianggap ucapan jika dayanya jauh di atas profil noise, kecuali
+        # minimum jendela juga sudah lama di atas ambang (noise ruangan naik)
+        threshold = self.speech_ratio * self._noise.sum()
+        self._floor_run = self._floor_run + 1 if floor.sum() > threshold else 0
+        if self._smoothed.sum() > threshold and self._floor_run < self.recover_frames:
+            self.speech_frames += 1
+            return
+        np.minimum(self._smoothed, floor, out=self._scratch)
+        self._scratch *= 1.0 - self.noise_update
+        self._noise *= self.noise_update
+        self._noise += self._scratch
+
+
+class RNNoiseDenoiser:
+    """Wrapper RNNoise streaming dengan framing 480 sampel yang benar
+
+    RNNoise hanya menerima frame tepat 480 sampel (10 ms) pada 48 kHz. Audio
+    dengan sample rate lebih rendah (harus pembagi bulat 48 kHz) di-upsample
+    per frame, diproses, lalu di-downsample kembali. Sisa sampel yang belum
+    genap satu frame disimpan untuk chunk berikutnya.
+
+    Resampling memakai filter FIR anti-aliasing yang sama dengan
+    scipy.signal.resample_poly (firwin, Kaiser beta 5), tetapi dijalankan
+    dengan lfilter yang state-nya dibawa antar frame; resample_poly per
+    frame 10 ms akan mem-pad nol di setiap tepi frame. Output tertinggal
+    `latency` sampel dari input.
+    """
+    FRAME_SIZE = 480
+    RNNOISE_RATE = 48000
+
+    def __init__(self, sample_rate=16000):
+        if self.RNNOISE_RATE % sample_rate:
+            raise ValueError(f"Sample rate tidak didukung RNNoise: {sample_rate}")
+        self.sample_rate = sample_rate
+        self.ratio = self.RNNOISE_RATE // sample_rate
+        self.frame_len = self.FRAME_SIZE // self.ratio
+        if self.ratio > 1 and not SCIPY_AVAILABLE:
+            raise ImportError("scipy dibutuhkan untuk resampling RNNoise")
+        self.denoiser = RNNoise()
+
+        # Parameter filter default resample_poly: half_len = 10 * rasio
+        self._half_len = 10 * self.ratio if self.ratio > 1 else 0
+        if self.ratio > 1:
+            self._taps = firwin(2 * self._half_len + 1, 1.0 / self.ratio, window=("kaiser", 5.0))
+        self._upsampled = np.zeros(self.FRAME_SIZE, dtype=np.float64)
+        self._pending = np.zeros(self.frame_len, dtype=np.float32)
+        self._pcm = np.zeros(self.FRAME_SIZE, dtype=np.int16)
+        self.reset()
+
+    def reset(self):
+        self._pending_len = 0
+        self._up_state = np.zeros(2 * self._half_len)
+        self._down_state = np.zeros(2 * self._half_len)
+
+    @property
+    def latency(self):
+        """Delay output terhadap input dalam sampel (group delay kedua filter)"""
+        return 2 * self._half_len // self.ratio
+
+    def process(self, audio):
+        """Masukkan chunk audio, return audio bersih untuk frame yang sudah genap"""
+        audio = np.asarray(audio, dtype=np.float32)
+        n_out = (self._pending_len + len(audio)) // self.frame_len
+        out = np.empty(n_out * self.frame_len, dtype=np.float32)
+        pos = 0
+        written = 0
+        while pos < len(audio):
+            take = min(self.frame_len - self._pending_len, len(audio) - pos)
+            self._pending[self._pending_len:self._pending_len + take] = audio[pos:pos + take]
+            self._pending_len += take
+            pos += take
+            if self._pending_len == self.frame_len:
+                out[written:written + self.frame_len] = self._process_frame(self._pending)
+                written += self.frame_len
+                self._pending_len = 0
+        return out
+
+    def flush(self):
+        """Proses sisa sampel dan isi filter (dipad nol) lalu reset state stream"""
+        tail_len = self._pending_len + self.latency
+        if not tail_len:
+            self.reset()
+            return np.zeros(0, dtype=np.float32)
+        frames = -(-tail_len // self.frame_len)
+        padding = np.zeros(frames * self.frame_len - self._pending_len, dtype=np.float32)
+        tail = self.process(padding)[:tail_len]
+        self.reset()
+        return tail
+
+    def _process_frame(self, frame):
+        if self.ratio == 1:
+            upsampled = frame
+        else:
+            # Sisipkan nol di antara sampel lalu filter low-pass (gain dikali rasio)
+            self._upsampled[:] = 0.0
+            self._upsampled[::self.ratio] = frame
+            self._upsampled *= self.ratio
+            upsampled, self._up_state = lfilter(
+                self._taps, 1.0, self._upsampled, zi=self._up_state
+            )
+
+        np.copyto(self._pcm, np.clip(upsampled * 32767.0, -32768.0, 32767.0), casting="unsafe")
+        cleaned = np.asarray(self.denoiser.process(self._pcm), dtype=np.float32) / 32767.0
+        if self.ratio == 1:
+            return cleaned
+        # Anti-aliasing sebelum decimation; total delay kedua filter tepat `latency` sampel
+        filtered, self._down_state = lfilter(self._taps, 1.0, cleaned, zi=self._down_state)
+        return filtered[::self.ratio].astype(np.float32)
+
+
+def create_denoiser(sample_rate=16000, kind="auto"):
+    """Buat denoiser streaming: "rnnoise", "spectral" atau "auto" (RNNoise jika ada)"""
+    if kind in ("auto", "rnnoise") and RNNOISE_AVAILABLE:
+        try:
+            denoiser = RNNoiseDenoiser(sample_rate)
+            print("RNNoise berhasil diinisialisasi")
+            return denoiser
+        except Exception as e:
+            print(f"Error inisialisasi RNNoise: {e}")
+    if kind == "rnnoise" and not RNNOISE_AVAILABLE:
+        print("RNNoise tidak tersedia, menggunakan noise reduction spektral")
+    return SpectralDenoiser(sample_rate)
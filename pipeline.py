@@ -0,0 +1,152 @@
+import itertools
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from metrics import UtteranceTrace
+
+# Sumber id unik untuk setiap ucapan
+_utterance_ids = itertools.count(1)
+
+# Penanda akhir stream yang diteruskan dari stage ke stage saat pipeline ditutup
+_STOP = object()
+
+# Hasil ASR satu ucapan: language_probability hanya terisi jika bahasa dideteksi Whisper
+Transcription = namedtuple("Transcription", [
+    "text", "language", "language_probability", "avg_logprob",
+])
+
+
+class AudioChunk:
+    """Chunk audio dari jaringan yang masuk ke stage pertama"""
+    __slots__ = ("audio", "source_lang", "target_lang", "output_device", "flush", "timestamp_us",
+                 "received_at")
+
+    def __init__(self, audio, source_lang, target_lang, output_device=None, flush=False,
+                 timestamp_us=None, received_at=None):
+        self.audio = audio
+        self.timestamp_us = timestamp_us
+        self.received_at = received_at  # time.perf_counter() saat frame diterima server
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.output_device = output_device
+        self.flush = flush
+
+
+class Utterance:
+    """Satu ucapan beserta hasil tiap stage (teks, terjemahan, audio TTS)
+
+    Di mode ASR streaming, stage VAD mengirim potongan ucapan yang sedang
+    berjalan dengan is_final=False; potongan terakhir bertanda is_final=True.
+    Potongan terjemahan dari ucapan yang sama berbagi utterance_id.
+    capture_us adalah timestamp capture client dari chunk yang menutup ucapan,
+    dipakai untuk mengukur latensi end-to-end. `trace` mencatat waktu tiap
+    stage untuk metrik latensi.
+    """
+    def __init__(self, audio, source_lang, target_lang, output_device=None, is_final=True,
+                 utterance_id=None, capture_us=None, trace=None):
+        self.utterance_id = utterance_id if utterance_id is not None else next(_utterance_ids)
+        self.capture_us = capture_us
+        self.trace = trace if trace is not None else UtteranceTrace(capture_us)
+        self.audio = audio
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.output_device = output_device
+        self.is_final = is_final
+        self.text = ""
+        self.translation = ""
+        self.speech = None
+        self.sample_rate = None  # Sample rate `speech`, tergantung model TTS bahasa tujuan
+
+
+class PipelineStage:
+    """Satu stage pipeline dengan worker thread dan antrian terbatas
+
+    Handler dipanggil untuk setiap item dan mengembalikan iterable hasil
+    (boleh kosong atau None) yang diteruskan ke stage berikutnya. Antrian
+    dibatasi `maxsize`; jika penuh, put() memblok pemanggil sampai worker
+    mengambil item. Blok ini merambat ke belakang hingga thread penerima
+    socket, sehingga client ikut tertahan lewat TCP alih-alih memori server
+    yang tumbuh tanpa batas.
+    """
+    def __init__(self, name, handler, maxsize=4):
+        self.name = name
+        self.handler = handler
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.next_stage = None
+        self.thread = None
+        self.processed = 0
+        self.blocked_time = 0.0  # Total waktu pemanggil tertahan karena antrian penuh
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=f"stage-{self.name}")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def put(self, item):
+        """Masukkan item ke antrian, memblok jika antrian penuh"""
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            start = time.perf_counter()
+            self.queue.put(item)
+            self.blocked_time += time.perf_counter() - start
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                if self.next_stage is not None:
+                    self.next_stage.put(_STOP)
+                break
+
+            try:
+                outputs = self.handler(item)
+                for output in outputs or ():
+                    if self.next_stage is not None:
+                        self.next_stage.put(output)
+            except Exception as e:
+                print(f"Error di stage {self.name}: {e}")
+            self.processed += 1
+
+    def join(self, timeout=None):
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+
+class TranslationPipeline:
+    """Rangkaian stage yang berjalan paralel, masing-masing dengan worker sendiri
+
+    Dengan satu worker per stage, ucapan N+1 bisa ditranskripsi selagi ucapan
+    N diterjemahkan dan N-1 disintesis. Throughput mengikuti stage paling
+    lambat, bukan jumlah waktu semua stage. Urutan ucapan tetap terjaga
+    karena tiap stage memproses antriannya secara FIFO.
+    """
+    def __init__(self, stages):
+        self.stages = list(stages)
+        for stage, next_stage in zip(self.stages, self.stages[1:]):
+            stage.next_stage = next_stage
+        self.is_running = False
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+        self.is_running = True
+
+    def submit(self, item):
+        """Masukkan item ke stage pertama (memblok jika pipeline penuh)"""
+        self.stages[0].put(item)
+
+    def queue_depths(self):
+        """Jumlah item yang menunggu di setiap stage"""
+        return {stage.name: stage.queue.qsize() for stage in self.stages}
+
+    def close(self, timeout=None):
+        """Selesaikan item yang tersisa lalu hentikan semua worker"""
+        if not self.is_running:
+            return
+        self.is_running = False
+        self.stages[0].put(_STOP)
+        for stage in self.stages:
+            stage.join(timeout)
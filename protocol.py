@@ -0,0 +1,290 @@
+import asyncio
+import json
+import struct
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from audio_codec import (
+    FMT_FLOAT32, CodecError, decode as decode_samples, encode as encode_samples,
+)
+
+# Format frame (semua field header dalam network byte order):
+#
+#   magic        2s  b"AV"
+#   version      B   versi protokol
+#   msg_type     B   jenis pesan (MSG_*)
+#   sample_fmt   B   format sampel payload (FMT_*)
+#   flags        B   cadangan
+#   output_dev   h   index output device, -1 jika tidak ada
+#   session_id   I   id sesi yang dipilih client
+#   seq          I   nomor urut frame dalam sesi (server -> client: id ucapan)
+#   timestamp    Q   waktu capture di client (mikrodetik sejak epoch); frame
+#                    balasan server menggemakan timestamp capture ucapannya
+#                    sehingga client bisa mengukur latensi end-to-end
+#   source_lang  8s  kode bahasa sumber (ASCII, diisi NUL)
+#   target_lang  8s  kode bahasa tujuan (ASCII, diisi NUL)
+#   payload_len  I   panjang payload dalam byte
+#
+# Header diikuti payload mentah sepanjang payload_len byte.
+MAGIC = b"AV"
+PROTOCOL_VERSION = 1
+
+HEADER = struct.Struct("!2sBBBBhIIQ8s8sI")
+HEADER_SIZE = HEADER.size
+
+# Jenis pesan
+MSG_AUDIO = 1          # client -> server: chunk audio mikrofon
+MSG_TRANSCRIPT = 2     # server -> client: teks hasil ASR (UTF-8)
+MSG_TRANSLATION = 3    # server -> client: teks terjemahan (UTF-8)
+MSG_TTS_AUDIO = 4      # server -> client: uint32 sample rate + sampel float32
+MSG_STATUS = 5         # server -> client: status server (JSON UTF-8), misalnya pemuatan model
+MSG_HELLO = 6          # dua arah: negosiasi codec audio (JSON UTF-8), lihat encode_hello_frame
+MSG_VOICE = 7          # client -> server: uint32 sample rate + sampel float32 suara referensi TTS sesi
+
+# Flag frame
+FLAG_PARTIAL = 0x01    # transkrip parsial yang masih bisa berubah
+
+# Format sampel payload audio (FMT_*) didefinisikan di audio_codec. Audio TTS
+# (server -> client) selalu float32; audio mikrofon memakai codec hasil
+# negosiasi MSG_HELLO, atau float32 jika client tidak bernegosiasi.
+
+# Batas atas payload agar header yang rusak tidak memicu alokasi besar
+MAX_PAYLOAD_SIZE = 16 * 1024 * 1024
+
+FrameHeader = namedtuple("FrameHeader", [
+    "version", "msg_type", "sample_fmt", "flags", "output_device",
+    "session_id", "seq", "timestamp_us", "source_lang", "target_lang",
+    "payload_len",
+])
+
+
+class ProtocolError(Exception):
+    """Frame yang diterima tidak sesuai format protokol"""
+
+
+def now_us():
+    """Timestamp saat ini dalam mikrodetik"""
+    return int(time.time() * 1_000_000)
+
+
+def _encode_lang(lang):
+    return (lang or "").encode("ascii")[:8]
+
+
+def _decode_lang(raw):
+    return raw.rstrip(b"\x00").decode("ascii")
+
+
+def pack_header(msg_type, payload_len, session_id=0, seq=0, timestamp_us=None,
+                source_lang="", target_lang="", output_device=None,
+                sample_fmt=FMT_FLOAT32, flags=0):
+    """Bangun header frame sebagai bytes"""
+    if payload_len > MAX_PAYLOAD_SIZE:
+        raise ProtocolError(f"Payload terlalu besar: {payload_len} byte")
+    if timestamp_us is None:
+        timestamp_us = now_us()
+    return HEADER.pack(
+        MAGIC, PROTOCOL_VERSION, msg_type, sample_fmt, flags,
+        -1 if output_device is None else output_device,
+        session_id & 0xFFFFFFFF, seq & 0xFFFFFFFF, timestamp_us,
+        _encode_lang(source_lang), _encode_lang(target_lang), payload_len,
+    )
+
+
+def unpack_header(data):
+    """Parse header dari buffer berukuran HEADER_SIZE"""
+    (magic, version, msg_type, sample_fmt, flags, output_device, session_id,
+     seq, timestamp_us, source_lang, target_lang, payload_len) = HEADER.unpack(data)
+
+    if magic != MAGIC:
+        raise ProtocolError(f"Magic tidak valid: {magic!r}")
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Versi protokol tidak didukung: {version}")
+    if payload_len > MAX_PAYLOAD_SIZE:
+        raise ProtocolError(f"Payload terlalu besar: {payload_len} byte")
+
+    return FrameHeader(
+        version, msg_type, sample_fmt, flags,
+        None if output_device < 0 else output_device,
+        session_id, seq, timestamp_us,
+        _decode_lang(source_lang), _decode_lang(target_lang), payload_len,
+    )
+
+
+def encode_audio_frame(audio, session_id, seq, source_lang, target_lang,
+                       output_device=None, timestamp_us=None, sample_fmt=FMT_FLOAT32):
+    """Encode chunk audio float32 menjadi satu frame siap kirim dengan codec `sample_fmt`"""
+    try:
+        payload = encode_samples(sample_fmt, audio)
+    except CodecError as e:
+        raise ProtocolError(str(e)) from e
+    header = pack_header(
+        MSG_AUDIO, len(payload), session_id=session_id, seq=seq,
+        timestamp_us=timestamp_us, source_lang=source_lang,
+        target_lang=target_lang, output_device=output_device,
+        sample_fmt=sample_fmt,
+    )
+    return header + payload
+
+
+def encode_text_frame(msg_type, text, session_id, seq, timestamp_us, source_lang="",
+                      target_lang="", flags=0):
+    """Encode pesan teks (transkrip/terjemahan) dari server ke client"""
+    payload = text.encode("utf-8")
+    header = pack_header(
+        msg_type, len(payload), session_id=session_id, seq=seq,
+        timestamp_us=timestamp_us, source_lang=source_lang,
+        target_lang=target_lang, flags=flags,
+    )
+    return header + payload
+
+
+_SAMPLE_RATE = struct.Struct("!I")
+
+
+def encode_tts_audio_frame(audio, sample_rate, session_id, seq, timestamp_us, target_lang=""):
+    """Encode audio hasil TTS (float32) beserta sample rate-nya"""
+    samples = np.ascontiguousarray(audio, dtype="<f4").tobytes()
+    header = pack_header(
+        MSG_TTS_AUDIO, _SAMPLE_RATE.size + len(samples), session_id=session_id,
+        seq=seq, timestamp_us=timestamp_us, target_lang=target_lang,
+    )
+    return header + _SAMPLE_RATE.pack(sample_rate) + samples
+
+
+def encode_voice_frame(audio, sample_rate, session_id):
+    """Encode rekaman suara referensi (float32) yang dipakai TTS untuk sesi ini"""
+    samples = np.ascontiguousarray(audio, dtype="<f4").tobytes()
+    header = pack_header(MSG_VOICE, _SAMPLE_RATE.size + len(samples), session_id=session_id)
+    return header + _SAMPLE_RATE.pack(sample_rate) + samples
+
+
+def encode_status_frame(status, session_id):
+    """Encode status server (dict yang bisa di-JSON-kan) untuk client"""
+    return encode_text_frame(
+        MSG_STATUS, json.dumps(status, separators=(",", ":")), session_id, 0, now_us()
+    )
+
+
+def encode_hello_frame(hello, session_id):
+    """Encode pesan negosiasi codec (dict yang bisa di-JSON-kan)
+
+    Client mengirim {"codecs": [nama codec urut preferensi]}; server
+    membalas {"codec": nama codec terpilih, "codecs": [yang didukung]}.
+    """
+    return encode_text_frame(
+        MSG_HELLO, json.dumps(hello, separators=(",", ":")), session_id, 0, now_us()
+    )
+
+
+def payload_to_text(payload):
+    return bytes(payload).decode("utf-8")
+
+
+def payload_to_status(payload):
+    """Kebalikan encode_status_frame, return dict status"""
+    try:
+        return json.loads(payload_to_text(payload))
+    except ValueError as e:
+        raise ProtocolError(f"Status tidak valid: {e}") from e
+
+
+def payload_to_hello(payload):
+    """Kebalikan encode_hello_frame, return dict negosiasi"""
+    try:
+        hello = json.loads(payload_to_text(payload))
+    except ValueError as e:
+        raise ProtocolError(f"Pesan hello tidak valid: {e}") from e
+    if not isinstance(hello, dict):
+        raise ProtocolError("Pesan hello harus berupa objek JSON")
+    return hello
+
+
+def payload_to_tts_audio(header, payload):
+    """Return (sample_rate, array float32) dari payload MSG_TTS_AUDIO atau MSG_VOICE"""
+    if len(payload) < _SAMPLE_RATE.size:
+        raise ProtocolError("Payload audio terlalu pendek")
+    (sample_rate,) = _SAMPLE_RATE.unpack_from(payload)
+    return sample_rate, payload_to_audio(header, payload[_SAMPLE_RATE.size:])
+
+
+def payload_to_audio(header, payload, out=None, max_samples=None):
+    """Decode payload menjadi array float32 milik pemanggil
+
+    Hasil tidak lagi menunjuk ke `payload`, jadi aman walau payload berasal
+    dari buffer FrameReader yang dipakai ulang. Jika `out` diberikan, sampel
+    ditulis ke sana dan yang dikembalikan adalah view-nya. `max_samples`
+    membatasi hasil dekompresi agar payload kecil tidak bisa mengembang
+    tanpa batas (default: setara MAX_PAYLOAD_SIZE dalam float32).
+    """
+    if max_samples is None:
+        max_samples = MAX_PAYLOAD_SIZE // 4
+    try:
+        return decode_samples(header.sample_fmt, payload, out=out, max_samples=max_samples)
+    except CodecError as e:
+        raise ProtocolError(str(e)) from e
+
+
+class FrameReader:
+    """Membaca frame dari socket dengan recv_into ke buffer yang dipakai ulang
+
+    Payload yang dikembalikan oleh read_frame adalah memoryview ke buffer
+    internal dan hanya valid sampai read_frame dipanggil lagi. Salin datanya
+    jika perlu disimpan lebih lama.
+    """
+    def __init__(self, sock, initial_size=64 * 1024):
+        self.sock = sock
+        self._header_buf = bytearray(HEADER_SIZE)
+        self._header_view = memoryview(self._header_buf)
+        self._payload_buf = bytearray(initial_size)
+        self._payload_view = memoryview(self._payload_buf)
+
+    def _recv_exact(self, view):
+        """Isi view sampai penuh, return False jika koneksi ditutup"""
+        received = 0
+        size = len(view)
+        while received < size:
+            n = self.sock.recv_into(view[received:], size - received)
+            if n == 0:
+                return False
+            received += n
+        return True
+
+    def _ensure_capacity(self, size):
+        if size > len(self._payload_buf):
+            self._payload_buf = bytearray(max(size, 2 * len(self._payload_buf)))
+            self._payload_view = memoryview(self._payload_buf)
+
+    def read_frame(self):
+        """Baca satu frame, return (header, payload) atau None saat EOF"""
+        if not self._recv_exact(self._header_view):
+            return None
+        header = unpack_header(self._header_buf)
+
+        self._ensure_capacity(header.payload_len)
+        payload = self._payload_view[:header.payload_len]
+        if header.payload_len and not self._recv_exact(payload):
+            raise ProtocolError("Koneksi terputus di tengah frame")
+        return header, payload
+
+
+async def read_frame_async(reader):
+    """Baca satu frame dari asyncio.StreamReader, return (header, payload) atau None saat EOF
+
+    Payload berupa bytes milik pemanggil (tidak dipakai ulang).
+    """
+    try:
+        header_data = await reader.readexactly(HEADER_SIZE)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise ProtocolError("Koneksi terputus di tengah header") from e
+    header = unpack_header(header_data)
+
+    try:
+        payload = await reader.readexactly(header.payload_len) if header.payload_len else b""
+    except asyncio.IncompleteReadError as e:
+        raise ProtocolError("Koneksi terputus di tengah frame") from e
+    return header, payload
\ No newline at end of file
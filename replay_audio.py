@@ -0,0 +1,44 @@
+import time
+import wave
+
+import numpy as np
+
+from bench_denoiser import make_test_signal
+
+SAMPLE_RATE = 16000
+
+
+def load_wav(path, sample_rate=SAMPLE_RATE):
+    """Baca WAV PCM 16-bit menjadi float32 mono, resample linear ke `sample_rate`"""
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: hanya WAV PCM 16-bit yang didukung")
+        rate = wf.getframerate()
+        channels = wf.getnchannels()
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    audio = pcm.reshape(-1, channels).mean(axis=1).astype(np.float32) / 32768.0
+    if rate != sample_rate:
+        n = int(len(audio) * sample_rate / rate)
+        audio = np.interp(
+            np.arange(n) * rate / sample_rate, np.arange(len(audio)), audio
+        ).astype(np.float32)
+    return audio
+
+
+def load_replay_audio(paths, duration=20.0, sample_rate=SAMPLE_RATE):
+    """Gabungkan semua WAV, atau sinyal uji mirip ucapan sepanjang `duration` jika tidak ada"""
+    if not paths:
+        _, noisy = make_test_signal(sample_rate, duration)
+        return noisy
+    return np.concatenate([load_wav(path, sample_rate) for path in paths])
+
+
+def paced_chunks(audio, chunk, speed, sample_rate=SAMPLE_RATE):
+    """Yield (posisi, chunk) dengan pacing `speed` x real-time (0 = secepatnya)"""
+    start = time.perf_counter()
+    for pos in range(0, len(audio), chunk):
+        if speed > 0:
+            delay = start + pos / sample_rate / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        yield pos, audio[pos:pos + chunk]
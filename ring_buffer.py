@@ -0,0 +1,55 @@
+import numpy as np
+
+
+class AudioRingBuffer:
+    """Ring buffer float32 single-producer/single-consumer tanpa lock
+
+    Hanya satu thread yang boleh memanggil write() dan hanya satu thread
+    (misalnya callback PortAudio) yang boleh memanggil read_into(). Posisi
+    tulis dan baca adalah counter yang terus naik; masing-masing hanya diubah
+    oleh satu pihak, sehingga cukup satu assignment atomik (di bawah GIL)
+    untuk mempublikasikan data tanpa lock dan tanpa alokasi.
+    """
+    def __init__(self, capacity, dtype=np.float32):
+        self.capacity = int(capacity)
+        self._buf = np.zeros(self.capacity, dtype=dtype)
+        self._write_pos = 0
+        self._read_pos = 0
+
+    def available(self):
+        """Jumlah sampel yang siap dibaca"""
+        return self._write_pos - self._read_pos
+
+    def space(self):
+        """Jumlah sampel yang masih bisa ditulis"""
+        return self.capacity - self.available()
+
+    def write(self, data):
+        """Tulis sebanyak mungkin dari data, return jumlah sampel yang tertulis"""
+        n = min(len(data), self.space())
+        if n <= 0:
+            return 0
+        pos = self._write_pos % self.capacity
+        first = min(n, self.capacity - pos)
+        self._buf[pos:pos + first] = data[:first]
+        if n > first:
+            self._buf[:n - first] = data[first:n]
+        self._write_pos += n
+        return n
+
+    def read_into(self, out):
+        """Isi out dengan data yang tersedia, return jumlah sampel yang terbaca"""
+        n = min(len(out), self.available())
+        if n <= 0:
+            return 0
+        pos = self._read_pos % self.capacity
+        first = min(n, self.capacity - pos)
+        out[:first] = self._buf[pos:pos + first]
+        if n > first:
+            out[first:n] = self._buf[:n - first]
+        self._read_pos += n
+        return n
+
+    def clear(self):
+        """Buang semua data (hanya aman dipanggil oleh sisi pembaca)"""
+        self._read_pos = self._write_pos
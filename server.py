@@ -1,201 +1,271 @@
-import io
-import json
-import socket
+import argparse
+import asyncio
+import concurrent.futures
+import signal
 import threading
+import time
 import numpy as np
-import sounddevice as sd
-import torch
-import torchaudio
-from collections import deque
 from context_aware_translator import ContextAwareTranslator
-import ollama
-import whisper
-import webrtcvad  # Untuk VAD yang lebih baik
+from translation_cache import TranslationCache
+from translation_backend import OllamaBackend
+from tts_cache import WaveformCache, make_waveform_key, file_hash
+from tts_engine import TTSEngine, XTTS_MODEL
+from model_registry import ModelRegistry
+from vad_segmenter import UtteranceSegmenter
+from noise_suppression import create_denoiser
+from streaming_asr import StreamingTranscriber
+from language_lock import SessionLanguage
+from audio_output import AudioOutput, SoundDeviceSink, create_sink
+from pipeline import AudioChunk, Utterance, PipelineStage, TranslationPipeline, Transcription
+from metrics import ServerMetrics, UtteranceTrace, serve_metrics
+from audio_codec import CODEC_IDS, CODEC_NAMES, choose_codec
+from protocol import (
+    ProtocolError, MSG_AUDIO, MSG_HELLO, MSG_TRANSCRIPT, MSG_TRANSLATION, MSG_VOICE, FLAG_PARTIAL,
+    payload_to_audio, payload_to_hello, payload_to_tts_audio, encode_text_frame, encode_tts_audio_frame,
+    encode_status_frame, encode_hello_frame, read_frame_async,
+)
 import os
-import sys
-from TTS.utils.manage import ModelManager
-from TTS.utils.synthesizer import Synthesizer
-import librosa
-
-# Coba import RNNoise, jika tidak tersedia gunakan fallback
-try:
-    from rnnoise import RNNoise
-    RNNOISE_AVAILABLE = True
-except ImportError:
-    RNNOISE_AVAILABLE = False
-    print("RNNoise tidak tersedia, menggunakan noise reduction alternatif")
-
-class AdaptiveBuffer:
-    def __init__(self, min_size=1024, max_size=8192, vad_aggressiveness=2):
-        self.min_size = min_size
-        self.max_size = max_size
-        self.current_size = min_size
-        self.vad = webrtcvad.Vad(vad_aggressiveness)
-        self.speech_speed = 1.0  # Normal speed
-        self.speech_history = deque(maxlen=10)
+
+# torch, whisper dan TTS baru diimport saat model dimuat (lihat ModelPool)
+# agar server bisa bind port dan melaporkan status secepatnya.
+
+# Normalisasi volume ucapan: puncak di bawah NORMALIZE_FLOOR (~-40 dBFS) dianggap
+# noise dan tidak dikuatkan; penguatan dibatasi NORMALIZE_MAX_GAIN (~+20 dB)
+NORMALIZE_FLOOR = 0.01
+NORMALIZE_MAX_GAIN = 10.0
+
+# Panjang rekaman suara referensi (MSG_VOICE) yang diterima, dalam detik
+VOICE_MIN_S = 2.0
+VOICE_MAX_S = 30.0
+
+class ModelPool:
+    """Model AI yang dimuat sekali dan dipakai bersama oleh semua sesi
+
+    Model tidak menyimpan state per percakapan, jadi aman dibagi antar sesi.
+    Transkripsi dari semua sesi digabung per batch oleh WhisperBatchScheduler,
+    inferensi paralel TTS dibatasi semaphore agar model yang tidak
+    thread-safe (dan CPU) tidak kelebihan beban, dan terjemahan memakai satu
+    TranslationBackend bersama (default OllamaBackend dengan client
+    persisten; StubBackend untuk pengujian tanpa Ollama).
+
+    Model Whisper dan TTS dipegang ModelRegistry: `asr_models` dan
+    `tts_models` memetakan kode bahasa ke nama model (key "default" untuk
+    bahasa lain), model dimuat saat pertama dipakai dan yang paling lama
+    tidak dipakai dikeluarkan jika melewati `model_memory_budget` byte.
+    Model default di-pin agar selalu siap. Model yang dipetakan ke satu
+    bahasa disimpan di registry dengan key bahasa itu (dan loader menerima
+    bahasanya), sedangkan model default dipakai bersama semua bahasa lain
+    dengan language None.
+
+    `asr_mode` memilih cara Whisper dijalankan (lihat whisper_cpu): "auto"
+    memakai GPU fp16 jika ada, "cpu" memaksa CPU fp32 tanpa mencoba fp16,
+    dan "cpu-int8" menambahkan kuantisasi dinamis int8 pada layer Linear.
+    `asr_threads` dan `asr_interop_threads` mengatur thread torch untuk
+    seluruh proses server (None = bawaan torch).
+
+    `asr_loader` dan `tts_loader` (fungsi (name, language) -> model)
+    menggantikan Whisper dan Coqui TTS, misalnya dengan model stub dari
+    stub_models untuk benchmark tanpa GPU dan unduhan model.
+
+    initialize_models() memuat model default Whisper, TTS dan backend
+    terjemahan secara paralel, masing-masing diikuti satu inferensi warm-up.
+    Status per model ("pending", "loading", "ready", "error") bisa dibaca
+    lewat readiness() dan dilaporkan ke `status_listener` setiap kali berubah.
+    """
+    # Perkiraan memori (byte) sebelum model dimuat, untuk mengosongkan ruang lebih dulu
+    WHISPER_SIZES = {
+        "tiny": 150 * 2**20, "base": 300 * 2**20, "small": 1000 * 2**20,
+        "medium": 3 * 2**30, "large": 6 * 2**30,
+    }
+    TTS_SIZES = {XTTS_MODEL: 2 * 2**30}
+
+    def __init__(self, tts_concurrency=1, translate_concurrency=2, ollama_model="llama2",
+                 asr_batch_size=8, asr_batch_wait_ms=30,
+                 translation_cache_path="translation_cache.sqlite3", translation_backend=None,
+                 tts_cache_bytes=64 * 1024 * 1024, tts_cache_dir="tts_cache",
+                 speaker_cache_dir="speaker_cache", warm_up=True, asr_models=None,
+                 tts_models=None, model_memory_budget=8 * 2**30, asr_mode="auto",
+                 asr_threads=None, asr_interop_threads=None, asr_loader=None, tts_loader=None):
+        self.asr_batch_size = asr_batch_size
+        self.asr_batch_wait_ms = asr_batch_wait_ms
+        self.asr_mode = asr_mode
+        self.asr_threads = asr_threads
+        self.asr_interop_threads = asr_interop_threads
+        self.asr_loader = asr_loader
+        self.tts_loader = tts_loader
+        self.asr_models = {"default": "base", **(asr_models or {})}
+        self.tts_models = {"default": XTTS_MODEL, **(tts_models or {})}
+        self.reference_speaker = None
+        self.reference_speaker_hash = None
+        self.tts_sample_rate = 22050  # Sample rate engine TTS default
+        self.tts_sample_rates = {}  # nama model TTS -> sample rate, diisi saat dimuat
+        self.default_voice = None
+        self.speaker_cache_dir = speaker_cache_dir
+        self.tts_cache = WaveformCache(tts_cache_bytes, spill_dir=tts_cache_dir)
+        self.tts_slots = threading.BoundedSemaphore(tts_concurrency)
+        if translation_backend is None:
+            translation_backend = OllamaBackend(ollama_model, max_concurrency=translate_concurrency)
+        self.translation_backend = translation_backend
+        self.ollama_model = translation_backend.model  # Ganti dengan model yang sesuai
+        self.translation_cache = TranslationCache(db_path=translation_cache_path)
         
-    def update_buffer_size(self, audio_chunk, sample_rate=16000):
-        """Update ukuran buffer berdasarkan VAD dan kecepatan bicara"""
-        # Deteksi aktivitas suara
-        is_speech = self.detect_speech(audio_chunk, sample_rate)
+        self.registry = ModelRegistry(model_memory_budget)
+        self.registry.register_loader(
+            "asr", self._load_asr, self._unload_asr,
+            size_hint=lambda name, language: self.WHISPER_SIZES.get(name.split(".")[0], 2**30),
+        )
+        self.registry.register_loader(
+            "tts", self._load_tts, lambda engine: engine.close(),
+            size_hint=lambda name, language: self.TTS_SIZES.get(name, 2**30),
+        )
         
-        # Hitung kecepatan bicara (kata per menit estimasi)
-        if is_speech:
-            speech_rate = self.estimate_speech_rate(audio_chunk)
-            self.speech_history.append(speech_rate)
-            
-            # Update kecepatan bicara rata-rata
-            if len(self.speech_history) > 0:
-                self.speech_speed = np.mean(list(self.speech_history))
-            
-            # Sesuaikan ukuran buffer berdasarkan kecepatan bicara
-            # Lebih cepat bicara = buffer lebih kecil
-            speed_factor = max(0.5, min(2.0, 1.0 / self.speech_speed))
-            new_size = int(self.current_size * speed_factor)
-            self.current_size = max(self.min_size, min(self.max_size, new_size))
-        else:
-            # Tidak ada bicara, kembalikan ke ukuran normal
-            self.current_size = self.min_size
-            
-        return self.current_size
+        self.warm_up = warm_up
+        self.status = {"asr": "pending", "tts": "pending", "translation": "pending"}
+        self.status_lock = threading.Lock()
+        self.status_listener = None  # Dipanggil dengan readiness() setiap status berubah
+        self.ready = threading.Event()
     
-    def detect_speech(self, audio_chunk, sample_rate):
-        """Deteksi aktivitas suara menggunakan VAD"""
-        try:
-            # Konversi ke format yang diharapkan oleh webrtcvad (16-bit PCM)
-            audio_int16 = (audio_chunk * 32767).astype(np.int16)
-            return self.vad.is_speech(audio_int16.tobytes(), sample_rate)
-        except:
-            return False
-    
-    def estimate_speech_rate(self, audio_chunk):
-        """Estimasi kecepatan bicara berdasarkan energi sinyal"""
-        # Hitung energi sinyal
-        energy = np.mean(audio_chunk**2)
-        
-        # Normalisasi energi untuk estimasi kecepatan
-        # Nilai lebih tinggi = bicara lebih cepat
-        speech_rate = min(2.0, max(0.5, energy * 10))
-        return speech_rate
-
-class RNNoiseProcessor:
-    """Processor untuk noise suppression menggunakan RNNoise"""
-    def __init__(self, sample_rate=16000):
-        self.sample_rate = sample_rate
-        self.denoiser = None
-        
-        if RNNOISE_AVAILABLE:
-            try:
-                self.denoiser = RNNoise()
-                print("RNNoise berhasil diinisialisasi")
-            except Exception as e:
-                print(f"Error inisialisasi RNNoise: {e}")
-                self.denoiser = None
+    def readiness(self):
+        """Ringkasan status pemuatan model, dikirim ke client sebagai MSG_STATUS"""
+        with self.status_lock:
+            models = dict(self.status)
+        if all(state == "ready" for state in models.values()):
+            state = "ready"
+        elif "error" in models.values():
+            state = "error"
         else:
-            print("RNNoise tidak tersedia, menggunakan metode alternatif")
+            state = "loading"
+        return {"state": state, "models": models}
     
-    def process(self, audio_data):
-        """Proses audio dengan RNNoise untuk noise suppression"""
-        if self.denoiser is not None:
-            try:
-                # RNNoise expects 16-bit PCM audio
-                audio_int16 = (audio_data * 32767).astype(np.int16)
-                processed_audio = self.denoiser.process(audio_int16)
-                return processed_audio.astype(np.float32) / 32767.0
-            except Exception as e:
-                print(f"Error processing dengan RNNoise: {e}")
-                return audio_data
-        else:
-            # Fallback: menggunakan noise reduction sederhana
-            return self.fallback_noise_reduction(audio_data)
+    def _set_status(self, name, state):
+        with self.status_lock:
+            self.status[name] = state
+        readiness = self.readiness()
+        if readiness["state"] == "ready":
+            self.ready.set()
+        listener = self.status_listener
+        if listener is not None:
+            listener(readiness)
     
-    def fallback_noise_reduction(self, audio_data):
-        """Metode fallback untuk noise reduction jika RNNoise tidak tersedia"""
-        # Simple spectral gating noise reduction
-        if len(audio_data) < 100:
-            return audio_data
-            
-        # STFT untuk analisis frekuensi
-        stft = librosa.stft(audio_data, n_fft=512, hop_length=128)
-        magnitude, phase = librosa.magphase(stft)
-        
-        # Estimate noise from the first 100ms
-        noise_frames = magnitude[:, :max(1, len(magnitude[0]) // 10)]
-        noise_profile = np.mean(noise_frames, axis=1, keepdims=True)
-        
-        # Soft mask berdasarkan noise profile
-        mask = magnitude / (magnitude + 2.0 * noise_profile)
-        cleaned_stft = mask * stft
-        
-        # Inverse STFT
-        cleaned_audio = librosa.istft(cleaned_stft, hop_length=128)
-        
-        # Pastikan panjang audio sama
-        if len(cleaned_audio) > len(audio_data):
-            cleaned_audio = cleaned_audio[:len(audio_data)]
-        elif len(cleaned_audio) < len(audio_data):
-            cleaned_audio = np.pad(cleaned_audio, (0, len(audio_data) - len(cleaned_audio)))
-            
-        return cleaned_audio.astype(np.float32)
-
-class AudioProcessor:
-    def __init__(self, sample_rate=16000, channels=1):
-        self.sample_rate = sample_rate
-        self.channels = channels
-        self.audio_buffer = deque()
-        self.is_recording = False
-        self.adaptive_buffer = AdaptiveBuffer()
-        self.whisper_model = None
-        self.tts_model = None
-        self.context_translator = None
-        self.ollama_model = "llama2"  # Ganti dengan model yang sesuai
-        self.target_lang = "en"
-        self.rnnoise_processor = RNNoiseProcessor(sample_rate)
-        
     def initialize_models(self):
-        """Inisialisasi semua model AI"""
-        print("Memuat model Whisper...")
-        self.whisper_model = whisper.load_model("base")
-        
-        print("Memuat model Coqui TTS...")
-        self.initialize_tts()
+        """Muat semua model AI secara paralel (sekali untuk seluruh server)"""
+        start = time.perf_counter()
+        loaders = {
+            "asr": self.initialize_asr,
+            "tts": self.initialize_tts,
+            "translation": self.initialize_translation,
+        }
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(loaders), thread_name_prefix="model-loader"
+        ) as pool:
+            for name, loader in loaders.items():
+                pool.submit(self._load_model, name, loader)
         
-        print("Menyiapkan translator...")
-        self.context_translator = ContextAwareTranslator()
-        
-        print("Semua model berhasil dimuat!")
+        if self.ready.is_set():
+            print(f"Semua model berhasil dimuat dalam {time.perf_counter() - start:.1f} detik!")
+        else:
+            print(f"Sebagian model gagal dimuat: {self.readiness()['models']}")
     
-    def initialize_tts(self):
-        """Inisialisasi Coqui TTS"""
+    def _load_model(self, name, loader):
+        self._set_status(name, "loading")
+        start = time.perf_counter()
         try:
-            # Setup model manager untuk Coqui TTS
-            model_manager = ModelManager()
-            
-            # Download dan load model XTTS
-            model_path, config_path, model_item = model_manager.download_model("tts_models/multilingual/multi-dataset/xtts_v2")
-            voc_path, voc_config_path, _ = model_manager.download_model("vocoder_models/en/ljspeech/hifigan_v2")
-            
-            # Inisialisasi synthesizer
-            self.tts_synthesizer = Synthesizer(
-                tts_checkpoint=model_path,
-                tts_config_path=config_path,
-                tts_speakers_file=None,
-                tts_languages_file=None,
-                vocoder_checkpoint=voc_path,
-                vocoder_config=voc_config_path,
-                encoder_checkpoint=None,
-                encoder_config=None,
-                use_cuda=torch.cuda.is_available(),
-            )
-            
-            # Buat speaker reference
-            self.setup_reference_speaker()
-            
+            loader()
         except Exception as e:
-            print(f"Error inisialisasi TTS: {e}")
-            # Fallback ke TTS basic jika XTTS gagal
-            from TTS.api import TTS
-            self.tts_model = TTS(model_name="tts_models/multilingual/multi-dataset/your_tts", progress_bar=False, gpu=False)
+            print(f"Gagal memuat model {name}: {e}")
+            self._set_status(name, "error")
+            return
+        print(f"Model {name} siap ({time.perf_counter() - start:.1f} detik)")
+        self._set_status(name, "ready")
+    
+    @staticmethod
+    def _model_for(models, language):
+        """(nama model, bahasa key registry) dari pemetaan bahasa -> model"""
+        name = models.get(language) if language != "default" else None
+        if name and name != models["default"]:
+            return name, language
+        return models["default"], None
+    
+    def asr_model_for(self, language):
+        """(nama model Whisper, bahasa key registry) untuk bahasa sumber (None/"auto" = default)"""
+        return self._model_for(self.asr_models, language)
+    
+    def tts_model_for(self, language):
+        """(nama model TTS, bahasa key registry) untuk bahasa tujuan"""
+        return self._model_for(self.tts_models, language)
+    
+    def _load_asr(self, name, language):
+        """Loader registry: model Whisper beserta scheduler batch-nya"""
+        if self.asr_loader is not None:
+            return self.asr_loader(name, language)
+        from asr_batcher import WhisperBatchScheduler
+        from whisper_cpu import configure_torch_threads, load_whisper_model, uses_fp16
+        
+        configure_torch_threads(self.asr_threads, self.asr_interop_threads)
+        model = load_whisper_model(name, self.asr_mode)
+        scheduler = WhisperBatchScheduler(
+            model, self.asr_batch_size, self.asr_batch_wait_ms, fp16=uses_fp16(model)
+        )
+        scheduler.start()
+        return scheduler
+    
+    def _unload_asr(self, scheduler):
+        scheduler.stop()
+        scheduler.model = None
+    
+    def _load_tts(self, name, language):
+        """Loader registry: engine Coqui TTS"""
+        if self.tts_loader is not None:
+            engine = self.tts_loader(name, language)
+        else:
+            engine = TTSEngine(name, self.reference_speaker, self.speaker_cache_dir).load()
+        self.tts_sample_rates[name] = engine.sample_rate
+        return engine
+    
+    def initialize_asr(self):
+        """Muat dan pin model Whisper default"""
+        name = self.asr_models["default"]
+        self.registry.pin("asr", name)
+        with self.registry.use("asr", name) as scheduler:
+            if self.warm_up:
+                # Satu decode pendek agar kernel/alokasi pertama tidak ditanggung ucapan pertama
+                try:
+                    scheduler.transcribe(np.zeros(16000, dtype=np.float32))
+                except Exception as e:
+                    print(f"Warm-up Whisper gagal: {e}")
+    
+    def initialize_translation(self):
+        """Siapkan backend terjemahan (memuat model di Ollama)"""
+        print("Menyiapkan backend terjemahan...")
+        if self.warm_up:
+            self.translation_backend.warm_up()
+    
+    def initialize_tts(self):
+        """Muat dan pin engine TTS default beserta suara referensinya"""
+        self.setup_reference_speaker()
+        name = self.tts_models["default"]
+        self.registry.pin("tts", name)
+        with self.registry.use("tts", name) as engine:
+            self.tts_sample_rate = engine.sample_rate
+            self.default_voice = engine.default_voice
+            if self.warm_up:
+                # Langsung ke model, tanpa mengisi cache waveform
+                try:
+                    with self.tts_slots:
+                        engine.synthesize("Halo.", "en")
+                except Exception as e:
+                    print(f"Warm-up TTS gagal: {e}")
+    
+    def register_voice(self, audio, sample_rate):
+        """Daftarkan suara dari rekaman float32 (misalnya per peserta), return voice id atau None
+
+        Latents disimpan di cache disk bersama, sehingga engine XTTS lain
+        (atau engine yang dimuat ulang) memakai suara yang sama. None berarti
+        engine TTS tidak mendukung kloning suara.
+        """
+        with self.registry.use("tts", self.tts_models["default"]) as engine:
+            with self.tts_slots:
+                return engine.register_voice(audio, sample_rate)
     
     def setup_reference_speaker(self):
         """Setup speaker reference untuk TTS"""
@@ -204,6 +274,12 @@ class AudioProcessor:
             import wave
             import struct
             
+            if os.path.exists("reference.wav"):
+                # Isi file tidak berubah, latents di cache tetap berlaku
+                self.reference_speaker = "reference.wav"
+                self.reference_speaker_hash = file_hash(self.reference_speaker)
+                return
+            
             # Generate simple tone sebagai reference default
             sample_rate = 22050
             duration = 1.0  # seconds
@@ -221,193 +297,940 @@ class AudioProcessor:
                 wf.writeframes(struct.pack('<' + ('h' * len(audio_data)), *(audio_data * 32767).astype(np.int16)))
                 
             self.reference_speaker = "reference.wav"
+            self.reference_speaker_hash = file_hash(self.reference_speaker)
             
         except Exception as e:
             print(f"Error membuat reference speaker: {e}")
             self.reference_speaker = None
     
-    def preprocess_audio(self, audio_data):
-        """Pre-processing audio: RNNoise noise suppression lalu normalisasi volume"""
-        try:
-            # Konversi ke numpy array jika perlu
-            if isinstance(audio_data, torch.Tensor):
-                audio_data = audio_data.numpy()
+    def transcribe(self, audio_np, language=None):
+        """Transkripsi audio float32 16kHz, dibatch bersama ucapan sesi lain
+
+        language memilih model Whisper dan diteruskan ke decoder; None berarti
+        Whisper mendeteksi bahasa sendiri. Return Transcription.
+        """
+        with self.registry.use("asr", *self.asr_model_for(language)) as scheduler:
+            return scheduler.transcribe(audio_np, language)
+    
+    def transcribe_words(self, audio_np, prompt="", language=None):
+        """Transkripsi dengan timestamp per kata untuk ASR streaming
+
+        Return (list (start, end, word), Transcription) tanpa probabilitas
+        bahasa karena transcribe() Whisper tidak melaporkannya. Decode
+        diantrikan di scheduler model (lihat WhisperBatchScheduler.submit_words)
+        agar bergiliran dengan batch ucapan sesi lain.
+        """
+        with self.registry.use("asr", *self.asr_model_for(language)) as scheduler:
+            result = scheduler.transcribe_words(audio_np, language, prompt)
+        segments = result['segments']
+        words = [
+            (word['start'], word['end'], word['word'])
+            for segment in segments
+            for word in segment.get('words', [])
+        ]
+        avg_logprob = None
+        if segments:
+            avg_logprob = sum(segment['avg_logprob'] for segment in segments) / len(segments)
+        return words, Transcription(result['text'], result.get('language'), None, avg_logprob)
+    
+    def shutdown(self):
+        """Hentikan worker dan keluarkan model yang dimiliki pool"""
+        self.registry.close()
+        self.translation_cache.close()
+        self.translation_backend.close()
+    
+    def translate(self, translator, text, target_lang):
+        """Terjemahkan dengan konteks milik sesi, memakai backend bersama"""
+        return translator.translate_with_context(text, self.ollama_model, target_lang)
+    
+    def translate_stream(self, translator, text, target_lang):
+        """Versi streaming translate(), yield potongan terjemahan per kalimat/klausa"""
+        return translator.translate_with_context_stream(text, self.ollama_model, target_lang)
+    
+    def tts_sample_rate_for(self, language):
+        """Sample rate waveform dari synthesize() untuk bahasa tujuan ini"""
+        name, _ = self.tts_model_for(language)
+        return self.tts_sample_rates.get(name, self.tts_sample_rate)
+    
+    def synthesize(self, text, language, voice_id=None):
+        """Konversi teks ke speech menggunakan Coqui TTS, dengan cache waveform
+
+        voice_id dari register_voice(); None berarti suara default. Waveform
+        memakai sample rate tts_sample_rate_for(language).
+        """
+        if not text.strip():
+            return
+        voice_id = voice_id or self.default_voice
+        name, model_language = self.tts_model_for(language)
+        
+        # Frasa yang sering diulang langsung diambil dari cache. Key engine
+        # default tidak memuat nama model agar cache lama tetap berlaku; cache
+        # engine yang sample rate-nya belum diketahui tidak bisa dipakai.
+        speaker = voice_id or self.reference_speaker_hash
+        if name != self.tts_models["default"]:
+            speaker = f"{speaker}@{name}"
+        cache_key = make_waveform_key(text, language, speaker)
+        if name in self.tts_sample_rates:
+            audio_data = self.tts_cache.get(cache_key)
+            if audio_data is not None:
+                return audio_data
             
-            # 1. Noise suppression dengan RNNoise (atau fallback)
-            audio_data = self.rnnoise_processor.process(audio_data)
+        try:
+            # Generate speech menggunakan Coqui TTS
+            with self.registry.use("tts", name, model_language) as engine, self.tts_slots:
+                audio_data = engine.synthesize(text, language, voice_id)
+            self.tts_cache.put(cache_key, audio_data)
+            return audio_data
+        except Exception as e:
+            print(f"Error dalam TTS: {e}")
+
+class AudioProcessor:
+    """State pemrosesan audio milik satu sesi (denoiser, VAD, konteks, pipeline)
+
+    Dengan `streaming_asr=True`, Whisper dijalankan berulang selama ucapan
+    berlangsung (StreamingTranscriber) sehingga transkrip parsial keluar
+    sebelum ucapan selesai dan tiap kalimat final langsung diterjemahkan.
+    Dengan `streaming_translation=True`, terjemahan diterima token demi token
+    dan tiap kalimat/klausa yang selesai langsung dikirim ke stage TTS.
+
+    Jika `metrics` (ServerMetrics) diberikan, trace tiap ucapan dicatat ke
+    sana setelah audionya diserahkan ke output.
+
+    Sink "device" memutar audio di `output_device` milik server (index
+    sounddevice dari konfigurasi server, None = perangkat default). Index
+    output device di header frame adalah perangkat lokal client dan tidak
+    pernah dipakai untuk sink server.
+    """
+    def __init__(self, models, sample_rate=16000, channels=1, streaming_asr=False,
+                 streaming_translation=False, output_sink="device", output_path=None,
+                 metrics=None, output_device=None):
+        self.models = models
+        self.metrics = metrics
+        self.streaming_asr = streaming_asr
+        self.streaming_translation = streaming_translation
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.segmenter = UtteranceSegmenter(sample_rate, streaming=streaming_asr)
+        self.stream_transcriber = None
+        if streaming_asr:
+            self.stream_transcriber = StreamingTranscriber(self._transcribe_words, sample_rate)
+        self.context_translator = ContextAwareTranslator(
+            cache=models.translation_cache, backend=models.translation_backend
+        )
+        self.language = SessionLanguage()  # Bahasa sumber untuk Whisper (tetap atau dikunci)
+        self.target_lang = "en"
+        self.voice_id = None  # Suara TTS sesi ini, None = suara default
+        # Denoiser streaming berjalan di depan VAD agar state-nya kontinu antar chunk
+        self.denoiser = create_denoiser(sample_rate)
+        self.pipeline = None
+        self.output = None
+        self.output_sink = output_sink
+        self.output_device = output_device
+        self.output_path = output_path
+        self.response_channel = None  # ResponseChannel ke client, diisi oleh sesi
+        self._stream_utterance = None  # Ucapan yang sedang berjalan di mode ASR streaming
+        # Audio (detik) dan waktu decode yang sudah dipakai ASR streaming sejak kalimat final terakhir
+        self._stream_audio_s = 0.0
+        self._stream_decode_s = 0.0
+        # Gain normalisasi mode streaming: tetap selama satu ucapan, diperbarui
+        # dari puncak ucapan sebelumnya saat potongan final lewat
+        self._stream_gain = 1.0
+        self._stream_peak = 0.0
+        self._last_chunk_times = (None, None)  # (timestamp_us, received_at) chunk audio terakhir
+        
+    def start_pipeline(self, queue_size=4):
+        """Bangun dan jalankan pipeline denoise/VAD -> ASR -> terjemahan -> TTS
+
+        Stage output (AudioOutput) punya thread sendiri dan dibuat saat
+        ucapan pertama siap diputar.
+        """
+        self.pipeline = TranslationPipeline([
+            PipelineStage("vad", self._vad_stage, maxsize=queue_size * 8),
+            PipelineStage(
+                "asr",
+                self._streaming_asr_stage if self.streaming_asr else self._asr_stage,
+                maxsize=queue_size
+            ),
+            PipelineStage("translate", self._translate_stage, maxsize=queue_size),
+            PipelineStage("tts", self._tts_stage, maxsize=queue_size),
+        ])
+        self.pipeline.start()
+    
+    def stop_pipeline(self):
+        """Hentikan pipeline setelah item yang tersisa selesai diproses"""
+        if self.pipeline is not None:
+            self.pipeline.close()
+            self.pipeline = None
+        if self.output is not None:
+            self.output.close()
+            self.output = None
+    
+    def set_voice(self, audio, sample_rate):
+        """Pakai suara dari rekaman referensi untuk TTS sesi ini (blocking)
+
+        Return voice id, atau None jika engine TTS tidak mendukung kloning
+        suara (sesi tetap memakai suara default).
+        """
+        voice_id = self.models.register_voice(audio, sample_rate)
+        if voice_id is not None:
+            self.voice_id = voice_id
+        return voice_id
+    
+    @staticmethod
+    def normalization_gain(peak):
+        """Gain agar puncak ucapan mendekati full scale; 1.0 untuk audio di bawah noise floor"""
+        if peak < NORMALIZE_FLOOR:
+            return 1.0
+        return min(1.0 / peak, NORMALIZE_MAX_GAIN)
+    
+    def preprocess_audio(self, audio_data, gain=None):
+        """Pre-processing ucapan: normalisasi volume (noise suppression sudah di stage VAD)
+
+        Tanpa `gain`, gain dihitung dari puncak audio ini (satu ucapan utuh).
+        Mode streaming memberi gain yang sama untuk semua potongan satu
+        ucapan agar jendela decode tidak berisi potongan dengan level berbeda.
+        """
+        try:
+            # Konversi ke numpy array jika perlu (misalnya tensor CPU)
+            audio_data = np.asarray(audio_data, dtype=np.float32)
+            if audio_data.size == 0:
+                return audio_data
             
-            # 2. Normalisasi volume
-            max_val = np.max(np.abs(audio_data))
-            if max_val > 0:
-                audio_data = audio_data / max_val
+            # Normalisasi volume
+            if gain is None:
+                gain = self.normalization_gain(float(np.max(np.abs(audio_data))))
+            if gain != 1.0:
+                audio_data = audio_data * np.float32(gain)
             
             return audio_data
         except Exception as e:
             print(f"Error pre-processing audio: {e}")
             return audio_data
     
-    def transcribe_audio(self, audio_data):
-        """Transkripsi audio ke teks menggunakan Whisper dengan BytesIO"""
+    def _preprocess_stream_piece(self, piece, is_final):
+        """Normalisasi potongan streaming dengan gain tetap per ucapan"""
+        if len(piece):
+            self._stream_peak = max(self._stream_peak, float(np.max(np.abs(piece))))
+        audio = self.preprocess_audio(piece, self._stream_gain)
+        if is_final:
+            # Ucapan berikutnya memakai level ucapan ini; ucapan yang hanya noise tidak mengubahnya
+            if self._stream_peak >= NORMALIZE_FLOOR:
+                self._stream_gain = self.normalization_gain(self._stream_peak)
+            self._stream_peak = 0.0
+        return audio
+    
+    def transcribe_audio(self, audio_data, source_lang=None):
+        """Transkripsi audio (sudah di-preprocess) ke teks menggunakan Whisper
+
+        source_lang dari client dipakai langsung; di mode "auto" bahasa
+        dikunci setelah beberapa deteksi yakin (lihat SessionLanguage).
+        """
         try:
-            # Pre-processing audio (RNNoise + normalisasi)
-            processed_audio = self.preprocess_audio(audio_data)
-            
             # Konversi ke format yang diterima Whisper (mono, 16kHz)
-            audio_np = np.array(processed_audio, dtype=np.float32)
-            
-            # Gunakan BytesIO untuk in-memory processing
-            audio_buffer = io.BytesIO()
-            np.save(audio_buffer, audio_np)
-            audio_buffer.seek(0)
+            audio_np = np.asarray(audio_data, dtype=np.float32)
             
             # Transkripsi menggunakan Whisper
-            result = self.whisper_model.transcribe(audio_np)  # Biarkan Whisper deteksi bahasa otomatis
-            return result['text']
+            self.language.set_requested(source_lang)
+            result = self.models.transcribe(audio_np, self.language.decode_language())
+            if result.text.strip():
+                self.language.observe(
+                    result.language, result.language_probability, result.avg_logprob
+                )
+            return result.text
         except Exception as e:
             print(f"Error dalam transkripsi: {e}")
             return ""
     
-    def text_to_speech(self, text, output_device=None):
-        """Konversi teks ke speech menggunakan Coqui TTS"""
-        if not text.strip():
+    def play_audio(self, utterance):
+        """Serahkan hasil TTS ke stage output tanpa menunggu audio selesai diputar"""
+        if self.output_sink == "client":
+            # Audio dikirim balik dan diputar di perangkat client
+            if self.response_channel is not None:
+                self.response_channel.send_audio(utterance, utterance.sample_rate)
             return
-            
-        try:
-            # Generate speech menggunakan Coqui TTS
-            if hasattr(self, 'tts_synthesizer'):
-                # Gunakan XTTS synthesizer
-                wav = self.tts_synthesizer.tts(
-                    text=text,
-                    speaker_name="default",
-                    language=self.target_lang.split("_")[0],
-                    speaker_wav=self.reference_speaker
-                )
-                audio_data = np.array(wav, dtype=np.float32)
+        if self.output is None:
+            # Error membuka sink diteruskan ke stage (dicatat), bukan diganti sink lain
+            sink = create_sink(
+                self.output_sink, utterance.sample_rate, self.output_device, self.output_path
+            )
+            output = AudioOutput(sink, utterance.sample_rate)
+            output.start()
+            self.output = output
+        self.output.play(utterance.speech, utterance.utterance_id, utterance.sample_rate)
+    
+    def process_audio_stream(self, audio_data, source_lang, target_lang, output_device=None,
+                             timestamp_us=None, received_at=None, copy=True):
+        """Masukkan chunk audio ke pipeline (memblok jika pipeline penuh)
+
+        copy=False hanya untuk array float32 yang sudah dimiliki pipeline,
+        misalnya hasil payload_to_audio di server.
+        """
+        # Salin karena audio_data bisa berupa view ke buffer yang dipakai ulang pemanggil
+        audio = np.array(audio_data, dtype=np.float32) if copy else audio_data
+        if received_at is None:
+            received_at = time.perf_counter()
+        self._last_chunk_times = (timestamp_us, received_at)
+        self.pipeline.submit(AudioChunk(
+            audio, source_lang, target_lang, output_device,
+            timestamp_us=timestamp_us, received_at=received_at
+        ))
+    
+    def flush_audio_stream(self, source_lang, target_lang, output_device=None):
+        """Proses sisa ucapan yang belum selesai, misalnya saat client putus
+
+        Chunk flush membawa timestamp chunk audio terakhir agar ucapan
+        terakhir tetap punya trace VAD dan latensi end-to-end.
+        """
+        timestamp_us, received_at = self._last_chunk_times
+        self.pipeline.submit(AudioChunk(
+            None, source_lang, target_lang, output_device, flush=True,
+            timestamp_us=timestamp_us, received_at=received_at
+        ))
+    
+    def _send_text(self, msg_type, utterance, text, partial=False):
+        """Kirim transkrip/terjemahan ke client jika sesi punya kanal balik"""
+        if self.response_channel is not None:
+            self.response_channel.send_text(msg_type, utterance, text, partial)
+    
+    def _vad_stage(self, chunk):
+        """Stage 1: noise suppression streaming lalu segmentasi VAD"""
+        if chunk.flush:
+            segments = self.segmenter.push(self.denoiser.flush())
+            utterance = self.segmenter.flush()
+            if utterance is not None:
+                segments.append(utterance)
+        else:
+            segments = self.segmenter.push(self.denoiser.process(chunk.audio))
+        
+        for segment in segments:
+            # Di mode streaming segmenter mengembalikan (potongan, is_final)
+            segment, is_final = segment if self.streaming_asr else (segment, True)
+            if not len(segment) and not is_final:
+                continue  # Potongan final kosong tetap diteruskan sebagai penanda akhir ucapan
+            trace = UtteranceTrace(chunk.timestamp_us, chunk.received_at)
+            trace.mark("vad")
+            trace.audio_s = len(segment) / self.sample_rate
+            if self.streaming_asr:
+                audio = self._preprocess_stream_piece(segment, is_final)
             else:
-                # Fallback ke TTS basic
-                audio_data = self.tts_model.tts(
-                    text=text,
-                    speaker_wav="reference.wav",
-                    language=self.target_lang.split("_")[0]
+                audio = self.preprocess_audio(segment)
+            yield Utterance(
+                audio, chunk.source_lang,
+                chunk.target_lang, chunk.output_device, is_final,
+                capture_us=chunk.timestamp_us, trace=trace
+            )
+    
+    def _asr_stage(self, utterance):
+        """Stage 2: transkripsi dengan Whisper"""
+        utterance.trace.mark("asr_start")
+        utterance.text = self.transcribe_audio(utterance.audio, utterance.source_lang)
+        utterance.trace.mark("asr")
+        if not utterance.text.strip():
+            return
+        print(f"Teks terdeteksi: {utterance.text}")
+        self._send_text(MSG_TRANSCRIPT, utterance, utterance.text)
+        yield utterance
+    
+    def _streaming_asr_stage(self, piece):
+        """Stage 2 (mode streaming): decode inkremental, teruskan kalimat final"""
+        self.language.set_requested(piece.source_lang)
+        piece.trace.mark("asr_start")
+        if len(piece.audio):
+            self.stream_transcriber.insert_audio(piece.audio)
+        if piece.is_final:
+            events = self.stream_transcriber.finish()
+        else:
+            events = self.stream_transcriber.process()
+        self._stream_audio_s += piece.trace.audio_s or 0.0
+        self._stream_decode_s += time.perf_counter() - piece.trace.points["asr_start"]
+        
+        for kind, text in events:
+            # Parsial dan final satu kalimat memakai id ucapan yang sama
+            utterance = self._stream_utterance
+            if utterance is None:
+                utterance = Utterance(
+                    None, piece.source_lang, piece.target_lang, piece.output_device
                 )
-            
-            # Putar audio di output device yang dipilih
-            if output_device is not None:
-                sd.play(audio_data, samplerate=22050, device=output_device)
-                sd.wait()
-                
-            return audio_data
-        except Exception as e:
-            print(f"Error dalam TTS: {e}")
+            utterance.capture_us = piece.capture_us
+            # Trace diambil dari potongan audio yang menutup kalimat
+            utterance.trace = piece.trace.copy()
+            utterance.trace.audio_s = None
+            utterance.trace.mark("asr")
+            if kind == "partial":
+                print(f"Teks parsial: {text}")
+                self._stream_utterance = utterance
+                self._send_text(MSG_TRANSCRIPT, utterance, text, partial=True)
+                continue
+            print(f"Teks terdeteksi: {text}")
+            self._stream_utterance = None
+            # Kalimat final menanggung semua audio dan decode sejak kalimat final
+            # sebelumnya, termasuk decode ulang jendela untuk transkrip parsial
+            utterance.trace.audio_s = self._stream_audio_s
+            utterance.trace.asr_s = self._stream_decode_s
+            self._stream_audio_s = 0.0
+            self._stream_decode_s = 0.0
+            utterance.text = text
+            self._send_text(MSG_TRANSCRIPT, utterance, text)
+            yield utterance
     
-    def process_audio_stream(self, audio_data, source_lang, target_lang, output_device=None):
-        """Proses lengkap audio stream dari input ke output"""
+    def _transcribe_words(self, audio, prompt=""):
+        """Transkripsi per kata untuk StreamingTranscriber dengan bahasa sesi"""
+        words, result = self.models.transcribe_words(
+            audio, prompt, self.language.decode_language()
+        )
+        if words:
+            self.language.observe(result.language, None, result.avg_logprob)
+        return words
+    
+    def _translate_stage(self, utterance):
+        """Stage 3: terjemahkan teks dengan konteks"""
+        self.target_lang = utterance.target_lang
+        utterance.trace.mark("translate_start")
+        if self.streaming_translation:
+            # Setiap potongan jadi item TTS sendiri agar sintesis mulai lebih awal
+            previous = None
+            for piece in self.models.translate_stream(
+                self.context_translator, utterance.text, utterance.target_lang
+            ):
+                print(f"Potongan terjemahan: {piece}")
+                # Hanya potongan pertama yang membawa stage bersama (VAD, ASR, durasi audio)
+                trace = utterance.trace.copy() if previous is None else utterance.trace.next_piece(previous)
+                segment = Utterance(
+                    None, utterance.source_lang, utterance.target_lang, utterance.output_device,
+                    utterance_id=utterance.utterance_id, capture_us=utterance.capture_us,
+                    trace=trace
+                )
+                segment.trace.mark("translate")
+                previous = segment.trace.points["translate"]
+                self._send_text(MSG_TRANSLATION, segment, piece)
+                segment.text = utterance.text
+                segment.translation = piece
+                yield segment
+            self._record_prompt_usage()
+            return
+        
+        utterance.translation = self.models.translate(
+            self.context_translator, utterance.text, utterance.target_lang
+        )
+        utterance.trace.mark("translate")
+        self._record_prompt_usage()
+        print(f"Teks diterjemahkan: {utterance.text} -> {utterance.translation}")
+        self._send_text(MSG_TRANSLATION, utterance, utterance.translation)
+        yield utterance
+    
+    def _record_prompt_usage(self):
+        """Catat token prompt terjemahan terakhir (tidak ada jika kena cache)"""
+        usage = self.context_translator.last_usage
+        if usage is not None and self.metrics is not None:
+            self.metrics.observe_prompt(usage)
+    
+    def _tts_stage(self, utterance):
+        """Stage 4: sintesis speech lalu serahkan ke stage output"""
+        trace = utterance.trace
+        trace.mark("tts_start")
+        utterance.speech = self.models.synthesize(
+            utterance.translation, utterance.target_lang, self.voice_id
+        )
+        trace.mark("tts")
+        if utterance.speech is not None:
+            utterance.sample_rate = self.models.tts_sample_rate_for(utterance.target_lang)
+            trace.speech_s = len(utterance.speech) / utterance.sample_rate
+            self.play_audio(utterance)
+            trace.mark("playback")
+        if self.metrics is not None:
+            self.metrics.record(trace)
+        return ()
+
+class ResponseChannel:
+    """Kanal balik server -> client untuk transkrip, terjemahan dan audio TTS
+
+    Dipanggil dari thread worker pipeline, sedangkan StreamWriter milik event
+    loop; setiap frame dijadwalkan ke loop dan ditulis utuh di bawah lock
+    lalu di-drain. Worker menunggu sampai frame terkirim (maksimal
+    `send_timeout`) sehingga client yang lambat menahan pipeline sesinya
+    sendiri, bukan menumpuk memori. Error kirim hanya dicatat; sesi akan
+    berakhir sendiri saat pembacaan dari client gagal.
+    """
+    def __init__(self, writer, loop, session_id, send_timeout=10.0):
+        self.writer = writer
+        self.loop = loop
+        self.session_id = session_id
+        self.send_timeout = send_timeout
+        self._lock = asyncio.Lock()
+        self.is_open = True
+    
+    async def write(self, frame):
+        """Tulis satu frame dari dalam event loop"""
+        async with self._lock:
+            self.writer.write(frame)
+            await self.writer.drain()
+    
+    def _send(self, frame):
+        if not self.is_open:
+            return
+        future = None
         try:
-            # Update ukuran buffer adaptif
-            buffer_size = self.adaptive_buffer.update_buffer_size(audio_data, self.sample_rate)
-            
-            # Deteksi aktivitas suara
-            if not self.adaptive_buffer.detect_speech(audio_data, self.sample_rate):
-                return
-            
-            # Pastikan kita punya cukup data audio
-            if len(audio_data) < buffer_size // 2:
-                return
-            
-            # Transkripsi audio ke teks
-            transcribed_text = self.transcribe_audio(audio_data)
-            if not transcribed_text.strip():
-                return
-            
-            print(f"Teks terdeteksi: {transcribed_text}")
-            
-            # Terjemahkan teks dengan konteks
-            self.target_lang = target_lang
-            translated_text = self.context_translator.translate_with_context(
-                transcribed_text, self.ollama_model, target_lang
+            future = asyncio.run_coroutine_threadsafe(self.write(frame), self.loop)
+            future.result(self.send_timeout)
+        except (OSError, RuntimeError, concurrent.futures.TimeoutError,
+                concurrent.futures.CancelledError) as e:
+            if future is not None:
+                future.cancel()
+            self.is_open = False
+            print(f"[sesi {self.session_id}] Gagal mengirim ke client: {e!r}")
+    
+    def send_text(self, msg_type, utterance, text, partial=False):
+        self._send(encode_text_frame(
+            msg_type, text, self.session_id, utterance.utterance_id,
+            utterance.capture_us or 0, utterance.source_lang, utterance.target_lang,
+            FLAG_PARTIAL if partial else 0,
+        ))
+    
+    def send_audio(self, utterance, sample_rate):
+        self._send(encode_tts_audio_frame(
+            utterance.speech, sample_rate, self.session_id, utterance.utterance_id,
+            utterance.capture_us or 0, utterance.target_lang,
+        ))
+
+class TranslationSession:
+    """Satu koneksi client beserta seluruh state percakapannya
+
+    Setiap sesi punya AudioProcessor (dan pipeline) sendiri sehingga konteks
+    terjemahan, state VAD/denoiser dan bahasa tujuan tidak tercampur antar
+    meeting. Model AI diambil dari ModelPool bersama.
+
+    run() adalah coroutine yang membaca frame dari asyncio stream. Pipeline
+    (beserta thread-nya) baru dibuat saat frame audio pertama datang, jadi
+    koneksi yang menganggur hanya memakan satu task. Pemanggilan yang bisa
+    memblok (submit dengan backpressure, menutup pipeline) dijalankan di
+    `executor` agar event loop tidak tertahan.
+
+    Client bisa mengirim MSG_VOICE berisi rekaman suaranya; suara itu
+    didaftarkan ke engine TTS dan dipakai untuk semua terjemahan sesi ini
+    (per peserta), dengan balasan MSG_STATUS "voice_ready" atau "voice_error".
+    """
+    def __init__(self, session_id, reader, writer, addr, models, executor,
+                 processor_options=None, idle_timeout=None, audio_codecs=None):
+        self.session_id = session_id
+        self.reader = reader
+        self.writer = writer
+        self.addr = addr
+        self.executor = executor
+        self.idle_timeout = idle_timeout
+        options = dict(processor_options or {})
+        if options.get('output_path'):
+            options['output_path'] = options['output_path'].format(session_id=session_id)
+        self.models = models
+        self.audio_processor = AudioProcessor(models, **options)
+        self.channel = None
+        self.is_active = False
+        self.draining = False
+        self.dropped_frames = 0  # Frame audio yang datang sebelum model siap
+        # Codec yang boleh dipilih saat negosiasi; float32 selalu diterima
+        self.audio_codecs = tuple(audio_codecs or CODEC_NAMES.values())
+        # Codec hasil negosiasi; frame audio dengan format lain ditolak.
+        # Client tanpa MSG_HELLO hanya boleh mengirim float32.
+        self.codec = "float32"
+        self.rejected_frames = 0
+        self.uplink_bytes = {}    # codec -> byte payload audio yang diterima
+        self.uplink_samples = {}  # codec -> jumlah sampel hasil decode
+    
+    async def send_status(self, status):
+        """Kirim status server (misalnya progres pemuatan model) ke client"""
+        if self.channel is None or not self.channel.is_open:
+            return
+        try:
+            await self.channel.write(encode_status_frame(status, self.session_id))
+        except (ConnectionError, OSError):
+            self.channel.is_open = False
+    
+    async def run(self):
+        """Terima frame dari client sampai koneksi ditutup, idle terlalu lama, atau di-drain"""
+        loop = asyncio.get_running_loop()
+        self.is_active = True
+        self.channel = ResponseChannel(self.writer, loop, self.session_id)
+        self.audio_processor.response_channel = self.channel
+        await self.send_status(self.models.readiness())
+        header = None
+        try:
+            while self.is_active:
+                # Terima satu frame audio utuh dari client
+                try:
+                    frame = await asyncio.wait_for(
+                        read_frame_async(self.reader), self.idle_timeout
+                    )
+                except asyncio.TimeoutError:
+                    print(f"[sesi {self.session_id}] Tidak ada data selama {self.idle_timeout} detik, menutup sesi")
+                    break
+                if frame is None:
+                    break
+                received_at = time.perf_counter()
+                header, payload = frame
+
+                if header.msg_type == MSG_HELLO:
+                    await self.negotiate(payload_to_hello(payload))
+                    continue
+
+                if header.msg_type == MSG_VOICE:
+                    await self.set_voice(*payload_to_tts_audio(header, payload))
+                    continue
+
+                if header.msg_type != MSG_AUDIO:
+                    print(f"[sesi {self.session_id}] Jenis pesan tidak dikenal: {header.msg_type}")
+                    continue
+
+                if header.sample_fmt != CODEC_IDS[self.codec]:
+                    await self.reject_frame(header)
+                    continue
+
+                if not self.models.ready.is_set():
+                    # Model belum siap; client sudah diberi tahu lewat MSG_STATUS
+                    if not self.dropped_frames:
+                        print(f"[sesi {self.session_id}] Model belum siap, audio diabaikan")
+                    self.dropped_frames += 1
+                    continue
+
+                try:
+                    # Decode langsung ke array float32 baru yang dipakai VAD dan Whisper
+                    audio_data = payload_to_audio(header, payload)
+                    codec = CODEC_NAMES[header.sample_fmt]
+                    self.uplink_bytes[codec] = self.uplink_bytes.get(codec, 0) + len(payload)
+                    self.uplink_samples[codec] = self.uplink_samples.get(codec, 0) + len(audio_data)
+                    if self.audio_processor.pipeline is None:
+                        self.audio_processor.start_pipeline()
+
+                    # Submit bisa memblok karena backpressure pipeline
+                    await loop.run_in_executor(
+                        self.executor, self.audio_processor.process_audio_stream,
+                        audio_data, header.source_lang, header.target_lang,
+                        header.output_device, header.timestamp_us, received_at, False
+                    )
+
+                except Exception as e:
+                    print(f"[sesi {self.session_id}] Error memproses data: {e}")
+
+        except ProtocolError as e:
+            print(f"[sesi {self.session_id}] Frame tidak valid dari client: {e}")
+        except (ConnectionError, OSError) as e:
+            if self.is_active:
+                print(f"[sesi {self.session_id}] Error handling client: {e}")
+        finally:
+            self.is_active = False
+            # Proses sisa ucapan lalu tutup pipeline; tetap dijalankan walau task dibatalkan
+            await asyncio.shield(loop.run_in_executor(self.executor, self._finish, header))
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+    
+    async def reject_frame(self, header):
+        """Buang frame audio yang formatnya tidak disepakati, beri tahu client sekali"""
+        self.rejected_frames += 1
+        if self.rejected_frames > 1:
+            return
+        name = CODEC_NAMES.get(header.sample_fmt, header.sample_fmt)
+        message = f"Format audio {name} tidak disepakati (codec sesi: {self.codec}), frame dibuang"
+        print(f"[sesi {self.session_id}] {message}")
+        await self.send_status({"state": "protocol_error", "error": message})
+    
+    async def set_voice(self, sample_rate, audio):
+        """Daftarkan rekaman suara dari client sebagai suara TTS sesi ini lalu kirim hasilnya"""
+        duration = len(audio) / sample_rate if sample_rate else 0.0
+        if not VOICE_MIN_S <= duration <= VOICE_MAX_S:
+            error = f"Rekaman suara harus {VOICE_MIN_S:.0f}-{VOICE_MAX_S:.0f} detik, diterima {duration:.1f} detik"
+        elif not self.models.ready.is_set():
+            error = "Model belum siap, kirim ulang rekaman suara setelah server siap"
+        else:
+            error = None
+        
+        voice_id = None
+        if error is None:
+            loop = asyncio.get_running_loop()
+            try:
+                voice_id = await loop.run_in_executor(
+                    self.executor, self.audio_processor.set_voice, audio, sample_rate
+                )
+            except Exception as e:
+                error = f"Gagal mendaftarkan suara: {e}"
+            else:
+                if voice_id is None:
+                    error = "Engine TTS tidak mendukung kloning suara, suara default dipakai"
+        
+        if error is not None:
+            print(f"[sesi {self.session_id}] {error}")
+            await self.send_status({"state": "voice_error", "error": error})
+            return
+        print(f"[sesi {self.session_id}] Suara TTS sesi: {voice_id}")
+        await self.send_status({"state": "voice_ready", "voice": voice_id})
+    
+    async def negotiate(self, hello):
+        """Pilih codec audio dari daftar preferensi client lalu kirim balasannya
+
+        Setelah negosiasi, hanya frame audio dengan codec terpilih yang
+        diterima (lihat reject_frame).
+        """
+        offered = hello.get("codecs")
+        if not isinstance(offered, list):
+            offered = []
+        self.codec = choose_codec([str(name) for name in offered], self.audio_codecs)
+        print(f"[sesi {self.session_id}] Codec audio: {self.codec}")
+        reply = {"codec": self.codec, "codecs": list(self.audio_codecs)}
+        await self.channel.write(encode_hello_frame(reply, self.session_id))
+    
+    def _finish(self, header):
+        """Flush ucapan yang belum selesai lalu hentikan pipeline (blocking)"""
+        if self.audio_processor.pipeline is None:
+            return
+        if header is not None:
+            self.audio_processor.flush_audio_stream(
+                header.source_lang, header.target_lang, header.output_device
             )
-            
-            print(f"Teks diterjemahkan: {transcribed_text} -> {translated_text}")
-            
-            # Konversi teks ke speech
-            self.text_to_speech(translated_text, output_device)
-            
-        except Exception as e:
-            print(f"Error dalam proses audio: {e}")
+        self.audio_processor.stop_pipeline()
+    
+    def drain(self):
+        """Berhenti menerima audio baru; ucapan yang sudah masuk tetap diproses dan dikirim"""
+        self.draining = True
+        # Hentikan pembacaan socket dulu agar tidak ada feed_data setelah feed_eof
+        self.writer.transport.pause_reading()
+        self.reader.feed_eof()
 
 class TranslationServer:
-    def __init__(self, host='localhost', port=12345):
+    """Server asyncio: satu task per sesi di atas ModelPool bersama
+
+    Jumlah sesi bersamaan dibatasi `max_sessions`; koneksi di atas batas
+    langsung ditutup. Sesi yang tidak mengirim data selama `idle_timeout`
+    detik ditutup. Saat berhenti, server berhenti menerima koneksi, men-drain
+    semua sesi (sisa ucapan diproses dan hasilnya dikirim) selama maksimal
+    `drain_timeout` detik, lalu membatalkan sesi yang tersisa.
+
+    Metrik (latensi per stage, RTF, antrian, sesi, cache) tersedia lewat
+    HTTP di `metrics_port`: /metrics dalam format Prometheus dan /stats
+    dalam JSON. metrics_port=None mematikan endpoint ini.
+
+    Dengan output_sink="device", audio diputar di `output_device` server
+    (None = perangkat default); perangkat diperiksa saat server dibuat
+    sehingga konfigurasi yang salah langsung gagal.
+    """
+    def __init__(self, host='localhost', port=12345, streaming_asr=False,
+                 streaming_translation=False, output_sink="client", output_path=None,
+                 model_options=None, max_sessions=32, backlog=100, idle_timeout=300.0,
+                 drain_timeout=30.0, executor_workers=None, metrics_port=12346,
+                 audio_codecs=None, output_device=None):
         self.host = host
         self.port = port
-        self.audio_processor = AudioProcessor()
+        self.metrics_port = metrics_port
+        self.metrics = ServerMetrics()
+        self.metrics.add_collector(self._metric_samples)
+        self.max_sessions = max_sessions
+        self.backlog = backlog
+        self.idle_timeout = idle_timeout
+        self.drain_timeout = drain_timeout
+        # Codec audio yang ditawarkan ke client saat negosiasi, None = semua
+        self.audio_codecs = audio_codecs
+        if output_sink == "device":
+            SoundDeviceSink.check_device(output_device)
+        # Opsi AudioProcessor untuk setiap sesi baru
+        self.processor_options = {
+            'streaming_asr': streaming_asr,
+            'streaming_translation': streaming_translation,
+            'output_sink': output_sink,
+            'output_device': output_device,
+            # Untuk sink "file", boleh memuat {session_id}, misalnya "sesi_{session_id}.wav"
+            'output_path': output_path,
+            'metrics': self.metrics,
+        }
+        # Opsi ModelPool, misalnya {'translation_backend': StubBackend()}
+        self.models = ModelPool(**(model_options or {}))
+        # Setiap sesi paling banyak punya satu pemanggilan blocking yang berjalan
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=executor_workers or max_sessions + 4,
+            thread_name_prefix="session-io",
+        )
         self.is_running = False
-        self.client_socket = None
+        self.sessions = {}
+        self._tasks = {}
+        self._next_session_id = 1
+        # Total uplink sesi yang sudah selesai: (byte, sampel) per codec
+        self._closed_uplink = ({}, {})
+        self._loop = None
+        self._stop_event = None
         
     def start_server(self):
-        """Jalankan server TCP"""
-        self.audio_processor.initialize_models()
-        
-        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        server_socket.bind((self.host, self.port))
-        server_socket.listen(1)
+        """Jalankan server sampai stop_server() dipanggil atau SIGINT/SIGTERM"""
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+    
+    async def serve(self):
+        """Coroutine utama server"""
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self._loop.add_signal_handler(sig, self._stop_event.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows / bukan main thread
         
-        print(f"Server berjalan di {self.host}:{self.port}")
+        # Bind dulu agar client bisa terhubung dan melihat progres pemuatan model
+        server = await asyncio.start_server(
+            self.handle_client, self.host, self.port, backlog=self.backlog
+        )
+        print(f"Server berjalan di {self.host}:{self.port} (maksimal {self.max_sessions} sesi)")
+        metrics_server = None
+        if self.metrics_port:
+            metrics_server = await serve_metrics(self.metrics, self.host, self.metrics_port)
         self.is_running = True
         
-        while self.is_running:
-            try:
-                self.client_socket, addr = server_socket.accept()
-                print(f"Terhubung dengan client: {addr}")
-                
-                # Handle client dalam thread terpisah
-                client_thread = threading.Thread(
-                    target=self.handle_client,
-                    args=(self.client_socket,)
-                )
-                client_thread.daemon = True
-                client_thread.start()
-                
-            except Exception as e:
-                print(f"Error server: {e}")
-                break
-        
-        server_socket.close()
+        # Memuat model memblok lama, jalankan di luar event loop
+        self.models.status_listener = self._on_model_status
+        loading = self._loop.run_in_executor(self.executor, self.models.initialize_models)
+        try:
+            await self._stop_event.wait()
+        finally:
+            self.is_running = False
+            server.close()
+            await server.wait_closed()
+            await self._drain_sessions()
+            # Pemuatan model di thread tidak bisa dibatalkan, tunggu sampai selesai
+            await asyncio.wait([loading])
+            self.models.status_listener = None
+            await self._loop.run_in_executor(self.executor, self.models.shutdown)
+            self.executor.shutdown(wait=False)
+            if metrics_server is not None:
+                metrics_server.close()
+                await metrics_server.wait_closed()
+            print("Server berhenti")
     
-    def handle_client(self, client_socket):
-        """Handle koneksi client"""
+    async def handle_client(self, reader, writer):
+        """Handle koneksi client dalam sesi tersendiri"""
+        addr = writer.get_extra_info('peername')
+        if not self.is_running or len(self.sessions) >= self.max_sessions:
+            print(f"Menolak client {addr}: batas {self.max_sessions} sesi tercapai")
+            writer.close()
+            return
+        
+        session_id = self._next_session_id
+        self._next_session_id += 1
+        session = TranslationSession(
+            session_id, reader, writer, addr, self.models, self.executor,
+            self.processor_options, self.idle_timeout, self.audio_codecs
+        )
+        self.sessions[session_id] = session
+        self._tasks[session_id] = asyncio.current_task()
+        print(f"Terhubung dengan client: {addr} (sesi {session_id})")
+        
         try:
-            while self.is_running:
-                # Terima data audio dari client
-                data = client_socket.recv(4096)
-                if not data:
-                    break
-                
-                # Decode data (format: JSON dengan metadata dan audio)
-                try:
-                    message = json.loads(data.decode())
-                    audio_data = np.frombuffer(bytes.fromhex(message['audio_data']), dtype=np.float32)
-                    source_lang = message['source_lang']
-                    target_lang = message['target_lang']
-                    output_device = message.get('output_device', None)
-                    
-                    # Proses audio
-                    self.audio_processor.process_audio_stream(
-                        audio_data, source_lang, target_lang, output_device
-                    )
-                    
-                except Exception as e:
-                    print(f"Error memproses data: {e}")
-                    
-        except Exception as e:
-            print(f"Error handling client: {e}")
+            await session.run()
         finally:
-            client_socket.close()
+            self.sessions.pop(session_id, None)
+            self._tasks.pop(session_id, None)
+            self._add_uplink(self._closed_uplink, session)
+            print(f"Sesi {session_id} ({addr}) selesai")
+    
+    @staticmethod
+    def _add_uplink(totals, session):
+        uplink_bytes, uplink_samples = totals
+        for codec, value in session.uplink_bytes.items():
+            uplink_bytes[codec] = uplink_bytes.get(codec, 0) + value
+        for codec, value in session.uplink_samples.items():
+            uplink_samples[codec] = uplink_samples.get(codec, 0) + value
+    
+    def _metric_samples(self):
+        """Gauge server untuk ServerMetrics (dipanggil dari event loop)"""
+        samples = [
+            ("translator_sessions", {}, len(self.sessions)),
+            ("translator_max_sessions", {}, self.max_sessions),
+            ("translator_models_ready", {}, int(self.models.ready.is_set())),
+        ]
+        depths = {}
+        blocked = {}
+        dropped = 0
+        rejected = 0
+        uplink_bytes, uplink_samples = (dict(totals) for totals in self._closed_uplink)
+        for session in list(self.sessions.values()):
+            dropped += session.dropped_frames
+            rejected += session.rejected_frames
+            self._add_uplink((uplink_bytes, uplink_samples), session)
+            pipeline = session.audio_processor.pipeline
+            if pipeline is None:
+                continue
+            for stage in pipeline.stages:
+                depths[stage.name] = depths.get(stage.name, 0) + stage.queue.qsize()
+                blocked[stage.name] = blocked.get(stage.name, 0.0) + stage.blocked_time
+        samples += [("translator_queue_depth", {"stage": k}, v) for k, v in depths.items()]
+        samples += [("translator_queue_blocked_seconds", {"stage": k}, v) for k, v in blocked.items()]
+        samples.append(("translator_dropped_frames", {}, dropped))
+        samples.append(("translator_rejected_frames", {}, rejected))
+        # Total sejak server start; byte per sampel = uplink_bytes / uplink_samples (float32 = 4)
+        samples += [("translator_uplink_bytes", {"codec": k}, v) for k, v in uplink_bytes.items()]
+        samples += [("translator_uplink_samples", {"codec": k}, v) for k, v in uplink_samples.items()]
+        
+        for name, state in self.models.readiness()["models"].items():
+            samples.append(("translator_model_ready", {"model": name}, int(state == "ready")))
+        registry = self.models.registry.stats()
+        for key in ("loads", "hits", "misses", "evictions", "load_errors", "hit_rate",
+                    "resident_bytes", "memory_budget"):
+            samples.append((f"translator_model_registry_{key}", {}, registry[key]))
+        for model in registry["models"]:
+            labels = {"kind": model["kind"], "name": model["name"],
+                      "language": model["language"] or ""}
+            samples.append(("translator_model_bytes", labels, model["bytes"]))
+        
+        for cache, stats in (("tts", self.models.tts_cache.stats()),
+                             ("translation", self.models.translation_cache.stats())):
+            for key, value in stats.items():
+                samples.append((f"translator_cache_{key}", {"cache": cache}, value))
+        return samples
+    
+    def _on_model_status(self, status):
+        """Dipanggil dari thread pemuat model; siarkan status ke semua sesi"""
+        self._loop.call_soon_threadsafe(self._broadcast_status, status)
+    
+    def _broadcast_status(self, status):
+        for session in list(self.sessions.values()):
+            asyncio.ensure_future(session.send_status(status))
+    
+    async def _drain_sessions(self):
+        """Drain semua sesi, batalkan yang belum selesai setelah drain_timeout"""
+        tasks = list(self._tasks.values())
+        if not tasks:
+            return
+        print(f"Menunggu {len(tasks)} sesi selesai...")
+        for session in list(self.sessions.values()):
+            session.drain()
+        done, pending = await asyncio.wait(tasks, timeout=self.drain_timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending, timeout=self.drain_timeout)
     
     def stop_server(self):
-        """Hentikan server"""
-        self.is_running = False
-        if self.client_socket:
-            self.client_socket.close()
+        """Hentikan server dengan graceful drain (aman dipanggil dari thread lain)"""
+        if self._loop is not None and self._stop_event is not None:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+
+def main():
+    parser = argparse.ArgumentParser(description="Server terjemahan suara real-time")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=12345)
+    parser.add_argument("--output-sink", choices=("client", "device", "file", "null"),
+                        default="client",
+                        help="Tempat audio TTS diputar: dikirim ke client, perangkat server, file WAV, atau dibuang")
+    parser.add_argument("--output-device", type=int, default=None,
+                        help="Index perangkat output server untuk --output-sink device (default: perangkat default)")
+    parser.add_argument("--output-path", default=None,
+                        help="File WAV untuk --output-sink file, boleh memuat {session_id}")
+    args = parser.parse_args()
+    if args.output_sink == "file" and not args.output_path:
+        parser.error("--output-sink file membutuhkan --output-path")
+
+    server = TranslationServer(
+        args.host, args.port, output_sink=args.output_sink,
+        output_device=args.output_device, output_path=args.output_path,
+    )
+    server.start_server()
+
 if __name__ == "__main__":
-    server = TranslationServer()
-    server.start_server()
\ No newline at end of file
+    main()
\ No newline at end of file
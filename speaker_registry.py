@@ -0,0 +1,102 @@
+import os
+import threading
+import wave
+
+import numpy as np
+import torch
+
+from tts_cache import file_hash
+
+
+class SpeakerRegistry:
+    """Conditioning latents XTTS per suara, dihitung sekali dan disimpan di disk
+
+    XTTS membutuhkan gpt_cond_latent dan speaker_embedding yang diekstrak
+    dari audio referensi. Tanpa registry, ekstraksi itu diulang setiap
+    kalimat. Di sini latents dihitung sekali per isi file referensi (key =
+    hash isi file), disimpan ke `cache_dir` dan dipakai langsung oleh
+    Xtts.inference. Voice id yang dikembalikan register() adalah hash itu,
+    sehingga suara yang sama dari sesi berbeda berbagi latents.
+
+    Pemanggil harus memegang lock model TTS saat register() karena ekstraksi
+    memakai model XTTS yang sama dengan sintesis.
+    """
+    def __init__(self, xtts_model, cache_dir="speaker_cache"):
+        self.model = xtts_model
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self._voices = {}  # voice_id -> (gpt_cond_latent, speaker_embedding)
+        self._lock = threading.Lock()
+
+    def _latents_path(self, voice_id):
+        return os.path.join(self.cache_dir, voice_id + ".pt")
+
+    def register(self, wav_path):
+        """Daftarkan file WAV referensi, return voice id"""
+        voice_id = file_hash(wav_path)
+        with self._lock:
+            if voice_id in self._voices:
+                return voice_id
+
+        path = self._latents_path(voice_id)
+        if os.path.exists(path):
+            data = torch.load(path, map_location=self.model.device)
+            latents = (data["gpt_cond_latent"], data["speaker_embedding"])
+        else:
+            with torch.no_grad():
+                latents = self.model.get_conditioning_latents(audio_path=[wav_path])
+            torch.save(
+                {"gpt_cond_latent": latents[0].cpu(), "speaker_embedding": latents[1].cpu()},
+                path,
+            )
+            latents = tuple(t.to(self.model.device) for t in latents)
+
+        with self._lock:
+            self._voices[voice_id] = latents
+        return voice_id
+
+    def register_audio(self, audio, sample_rate):
+        """Daftarkan suara dari audio float32 (misalnya rekaman peserta)"""
+        pcm = (np.clip(np.asarray(audio, dtype=np.float32), -1.0, 1.0) * 32767.0).astype(np.int16)
+        wav_path = os.path.join(self.cache_dir, f"voice_{os.getpid()}_{id(pcm)}.wav")
+        with wave.open(wav_path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(sample_rate)
+            wf.writeframes(pcm.tobytes())
+        try:
+            return self.register(wav_path)
+        finally:
+            os.remove(wav_path)
+
+    def get(self, voice_id):
+        """Return (gpt_cond_latent, speaker_embedding) atau None
+
+        Suara yang didaftarkan lewat instance lain (misalnya sebelum model
+        dikeluarkan dari memori lalu dimuat ulang) diambil dari cache disk.
+        """
+        with self._lock:
+            latents = self._voices.get(voice_id)
+        if latents is not None:
+            return latents
+
+        path = self._latents_path(voice_id)
+        if not os.path.exists(path):
+            return None
+        data = torch.load(path, map_location=self.model.device)
+        latents = (data["gpt_cond_latent"], data["speaker_embedding"])
+        with self._lock:
+            self._voices[voice_id] = latents
+        return latents
+
+    def synthesize(self, text, language, voice_id):
+        """Sintesis XTTS dengan latents yang sudah di-cache"""
+        latents = self.get(voice_id)
+        if latents is None:
+            raise KeyError(f"Suara belum terdaftar: {voice_id}")
+        with torch.no_grad():
+            out = self.model.inference(text, language, latents[0], latents[1])
+        wav = out["wav"]
+        if isinstance(wav, torch.Tensor):
+            wav = wav.cpu().numpy()
+        return np.asarray(wav, dtype=np.float32)
@@ -0,0 +1,133 @@
+import numpy as np
+
+SENTENCE_END = (".", "?", "!", "。", "？", "！")
+PUNCTUATION = ".,?!;:\"'、。，？！"
+
+
+def _normalize(word):
+    return word.strip().lower().strip(PUNCTUATION)
+
+
+def _join(words):
+    return "".join(w for _, _, w in words).strip()
+
+
+class StreamingTranscriber:
+    """Transkripsi inkremental dengan kebijakan local agreement
+
+    Jendela audio yang terus bertambah didekode ulang setiap kali ada audio
+    baru sepanjang `min_chunk_s`. Kata hanya di-commit jika muncul sama
+    persis di awal dua hipotesis berturut-turut (LocalAgreement-2), sehingga
+    hasil yang sudah keluar tidak berubah lagi. Audio yang katanya sudah
+    di-commit dipotong dari jendela saat kalimat selesai atau jendela melebihi
+    `trim_s`, agar setiap decode tetap pendek; teks yang dipotong dipakai
+    sebagai prompt decode berikutnya.
+
+    process() dan finish() mengembalikan list event (jenis, teks):
+    "partial" berisi kalimat yang sedang berjalan (boleh berubah),
+    "final" berisi kalimat yang sudah pasti dan siap diterjemahkan.
+    """
+    def __init__(self, transcribe_words, sample_rate=16000, min_chunk_s=1.0,
+                 trim_s=10.0, prompt_chars=200):
+        # transcribe_words(audio, prompt) -> list (start, end, word) relatif ke awal audio
+        self.transcribe_words = transcribe_words
+        self.sample_rate = sample_rate
+        self.min_chunk = int(min_chunk_s * sample_rate)
+        self.trim_s = trim_s
+        self.prompt_chars = prompt_chars
+        self.reset()
+
+    def reset(self):
+        """Mulai ucapan baru"""
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.buffer_offset = 0.0  # Waktu (detik) sampel pertama buffer dalam ucapan
+        self.committed = []       # Kata yang sudah pasti: (start, end, word) absolut
+        self.hypothesis = []      # Kata setelah committed yang belum disepakati
+        self.final_index = 0      # Index committed pertama yang belum dikirim sebagai final
+        self.new_samples = 0
+
+    def insert_audio(self, audio):
+        self.buffer = np.concatenate([self.buffer, np.asarray(audio, dtype=np.float32)])
+        self.new_samples += len(audio)
+
+    def process(self):
+        """Decode jendela saat ini jika audio baru sudah cukup"""
+        if self.new_samples < self.min_chunk:
+            return []
+        self.new_samples = 0
+
+        words = self._decode()
+        agreed = 0
+        for new, old in zip(words, self.hypothesis):
+            if _normalize(new[2]) != _normalize(old[2]):
+                break
+            agreed += 1
+        self.committed.extend(words[:agreed])
+        self.hypothesis = words[agreed:]
+
+        events = self._sentence_events()
+        partial = _join(self.committed[self.final_index:] + self.hypothesis)
+        if partial:
+            events.append(("partial", partial))
+        self._trim()
+        return events
+
+    def finish(self):
+        """Akhiri ucapan: semua hipotesis tersisa dianggap final"""
+        if self.new_samples or self.hypothesis:
+            self.committed.extend(self._decode())
+        text = _join(self.committed[self.final_index:])
+        self.reset()
+        return [("final", text)] if text else []
+
+    def _prompt(self):
+        """Teks committed yang audionya sudah dipotong dari buffer"""
+        trimmed = [w for w in self.committed if w[1] <= self.buffer_offset]
+        return _join(trimmed)[-self.prompt_chars:]
+
+    def _decode(self):
+        if not len(self.buffer):
+            return []
+        words = [
+            (start + self.buffer_offset, end + self.buffer_offset, word)
+            for start, end, word in self.transcribe_words(self.buffer, self._prompt())
+        ]
+
+        # Buang kata yang sudah di-commit dari decode sebelumnya
+        last_end = self.committed[-1][1] if self.committed else 0.0
+        words = [w for w in words if w[0] > last_end - 0.1]
+
+        # Buang n-gram di awal hipotesis yang mengulang ekor committed
+        for n in range(min(5, len(self.committed), len(words)), 0, -1):
+            tail = [_normalize(w[2]) for w in self.committed[-n:]]
+            head = [_normalize(w[2]) for w in words[:n]]
+            if tail == head:
+                words = words[n:]
+                break
+        return words
+
+    def _sentence_events(self):
+        """Kalimat yang sudah lengkap di committed menjadi event final"""
+        events = []
+        for i in range(self.final_index, len(self.committed)):
+            if self.committed[i][2].strip().endswith(SENTENCE_END):
+                text = _join(self.committed[self.final_index:i + 1])
+                self.final_index = i + 1
+                if text:
+                    events.append(("final", text))
+        return events
+
+    def _cut_buffer(self, t):
+        samples = int((t - self.buffer_offset) * self.sample_rate)
+        if samples <= 0:
+            return
+        self.buffer = self.buffer[samples:]
+        self.buffer_offset = t
+
+    def _trim(self):
+        """Potong audio yang sudah di-commit agar decode berikutnya tetap pendek"""
+        if self.final_index and self.committed[self.final_index - 1][1] > self.buffer_offset:
+            # Potong di akhir kalimat terakhir yang sudah final
+            self._cut_buffer(self.committed[self.final_index - 1][1])
+        if len(self.buffer) > self.trim_s * self.sample_rate and self.committed:
+            self._cut_buffer(self.committed[-1][1])
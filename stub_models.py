@@ -0,0 +1,105 @@
+import hashlib
+import itertools
+import threading
+import time
+
+import numpy as np
+
+from pipeline import Transcription
+
+_WORDS = ("selamat", "pagi", "rapat", "hari", "ini", "membahas", "rencana", "produk",
+          "baru", "dan", "jadwal", "rilis", "berikutnya", "untuk", "tim")
+
+
+class _StubWhisperModel:
+    """Pengganti model Whisper untuk transkripsi per kata (ASR streaming)"""
+    def __init__(self, owner):
+        self.owner = owner
+
+    def transcribe(self, audio, language=None, **options):
+        text, duration = self.owner._decode(audio)
+        words = text.split()
+        step = duration / max(len(words), 1)
+        segment_words = [
+            {"start": i * step, "end": (i + 1) * step, "word": " " + word}
+            for i, word in enumerate(words)
+        ]
+        return {
+            "text": text,
+            "language": language or self.owner.language,
+            "segments": [{"words": segment_words, "avg_logprob": -0.2}] if words else [],
+        }
+
+
+class StubASR:
+    """Pengganti WhisperBatchScheduler dengan latensi yang bisa diatur
+
+    Setiap decode menunggu `latency_s + rtf * durasi audio` sambil memegang
+    `model_lock`, sehingga decode antar sesi antre seperti di satu model
+    sungguhan. Teks berisi `words_per_s` kata per detik audio dengan nomor
+    urut, jadi setiap ucapan unik dan tidak kena cache terjemahan. Dengan
+    `phrases` > 0, teks bergiliran dari sejumlah itu kalimat tetap, seperti
+    frasa yang berulang dalam meeting.
+    """
+    def __init__(self, latency_s=0.0, rtf=0.0, words_per_s=2.5, language="id",
+                 sample_rate=16000, phrases=0):
+        self.latency_s = latency_s
+        self.rtf = rtf
+        self.words_per_s = words_per_s
+        self.language = language
+        self.sample_rate = sample_rate
+        self.phrases = phrases
+        self.fp16 = False
+        self.model_lock = threading.Lock()
+        self.model = _StubWhisperModel(self)
+        self._counter = itertools.count(1)
+
+    def _decode(self, audio):
+        duration = len(audio) / self.sample_rate
+        time.sleep(self.latency_s + self.rtf * duration)
+        if self.phrases:
+            index = next(self._counter) % self.phrases
+            words = itertools.islice(itertools.cycle(_WORDS), index, index + 6)
+            return " ".join(words).capitalize() + ".", duration
+        count = max(1, int(round(duration * self.words_per_s)))
+        words = itertools.islice(itertools.cycle(_WORDS), count)
+        return f"kalimat {next(self._counter)} " + " ".join(words) + ".", duration
+
+    def transcribe(self, audio, language=None, timeout=None):
+        with self.model_lock:
+            text, _ = self._decode(audio)
+        return Transcription(text, language or self.language, None if language else 1.0, -0.2)
+
+    def transcribe_words(self, audio, language=None, prompt="", timeout=None):
+        with self.model_lock:
+            return self.model.transcribe(audio, language=language, initial_prompt=prompt or None)
+
+    def stop(self, timeout=None):
+        pass
+
+
+class StubTTS:
+    """Pengganti TTSEngine: audio senyap sepanjang teks, latensi bisa diatur
+
+    Durasi audio `len(text) / chars_per_s` detik; sintesis menunggu
+    `latency_s + rtf * durasi audio`.
+    """
+    def __init__(self, latency_s=0.0, rtf=0.0, chars_per_s=15.0, sample_rate=22050):
+        self.latency_s = latency_s
+        self.rtf = rtf
+        self.chars_per_s = chars_per_s
+        self.sample_rate = sample_rate
+        self.default_voice = None
+
+    def synthesize(self, text, language, voice_id=None):
+        duration = max(len(text), 1) / self.chars_per_s
+        time.sleep(self.latency_s + self.rtf * duration)
+        return np.zeros(int(duration * self.sample_rate), dtype=np.float32)
+
+    def register_voice(self, audio, sample_rate):
+        digest = hashlib.sha1(np.asarray(audio, dtype=np.float32).tobytes())
+        digest.update(str(sample_rate).encode("ascii"))
+        return digest.hexdigest()
+
+    def close(self):
+        pass
@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+whisper = pytest.importorskip("whisper")
+
+from asr_batcher import WhisperBatchScheduler  # noqa: E402
+
+AUDIO = np.zeros(16000, dtype=np.float32)
+
+
+class FakeWhisper:
+    """Pengganti model Whisper: mencatat setiap decode tanpa inferensi"""
+    def __init__(self, fail_language=None):
+        self.device = "cpu"
+        self.dims = SimpleNamespace(n_mels=80)
+        self.fail_language = fail_language
+        self.calls = []
+
+    def decode(self, model, mel, options):
+        self.calls.append(("batch", options.language, len(mel)))
+        if self.fail_language is not None and options.language == self.fail_language:
+            raise RuntimeError("decode gagal")
+        return [
+            SimpleNamespace(text=f"teks {i}", language=options.language or "id",
+                            language_probs=None, avg_logprob=-0.2)
+            for i in range(len(mel))
+        ]
+
+    def transcribe(self, audio, **options):
+        self.calls.append(("words", options))
+        return {"text": "halo", "segments": []}
+
+
+@pytest.fixture
+def model(monkeypatch):
+    model = FakeWhisper()
+    monkeypatch.setattr(whisper, "decode", model.decode)
+    monkeypatch.setattr(whisper, "DecodingOptions", lambda **kw: SimpleNamespace(**kw))
+    return model
+
+
+def _scheduler(model, batch_size):
+    # Batas tunggu panjang: batch selesai karena penuh, bukan karena timeout
+    return WhisperBatchScheduler(model, max_batch_size=batch_size, max_wait_ms=5000, fp16=False)
+
+
+def test_batch_groups_requests_by_language(model):
+    scheduler = _scheduler(model, 4)
+    # Diantrikan sebelum worker jalan agar semuanya masuk satu batch
+    futures = [scheduler.submit(AUDIO, language) for language in ("id", "en", "id", None)]
+    scheduler.start()
+    try:
+        results = [future.result(10) for future in futures]
+    finally:
+        scheduler.stop(10)
+
+    assert sorted(model.calls, key=str) == sorted(
+        [("batch", "id", 2), ("batch", "en", 1), ("batch", None, 1)], key=str
+    )
+    assert [r.language for r in results] == ["id", "en", "id", "id"]
+    assert [r.text for r in results] == ["teks 0", "teks 0", "teks 1", "teks 0"]
+    assert scheduler.average_batch_size() == 4.0
+
+
+def test_failed_language_group_does_not_fail_others(model):
+    model.fail_language = "en"
+    scheduler = _scheduler(model, 2)
+    ok = scheduler.submit(AUDIO, "id")
+    failed = scheduler.submit(AUDIO, "en")
+    scheduler.start()
+    try:
+        assert ok.result(10).text == "teks 0"
+        with pytest.raises(RuntimeError):
+            failed.result(10)
+    finally:
+        scheduler.stop(10)
+
+
+def test_word_requests_run_after_batch(model):
+    scheduler = _scheduler(model, 3)
+    words = scheduler.submit_words(AUDIO, "ja", prompt="")
+    utterances = [scheduler.submit(AUDIO, "ja") for _ in range(2)]
+    scheduler.start()
+    try:
+        assert words.result(10)["text"] == "halo"
+        assert all(f.result(10).language == "ja" for f in utterances)
+    finally:
+        scheduler.stop(10)
+
+    # Batch ucapan lebih dulu, lalu decode per kata satu pass tanpa fallback temperature
+    assert model.calls[0] == ("batch", "ja", 2)
+    kind, options = model.calls[1]
+    assert kind == "words"
+    assert options["language"] == "ja"
+    assert options["word_timestamps"] is True
+    assert options["temperature"] == 0.0
+    assert options["initial_prompt"] is None
@@ -0,0 +1,104 @@
+import zlib
+
+import numpy as np
+import pytest
+
+from audio_codec import (
+    CODEC_IDS, CODEC_NAMES, DEFAULT_PREFERENCE, FMT_FLOAT32, FMT_INT16, FMT_MULAW,
+    FMT_ZLIB16, CodecError, choose_codec, decode, encode,
+)
+
+
+def _speech_like(n=16000, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / 16000.0
+    audio = 0.4 * np.sin(2 * np.pi * 220 * t) + 0.05 * rng.standard_normal(n)
+    return np.clip(audio, -1.0, 1.0).astype(np.float32)
+
+
+@pytest.mark.parametrize("fmt, max_error, bytes_per_sample", [
+    (FMT_FLOAT32, 0.0, 4),
+    (FMT_INT16, 1.6e-5, 2),
+    (FMT_MULAW, 0.02, 1),
+    (FMT_ZLIB16, 1.6e-5, None),
+])
+def test_round_trip_error(fmt, max_error, bytes_per_sample):
+    audio = _speech_like()
+    payload = encode(fmt, audio)
+    if bytes_per_sample is not None:
+        assert len(payload) == bytes_per_sample * len(audio)
+    decoded = decode(fmt, payload)
+    assert decoded.dtype == np.float32
+    assert len(decoded) == len(audio)
+    assert np.max(np.abs(decoded - audio)) <= max_error
+
+
+def test_zlib16_is_lossless_against_int16():
+    audio = _speech_like()
+    np.testing.assert_array_equal(
+        decode(FMT_ZLIB16, encode(FMT_ZLIB16, audio)),
+        decode(FMT_INT16, encode(FMT_INT16, audio)),
+    )
+
+
+def test_zlib16_compresses_silence():
+    assert len(encode(FMT_ZLIB16, np.zeros(16000, np.float32))) < 200
+
+
+def test_full_scale_clipping():
+    audio = np.array([-2.0, -1.0, 0.0, 1.0, 2.0], dtype=np.float32)
+    for fmt in (FMT_INT16, FMT_MULAW, FMT_ZLIB16):
+        decoded = decode(fmt, encode(fmt, audio))
+        assert np.all(np.abs(decoded) <= 1.0)
+        np.testing.assert_allclose(decoded, [-1.0, -1.0, 0.0, 1.0, 1.0], atol=1e-4)
+
+
+def test_decode_into_buffer():
+    audio = _speech_like(320)
+    out = np.zeros(1024, dtype=np.float32)
+    for fmt in CODEC_NAMES:
+        decoded = decode(fmt, encode(fmt, audio), out=out)
+        assert len(decoded) == len(audio)
+        assert np.shares_memory(decoded, out)
+    with pytest.raises(CodecError):
+        decode(FMT_FLOAT32, encode(FMT_FLOAT32, audio), out=np.zeros(10, np.float32))
+
+
+def test_rejects_odd_length():
+    with pytest.raises(CodecError):
+        decode(FMT_FLOAT32, b"\x00" * 7)
+    with pytest.raises(CodecError):
+        decode(FMT_INT16, b"\x00" * 3)
+
+
+def test_rejects_zlib_bomb():
+    # Payload kecil yang mengembang jauh melebihi max_samples
+    bomb = zlib.compress(b"\x00" * (32 * 1024 * 1024), 9)
+    assert len(bomb) < 64 * 1024
+    with pytest.raises(CodecError):
+        decode(FMT_ZLIB16, bomb, max_samples=16000)
+
+
+def test_rejects_corrupt_zlib():
+    payload = bytearray(encode(FMT_ZLIB16, _speech_like(1000)))
+    payload[2:10] = b"\xff" * 8
+    with pytest.raises(CodecError):
+        decode(FMT_ZLIB16, bytes(payload))
+    with pytest.raises(CodecError):
+        decode(FMT_ZLIB16, zlib.compress(b"\x00" * 3))
+
+
+def test_rejects_unknown_format():
+    with pytest.raises(CodecError):
+        encode(99, np.zeros(4, np.float32))
+    with pytest.raises(CodecError):
+        decode(99, b"\x00" * 4)
+
+
+def test_choose_codec():
+    assert choose_codec(DEFAULT_PREFERENCE) == "zlib16"
+    assert choose_codec(["opus", "mulaw", "int16"]) == "mulaw"
+    assert choose_codec(["zlib16", "int16"], supported=["int16", "float32"]) == "int16"
+    assert choose_codec(["opus"]) == "float32"
+    assert choose_codec([]) == "float32"
+    assert set(CODEC_IDS) == set(DEFAULT_PREFERENCE)
@@ -0,0 +1,77 @@
+import re
+
+import pytest
+
+pytest.importorskip("ollama")
+
+from context_aware_translator import ContextAwareTranslator, request_message, split_ready_segments  # noqa: E402
+
+
+class WordBackend:
+    """Backend palsu: satu token per kata, jawaban = teks sumber dalam huruf besar"""
+    model = "palsu"
+
+    def __init__(self):
+        self.requests = []
+
+    def count_tokens(self, text):
+        return len(text.split())
+
+    def chat(self, messages, model=None, stream=False, usage=None):
+        self.requests.append(messages)
+        answer = messages[-1]['content'].split('"')[1].upper()
+        if stream:
+            return iter(re.findall(r"\S+\s*", answer))
+        return answer
+
+
+def _tokens(text, translation):
+    return len(request_message(text, "en").split()) + len(translation.split())
+
+
+def test_history_is_trimmed_to_ratio_of_budget():
+    backend = WordBackend()
+    turn = _tokens("satu dua tiga", "SATU DUA TIGA")
+    # Anggaran cukup untuk tepat 4 giliran
+    translator = ContextAwareTranslator(max_context_tokens=4 * turn, backend=backend, trim_ratio=0.5)
+
+    for i in range(4):
+        translator.translate_with_context(f"kalimat ke {i}", None, "en")
+    assert len(translator.context_history) == 4
+    assert translator.context_tokens == 4 * turn
+
+    # Giliran kelima melewati anggaran: yang terlama dibuang sampai <= 50%
+    translator.translate_with_context("kalimat ke 4", None, "en")
+    assert [t.text for t in translator.context_history] == ["kalimat ke 3", "kalimat ke 4"]
+    assert translator.context_tokens == 2 * turn
+    assert translator.current_context == "kalimat ke 3 kalimat ke 4"
+
+
+def test_prefix_is_stable_between_trims():
+    backend = WordBackend()
+    translator = ContextAwareTranslator(max_context_tokens=1000, backend=backend)
+    translator.translate_with_context("selamat pagi", None, "en")
+    translator.translate_with_context("apa kabar", None, "en")
+
+    first, second = backend.requests
+    # Request kedua = request pertama + jawaban assistant + kalimat baru
+    assert second[:len(first)] == first
+    assert second[len(first)] == {'role': 'assistant', 'content': "SELAMAT PAGI"}
+    assert second[-1]['content'] == request_message("apa kabar", "en")
+    assert translator.last_usage['prompt_tokens'] == sum(len(m['content'].split()) for m in second)
+
+
+def test_streaming_translation_updates_context():
+    backend = WordBackend()
+    translator = ContextAwareTranslator(backend=backend)
+    pieces = list(translator.translate_with_context_stream("halo. apa kabar?", None, "en"))
+    assert pieces == ["HALO.", "APA KABAR?"]
+    assert translator.context_history[-1].text == "halo. apa kabar?"
+
+
+def test_split_ready_segments():
+    segments, rest = split_ready_segments("Harga naik 3.5 persen. Lalu", 40)
+    assert segments == ["Harga naik 3.5 persen."]
+    assert rest == "Lalu"
+    # Klausa hanya dipotong jika sudah cukup panjang
+    assert split_ready_segments("Ya, tentu", 40) == ([], "Ya, tentu")
@@ -0,0 +1,66 @@
+from language_lock import SessionLanguage
+
+
+def test_requested_language_skips_detection():
+    language = SessionLanguage("ja")
+    assert not language.auto
+    assert language.decode_language() == "ja"
+    # Hasil deteksi diabaikan jika client memilih bahasa sendiri
+    for _ in range(5):
+        language.observe("en", 0.99)
+    assert language.decode_language() == "ja"
+
+
+def test_auto_locks_after_consecutive_confident_detections():
+    language = SessionLanguage("auto", confirmations=3, min_probability=0.8)
+    assert language.auto
+    assert language.decode_language() is None
+
+    language.observe("id", 0.95)
+    language.observe("id", 0.9)
+    assert language.decode_language() is None
+    language.observe("id", None)  # transcribe() tanpa probabilitas tetap dihitung
+    assert language.locked == "id"
+    assert language.decode_language() == "id"
+
+
+def test_streak_resets_on_other_or_unsure_language():
+    language = SessionLanguage(None, confirmations=2, min_probability=0.8)
+    language.observe("id", 0.95)
+    language.observe("ms", 0.95)
+    assert language.locked is None
+    assert (language.candidate, language.streak) == ("ms", 1)
+
+    language.observe("ms", 0.5)
+    assert (language.candidate, language.streak) == (None, 0)
+    language.observe("ms", 0.9)
+    language.observe("ms", 0.9)
+    assert language.locked == "ms"
+
+
+def test_low_confidence_decodes_release_lock():
+    language = SessionLanguage(None, confirmations=1, min_logprob=-1.0, misses_to_redetect=2)
+    language.observe("en", 0.9)
+    assert language.locked == "en"
+
+    # Satu decode bagus di antara yang buruk me-reset hitungan
+    language.observe("en", avg_logprob=-1.5)
+    language.observe("en", avg_logprob=-0.3)
+    language.observe("en", avg_logprob=-1.5)
+    assert language.locked == "en"
+
+    language.observe("en", avg_logprob=-2.0)
+    assert language.locked is None
+    assert language.decode_language() is None
+
+
+def test_changing_requested_language_resets_detection():
+    language = SessionLanguage(None, confirmations=1)
+    language.observe("en", 0.9)
+    assert language.locked == "en"
+
+    language.set_requested("id")
+    assert language.decode_language() == "id"
+    language.set_requested("")
+    assert language.auto
+    assert language.locked is None
@@ -0,0 +1,186 @@
+import threading
+import time
+
+import pytest
+
+from model_registry import ModelRegistry, estimate_model_bytes
+
+MB = 2**20
+
+
+class FakeModel:
+    def __init__(self, name):
+        self.name = name
+        self.unloaded = False
+
+
+def _registry(budget, hint=100 * MB, delay=0.0):
+    registry = ModelRegistry(budget)
+    loads = []
+
+    def loader(name, language):
+        time.sleep(delay)
+        loads.append((name, language))
+        return FakeModel(name)
+
+    def unloader(model):
+        model.unloaded = True
+
+    registry.register_loader("asr", loader, unloader, size_hint=hint)
+    return registry, loads
+
+
+def _load(registry, name, language=None):
+    with registry.use("asr", name, language) as model:
+        return model
+
+
+def test_hit_after_load():
+    registry, loads = _registry(1000 * MB)
+    a = _load(registry, "a")
+    assert _load(registry, "a") is a
+    assert loads == [("a", None)]
+    stats = registry.stats()
+    assert (stats["loads"], stats["hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["resident_bytes"] == 100 * MB
+
+
+def test_language_is_part_of_key():
+    registry, loads = _registry(1000 * MB)
+    _load(registry, "tts", "en")
+    _load(registry, "tts", "id")
+    assert loads == [("tts", "en"), ("tts", "id")]
+    assert registry.is_loaded("asr", "tts", "en")
+    assert not registry.is_loaded("asr", "tts", "fr")
+
+
+def test_lru_eviction():
+    registry, _ = _registry(250 * MB)
+    a = _load(registry, "a")
+    b = _load(registry, "b")
+    _load(registry, "a")  # a jadi paling baru dipakai
+    _load(registry, "c")
+    assert b.unloaded and not a.unloaded
+    assert registry.is_loaded("asr", "a")
+    assert not registry.is_loaded("asr", "b")
+    assert registry.is_loaded("asr", "c")
+    assert registry.stats()["evictions"] == 1
+
+
+def test_pinned_model_is_never_evicted():
+    registry, _ = _registry(150 * MB)
+    registry.pin("asr", "default")
+    default = _load(registry, "default")
+    for name in ("x", "y", "z"):
+        _load(registry, name)
+    assert not default.unloaded
+    assert registry.is_loaded("asr", "default")
+
+    registry.unpin("asr", "default")
+    _load(registry, "w")
+    assert default.unloaded
+
+
+def test_model_in_use_is_not_evicted():
+    registry, _ = _registry(150 * MB)
+    held = registry.acquire("asr", "held")
+    other = _load(registry, "other")
+    # Anggaran boleh terlampaui sementara selama model masih dipakai
+    assert not held.unloaded
+    assert registry.is_loaded("asr", "held")
+
+    registry.release("asr", "held")
+    _load(registry, "third")
+    assert held.unloaded or other.unloaded
+    assert registry.stats()["resident_bytes"] <= 150 * MB
+
+
+def test_concurrent_acquire_loads_once():
+    registry, loads = _registry(1000 * MB, delay=0.05)
+    results = []
+
+    def worker():
+        results.append(_load(registry, "shared"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loads == [("shared", None)]
+    assert len(results) == 8 and all(model is results[0] for model in results)
+
+
+def test_failed_load_is_retried():
+    registry = ModelRegistry(1000 * MB)
+    attempts = []
+
+    def loader(name, language):
+        attempts.append(name)
+        if len(attempts) == 1:
+            raise RuntimeError("gagal")
+        return FakeModel(name)
+
+    registry.register_loader("tts", loader)
+    with pytest.raises(RuntimeError):
+        registry.acquire("tts", "xtts")
+    assert not registry.is_loaded("tts", "xtts")
+    assert registry.stats()["load_errors"] == 1
+
+    assert registry.acquire("tts", "xtts").name == "xtts"
+    assert len(attempts) == 2
+
+
+def test_unknown_kind():
+    registry = ModelRegistry(MB)
+    with pytest.raises(KeyError):
+        registry.acquire("vocoder", "hifigan")
+
+
+def test_close_unloads_everything():
+    registry, _ = _registry(1000 * MB)
+    models = [_load(registry, name) for name in ("a", "b")]
+    registry.close()
+    assert all(model.unloaded for model in models)
+    assert registry.stats()["models"] == []
+
+
+class FakeTensor:
+    def __init__(self, numel, element_size):
+        self._numel = numel
+        self._element_size = element_size
+
+    def numel(self):
+        return self._numel
+
+    def element_size(self):
+        return self._element_size
+
+
+class FakeModule:
+    def __init__(self, params, buffers=()):
+        self._params = params
+        self._buffers = list(buffers)
+
+    def parameters(self):
+        return iter(self._params)
+
+    def buffers(self):
+        return iter(self._buffers)
+
+    def modules(self):
+        return iter([self])
+
+
+def test_estimate_model_bytes():
+    module = FakeModule([FakeTensor(1000, 4), FakeTensor(10, 2)], [FakeTensor(5, 4)])
+    assert estimate_model_bytes(module) == 4000 + 20 + 20
+
+    class Wrapper:
+        pass
+
+    wrapper = Wrapper()
+    wrapper.model = module
+    wrapper.tts_model = module  # modul yang sama hanya dihitung sekali
+    assert estimate_model_bytes(wrapper) == 4040
+    assert estimate_model_bytes(FakeModel("x")) == 0
@@ -0,0 +1,176 @@
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+from audio_codec import FMT_INT16, FMT_ZLIB16
+from protocol import (
+    HEADER_SIZE, MAX_PAYLOAD_SIZE, MSG_AUDIO, MSG_HELLO, MSG_STATUS, MSG_TRANSCRIPT,
+    MSG_TTS_AUDIO, MSG_VOICE, FLAG_PARTIAL, FrameReader, ProtocolError, encode_audio_frame,
+    encode_hello_frame, encode_status_frame, encode_text_frame, encode_tts_audio_frame,
+    encode_voice_frame,
+    pack_header, payload_to_audio, payload_to_hello, payload_to_status, payload_to_text,
+    payload_to_tts_audio, unpack_header,
+)
+
+
+def _split(frame):
+    header = unpack_header(frame[:HEADER_SIZE])
+    payload = frame[HEADER_SIZE:]
+    assert header.payload_len == len(payload)
+    return header, payload
+
+
+def test_header_round_trip():
+    data = pack_header(
+        MSG_AUDIO, 123, session_id=7, seq=42, timestamp_us=1_700_000_000_000_000,
+        source_lang="id", target_lang="en", output_device=3, flags=FLAG_PARTIAL,
+    )
+    assert len(data) == HEADER_SIZE
+    header = unpack_header(data)
+    assert header.msg_type == MSG_AUDIO
+    assert header.payload_len == 123
+    assert header.session_id == 7
+    assert header.seq == 42
+    assert header.timestamp_us == 1_700_000_000_000_000
+    assert header.source_lang == "id"
+    assert header.target_lang == "en"
+    assert header.output_device == 3
+    assert header.flags == FLAG_PARTIAL
+
+
+def test_header_without_output_device():
+    header = unpack_header(pack_header(MSG_AUDIO, 0))
+    assert header.output_device is None
+    assert header.source_lang == ""
+
+
+def test_header_rejects_bad_magic_and_version():
+    data = bytearray(pack_header(MSG_AUDIO, 0))
+    data[0:2] = b"XX"
+    with pytest.raises(ProtocolError):
+        unpack_header(bytes(data))
+
+    data = bytearray(pack_header(MSG_AUDIO, 0))
+    data[2] = 99
+    with pytest.raises(ProtocolError):
+        unpack_header(bytes(data))
+
+
+def test_payload_size_limit():
+    with pytest.raises(ProtocolError):
+        pack_header(MSG_AUDIO, MAX_PAYLOAD_SIZE + 1)
+
+
+@pytest.mark.parametrize("sample_fmt", [1, FMT_INT16, FMT_ZLIB16])
+def test_audio_frame_round_trip(sample_fmt):
+    audio = np.linspace(-0.5, 0.5, 480, dtype=np.float32)
+    frame = encode_audio_frame(audio, 1, 5, "id", "en", timestamp_us=10, sample_fmt=sample_fmt)
+    header, payload = _split(frame)
+    assert header.sample_fmt == sample_fmt
+    assert header.timestamp_us == 10
+    decoded = payload_to_audio(header, payload)
+    np.testing.assert_allclose(decoded, audio, atol=1e-4)
+
+
+def test_audio_decode_into_buffer():
+    audio = np.arange(10, dtype=np.float32) / 10
+    header, payload = _split(encode_audio_frame(audio, 1, 0, "id", "en"))
+    out = np.zeros(32, dtype=np.float32)
+    decoded = payload_to_audio(header, payload, out=out)
+    assert np.shares_memory(decoded, out)
+    np.testing.assert_array_equal(out[:10], audio)
+
+
+def test_audio_rejects_odd_payload():
+    header, payload = _split(encode_audio_frame(np.zeros(4, np.float32), 1, 0, "id", "en"))
+    with pytest.raises(ProtocolError):
+        payload_to_audio(header, payload[:-1])
+
+
+def test_text_frame():
+    frame = encode_text_frame(MSG_TRANSCRIPT, "halo dunia ✓", 3, 9, 55, "id", "en")
+    header, payload = _split(frame)
+    assert header.msg_type == MSG_TRANSCRIPT
+    assert header.seq == 9
+    assert payload_to_text(payload) == "halo dunia ✓"
+
+
+def test_tts_audio_frame():
+    audio = np.linspace(-1.0, 1.0, 100, dtype=np.float32)
+    header, payload = _split(encode_tts_audio_frame(audio, 22050, 1, 2, 3, "en"))
+    assert header.msg_type == MSG_TTS_AUDIO
+    sample_rate, decoded = payload_to_tts_audio(header, payload)
+    assert sample_rate == 22050
+    np.testing.assert_array_equal(decoded, audio)
+
+
+def test_voice_frame():
+    audio = np.linspace(-0.5, 0.5, 48000, dtype=np.float32)
+    header, payload = _split(encode_voice_frame(audio, 16000, 4))
+    assert header.msg_type == MSG_VOICE
+    assert header.session_id == 4
+    sample_rate, decoded = payload_to_tts_audio(header, payload)
+    assert sample_rate == 16000
+    np.testing.assert_array_equal(decoded, audio)
+
+
+def test_tts_audio_rejects_short_payload():
+    header = unpack_header(pack_header(MSG_TTS_AUDIO, 2))
+    with pytest.raises(ProtocolError):
+        payload_to_tts_audio(header, b"\x00\x00")
+
+
+def test_status_and_hello():
+    header, payload = _split(encode_status_frame({"state": "ready", "models": 2}, 4))
+    assert header.msg_type == MSG_STATUS
+    assert payload_to_status(payload) == {"state": "ready", "models": 2}
+
+    header, payload = _split(encode_hello_frame({"codecs": ["zlib16", "int16"]}, 4))
+    assert header.msg_type == MSG_HELLO
+    assert payload_to_hello(payload) == {"codecs": ["zlib16", "int16"]}
+
+    with pytest.raises(ProtocolError):
+        payload_to_status(b"{bukan json")
+    with pytest.raises(ProtocolError):
+        payload_to_hello(b"[1, 2]")
+
+
+def test_frame_reader_over_socket():
+    a, b = socket.socketpair()
+    try:
+        audio = np.ones(100_000, dtype=np.float32) * 0.25
+
+        def send():
+            a.sendall(encode_text_frame(MSG_TRANSCRIPT, "satu", 1, 1, 1))
+            a.sendall(encode_audio_frame(audio, 1, 2, "id", "en"))
+            a.shutdown(socket.SHUT_WR)
+
+        # Payload lebih besar dari buffer socket, jadi kirim dari thread lain
+        sender = threading.Thread(target=send)
+        sender.start()
+        reader = FrameReader(b, initial_size=16)
+        header, payload = reader.read_frame()
+        assert payload_to_text(payload) == "satu"
+        # Buffer harus membesar untuk payload yang melebihi initial_size
+        header, payload = reader.read_frame()
+        np.testing.assert_array_equal(payload_to_audio(header, payload), audio)
+        assert reader.read_frame() is None
+        sender.join()
+    finally:
+        a.close()
+        b.close()
+
+
+def test_frame_reader_truncated_frame():
+    a, b = socket.socketpair()
+    try:
+        frame = encode_text_frame(MSG_TRANSCRIPT, "terpotong", 1, 1, 1)
+        a.sendall(frame[:-3])
+        a.shutdown(socket.SHUT_WR)
+        with pytest.raises(ProtocolError):
+            FrameReader(b).read_frame()
+    finally:
+        a.close()
+        b.close()
@@ -0,0 +1,78 @@
+import threading
+
+import numpy as np
+
+from ring_buffer import AudioRingBuffer
+
+
+def test_write_read_and_space():
+    ring = AudioRingBuffer(8)
+    assert ring.available() == 0
+    assert ring.space() == 8
+    assert ring.write(np.arange(5, dtype=np.float32)) == 5
+    assert ring.available() == 5
+    assert ring.space() == 3
+
+    out = np.zeros(3, dtype=np.float32)
+    assert ring.read_into(out) == 3
+    np.testing.assert_array_equal(out, [0, 1, 2])
+    assert ring.available() == 2
+
+
+def test_write_stops_when_full():
+    ring = AudioRingBuffer(4)
+    assert ring.write(np.ones(6, dtype=np.float32)) == 4
+    assert ring.write(np.ones(1, dtype=np.float32)) == 0
+    assert ring.space() == 0
+
+
+def test_read_from_empty_and_partial():
+    ring = AudioRingBuffer(4)
+    out = np.full(4, -1.0, dtype=np.float32)
+    assert ring.read_into(out) == 0
+    ring.write(np.array([7.0], dtype=np.float32))
+    assert ring.read_into(out) == 1
+    np.testing.assert_array_equal(out, [7.0, -1.0, -1.0, -1.0])
+
+
+def test_wraparound():
+    ring = AudioRingBuffer(5)
+    out = np.zeros(5, dtype=np.float32)
+    ring.write(np.arange(4, dtype=np.float32))
+    ring.read_into(out[:3])
+    # Tulisan ini melewati akhir buffer dan berlanjut di awal
+    assert ring.write(np.arange(10, 14, dtype=np.float32)) == 4
+    assert ring.available() == 5
+    assert ring.read_into(out) == 5
+    np.testing.assert_array_equal(out, [3, 10, 11, 12, 13])
+
+
+def test_clear():
+    ring = AudioRingBuffer(4)
+    ring.write(np.ones(3, dtype=np.float32))
+    ring.clear()
+    assert ring.available() == 0
+    assert ring.space() == 4
+
+
+def test_producer_consumer_threads():
+    # Satu penulis dan satu pembaca: urutan sampel harus utuh tanpa lock
+    ring = AudioRingBuffer(257)
+    source = np.arange(20_000, dtype=np.float32)
+    received = np.zeros_like(source)
+
+    def produce():
+        pos = 0
+        while pos < len(source):
+            pos += ring.write(source[pos:pos + 100])
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    pos = 0
+    block = np.zeros(64, dtype=np.float32)
+    while pos < len(source):
+        n = ring.read_into(block)
+        received[pos:pos + n] = block[:n]
+        pos += n
+    producer.join()
+    np.testing.assert_array_equal(received, source)
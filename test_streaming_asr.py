@@ -0,0 +1,101 @@
+import numpy as np
+
+from streaming_asr import StreamingTranscriber
+
+SR = 16000
+
+
+class ScriptedASR:
+    """transcribe_words palsu: setiap decode mengembalikan hipotesis berikutnya dari skrip"""
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = []
+
+    def __call__(self, audio, prompt):
+        self.calls.append((len(audio), prompt))
+        return self.script.pop(0)
+
+
+def _second():
+    return np.zeros(SR, dtype=np.float32)
+
+
+def test_local_agreement_commits_common_prefix():
+    asr = ScriptedASR([
+        [(0.0, 0.5, "Halo"), (0.5, 1.0, " dunia")],
+        [(0.0, 0.5, "Halo"), (0.5, 1.0, " dunia"), (1.0, 1.5, " ini")],
+    ])
+    transcriber = StreamingTranscriber(asr, SR, min_chunk_s=1.0)
+
+    # Belum cukup audio baru, tidak ada decode
+    transcriber.insert_audio(np.zeros(SR // 2, dtype=np.float32))
+    assert transcriber.process() == []
+    assert asr.calls == []
+
+    transcriber.insert_audio(np.zeros(SR // 2, dtype=np.float32))
+    assert transcriber.process() == [("partial", "Halo dunia")]
+    assert transcriber.committed == []
+
+    # Dua hipotesis berturut-turut sepakat pada "Halo dunia"
+    transcriber.insert_audio(_second())
+    assert transcriber.process() == [("partial", "Halo dunia ini")]
+    assert [w[2] for w in transcriber.committed] == ["Halo", " dunia"]
+    assert [w[2] for w in transcriber.hypothesis] == [" ini"]
+
+
+def test_disagreement_commits_nothing():
+    asr = ScriptedASR([
+        [(0.0, 0.5, "Halo"), (0.5, 1.0, " dunia")],
+        [(0.0, 0.5, "Kalau"), (0.5, 1.0, " dunia")],
+    ])
+    transcriber = StreamingTranscriber(asr, SR)
+    for _ in range(2):
+        transcriber.insert_audio(_second())
+        transcriber.process()
+    assert transcriber.committed == []
+    assert [w[2] for w in transcriber.hypothesis] == ["Kalau", " dunia"]
+
+
+def test_final_sentence_trims_buffer_and_becomes_prompt():
+    asr = ScriptedASR([
+        [(0.0, 0.5, " Halo"), (0.5, 1.0, " semua.")],
+        [(0.0, 0.5, " Halo"), (0.5, 1.0, " semua."), (1.2, 1.8, " Apa")],
+        # Waktu relatif terhadap buffer yang sudah dipotong 1 detik
+        [(0.2, 0.8, " Apa"), (0.8, 1.3, " kabar?")],
+        [(0.2, 0.8, " Apa"), (0.8, 1.3, " kabar?")],
+    ])
+    transcriber = StreamingTranscriber(asr, SR)
+
+    transcriber.insert_audio(_second())
+    transcriber.process()
+    transcriber.insert_audio(_second())
+    assert transcriber.process() == [("final", "Halo semua."), ("partial", "Apa")]
+
+    # Audio kalimat yang sudah final dipotong dari jendela
+    assert transcriber.buffer_offset == 1.0
+    assert len(transcriber.buffer) == SR
+
+    transcriber.insert_audio(_second())
+    assert transcriber.process() == [("partial", "Apa kabar?")]
+    assert asr.calls[2] == (2 * SR, "Halo semua.")
+    assert transcriber.committed[-1] == (1.2, 1.8, " Apa")
+
+    # finish() membuang kata yang sudah di-commit dari decode terakhir
+    assert transcriber.finish() == [("final", "Apa kabar?")]
+    assert transcriber.committed == []
+    assert transcriber.buffer_offset == 0.0
+
+
+def test_long_window_is_trimmed_at_last_committed_word():
+    words = [(i * 0.5, i * 0.5 + 0.5, f" kata{i}") for i in range(8)]
+    asr = ScriptedASR([words[:4], words[:6], words[:8]])
+    transcriber = StreamingTranscriber(asr, SR, trim_s=2.5)
+    for _ in range(3):
+        transcriber.insert_audio(_second())
+        transcriber.process()
+
+    # Tanpa akhir kalimat, jendela > trim_s dipotong di akhir kata terakhir yang pasti
+    assert transcriber.committed[-1][1] == 3.0
+    assert transcriber.buffer_offset == 3.0
+    assert len(transcriber.buffer) == 0
+    assert transcriber._prompt().endswith("kata5")
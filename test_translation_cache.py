@@ -0,0 +1,101 @@
+import time
+
+import pytest
+
+from translation_cache import TranslationCache, make_cache_key, normalize_text
+
+
+def test_normalize_text():
+    assert normalize_text("  Halo,   Dunia!  ") == "halo, dunia"
+    assert normalize_text("Apa kabar?") == normalize_text("apa kabar")
+    assert normalize_text("\tSatu\n dua ") == "satu dua"
+
+
+def test_cache_key_is_stable():
+    key = make_cache_key("Selamat pagi.", "en", "llama3", "konteks")
+    # Key harus sama antar proses (dipakai sebagai primary key SQLite)
+    assert key == make_cache_key("  selamat   PAGI ", "en", "llama3", "konteks")
+    assert len(key) == 64
+    assert key == make_cache_key("Selamat pagi.", "en", "llama3", "konteks")
+
+
+@pytest.mark.parametrize("changed", [
+    ("Selamat malam", "en", "llama3", "konteks"),
+    ("Selamat pagi", "ja", "llama3", "konteks"),
+    ("Selamat pagi", "en", "qwen2", "konteks"),
+    ("Selamat pagi", "en", "llama3", "konteks lain"),
+])
+def test_cache_key_depends_on_every_field(changed):
+    assert make_cache_key("Selamat pagi", "en", "llama3", "konteks") != make_cache_key(*changed)
+
+
+def test_memory_lru():
+    cache = TranslationCache(max_entries=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"  # a jadi paling baru dipakai
+    cache.put("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["memory_entries"] == 2
+    assert stats["memory_hits"] == 3 and stats["misses"] == 1
+
+
+def test_expired_entries(monkeypatch):
+    cache = TranslationCache(max_age_s=10)
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache.put("k", "v")
+    now[0] += 5
+    assert cache.get("k") == "v"
+    now[0] += 10
+    assert cache.get("k") is None
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite3")
+    cache = TranslationCache(max_entries=1, db_path=db_path)
+    cache.put("a", "A")
+    cache.put("b", "B")  # a tergusur dari memori, tetap ada di disk
+    assert cache.get("a") == "A"
+    assert cache.stats()["disk_hits"] == 1
+    cache.close()
+
+    reopened = TranslationCache(db_path=db_path)
+    assert reopened.get("b") == "B"
+    assert reopened.get("a") == "A"
+    reopened.close()
+
+
+def test_disk_pruning(tmp_path):
+    cache = TranslationCache(max_entries=1, db_path=str(tmp_path / "cache.sqlite3"),
+                             max_disk_entries=3, prune_every=1)
+    for i in range(6):
+        cache.put(str(i), f"t{i}")
+        time.sleep(0.001)  # last_used berbeda untuk tiap entri
+    assert cache.get("0") is None
+    assert cache.get("4") == "t4"
+    count = cache._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+    assert count == 3
+    cache.close()
+
+
+def test_cache_context_is_bounded():
+    pytest.importorskip("ollama")
+    from context_aware_translator import ContextAwareTranslator, ContextTurn
+
+    translator = ContextAwareTranslator(backend=object())
+    translator.context_history = [
+        ContextTurn(f"kalimat nomor {i} yang cukup panjang", "en", f"sentence {i}", 10)
+        for i in range(5)
+    ]
+    text = "ini kalimat baru yang panjang"
+    context = translator.cache_context(text)
+    # Hanya giliran terakhir yang ikut key, sehingga riwayat lama tidak memecah cache
+    assert context == "kalimat nomor 4 yang cukup panjang"
+    translator.context_history.insert(0, ContextTurn("giliran lama", "en", "old turn", 3))
+    assert translator.cache_context(text) == context
+    assert translator.cache_context("Terima kasih") == ""
@@ -0,0 +1,111 @@
+import os
+import threading
+
+import numpy as np
+
+from tts_cache import WaveformCache, file_hash, make_waveform_key
+
+
+def _wave(n, value):
+    return np.full(n, value, dtype=np.float32)
+
+
+def test_waveform_key():
+    key = make_waveform_key("Halo  dunia", "id", "abc")
+    assert key == make_waveform_key(" Halo dunia ", "id", "abc")
+    assert key != make_waveform_key("Halo dunia", "en", "abc")
+    assert key != make_waveform_key("Halo dunia", "id", "def")
+    assert make_waveform_key("x", "id", None) == make_waveform_key("x", "id", "")
+
+
+def test_file_hash(tmp_path):
+    path = tmp_path / "ref.wav"
+    path.write_bytes(b"RIFF" * 50000)
+    first = file_hash(str(path))
+    assert first == file_hash(str(path))
+    path.write_bytes(b"RIFF" * 50001)
+    assert file_hash(str(path)) != first
+
+
+def test_round_trip_as_int16():
+    cache = WaveformCache()
+    audio = np.linspace(-1.0, 1.0, 1000, dtype=np.float32)
+    cache.put("k", audio)
+    restored = cache.get("k")
+    assert restored.dtype == np.float32
+    assert np.max(np.abs(restored - audio)) <= 1.0 / 32767
+    assert cache.get("lain") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["bytes"]) == (1, 1, 2000)
+
+
+def test_lru_eviction_by_bytes():
+    cache = WaveformCache(max_bytes=3000)  # muat satu setengah waveform 1000 sampel
+    cache.put("a", _wave(1000, 0.1))
+    cache.put("b", _wave(500, 0.2))
+    cache.get("a")  # a jadi paling baru dipakai
+    cache.put("c", _wave(500, 0.3))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] <= 3000
+
+
+def test_oversized_waveform_is_not_cached():
+    cache = WaveformCache(max_bytes=1000)
+    cache.put("besar", _wave(1000, 0.5))
+    assert cache.get("besar") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_spill_to_disk_and_reload(tmp_path):
+    cache = WaveformCache(max_bytes=2000, spill_dir=str(tmp_path))
+    cache.put("a", _wave(1000, 0.25))
+    cache.put("b", _wave(1000, 0.5))  # menggusur a ke disk
+    assert os.path.exists(tmp_path / "a.npy")
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+    restored = cache.get("a")
+    np.testing.assert_allclose(restored, 0.25, atol=1e-4)
+    assert cache.stats()["disk_hits"] == 1
+
+    # Direktori spill tetap terpakai setelah restart
+    reopened = WaveformCache(max_bytes=2000, spill_dir=str(tmp_path))
+    np.testing.assert_allclose(reopened.get("a"), 0.25, atol=1e-4)
+
+
+def test_spill_directory_is_bounded(tmp_path):
+    cache = WaveformCache(max_bytes=2000, spill_dir=str(tmp_path), max_spill_bytes=10000)
+    for i in range(30):
+        cache.put(str(i), _wave(1000, i / 100))
+    total = sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
+    assert total <= 10000
+    assert cache.get("0") is None
+    assert cache.get("28") is not None
+
+
+def test_concurrent_access(tmp_path):
+    cache = WaveformCache(max_bytes=8000, spill_dir=str(tmp_path), max_spill_bytes=40000)
+    errors = []
+
+    def worker(worker_id):
+        try:
+            for i in range(200):
+                key = f"{worker_id}-{i % 20}"
+                cached = cache.get(key)
+                if cached is None:
+                    cache.put(key, _wave(700, worker_id / 10))
+                else:
+                    assert np.allclose(cached, worker_id / 10, atol=1e-4)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert cache.stats()["bytes"] <= 8000
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("webrtcvad")
+
+from vad_segmenter import UtteranceSegmenter  # noqa: E402
+
+SR = 16000
+FRAME = 480  # 30 ms
+
+
+@pytest.fixture(autouse=True)
+def energy_vad(monkeypatch):
+    # Klasifikasi berbasis energi agar hasil deterministik untuk sinyal uji
+    monkeypatch.setattr(
+        UtteranceSegmenter, "is_speech", lambda self, frame: float(np.max(np.abs(frame))) > 0.05
+    )
+
+
+def _speech(frames):
+    t = np.arange(frames * FRAME) / SR
+    return (0.3 * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+
+
+def _silence(frames):
+    return np.zeros(frames * FRAME, dtype=np.float32)
+
+
+def _push_chunks(segmenter, audio, chunk):
+    results = []
+    for start in range(0, len(audio), chunk):
+        results.extend(segmenter.push(audio[start:start + chunk]))
+    return results
+
+
+def test_silence_produces_nothing():
+    segmenter = UtteranceSegmenter(SR)
+    assert segmenter.push(_silence(100)) == []
+    assert segmenter.flush() is None
+
+
+def test_preroll_and_hangover():
+    # preroll 10 frame, trigger setelah 6 frame bicara, hangover 15 frame
+    segmenter = UtteranceSegmenter(SR, preroll_ms=300, hangover_ms=450)
+    speech = _speech(40)
+    audio = np.concatenate([_silence(20), speech, _silence(30)])
+    utterances = segmenter.push(audio)
+
+    assert len(utterances) == 1
+    utterance = utterances[0]
+    # 4 frame hening pre-roll + 40 frame bicara + 15 frame hangover
+    assert len(utterance) == (4 + 40 + 15) * FRAME
+    assert not np.any(utterance[:4 * FRAME])
+    np.testing.assert_array_equal(utterance[4 * FRAME:44 * FRAME], speech)
+    assert not np.any(utterance[44 * FRAME:])
+    assert not segmenter.triggered
+
+
+def test_chunk_boundaries_do_not_matter():
+    audio = np.concatenate([_silence(12), _speech(25), _silence(20), _speech(30), _silence(20)])
+    whole = UtteranceSegmenter(SR).push(audio)
+    chunked = _push_chunks(UtteranceSegmenter(SR), audio, 777)
+    assert len(whole) == len(chunked) == 2
+    for a, b in zip(whole, chunked):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_short_blip_is_dropped():
+    segmenter = UtteranceSegmenter(SR, min_speech_ms=300)
+    audio = np.concatenate([_silence(10), _speech(7), _silence(30)])
+    assert segmenter.push(audio) == []
+
+
+def test_max_utterance_splits():
+    segmenter = UtteranceSegmenter(SR, max_utterance_s=0.9)  # 30 frame
+    utterances = segmenter.push(np.concatenate([_silence(10), _speech(80)]))
+    assert len(utterances) == 2
+    assert all(len(u) == 30 * FRAME for u in utterances)
+    assert segmenter.triggered
+
+
+def test_flush_returns_running_utterance():
+    segmenter = UtteranceSegmenter(SR)
+    assert segmenter.push(np.concatenate([_silence(10), _speech(20)])) == []
+    utterance = segmenter.flush()
+    assert len(utterance) == (4 + 20) * FRAME
+    assert not segmenter.triggered
+    assert segmenter.flush() is None
+
+
+def test_streaming_pieces_match_batch():
+    audio = np.concatenate([_silence(10), _speech(40), _silence(30)])
+    batch = UtteranceSegmenter(SR).push(audio)[0]
+
+    pieces = _push_chunks(UtteranceSegmenter(SR, streaming=True), audio, 960)
+    assert len(pieces) > 2
+    assert [final for _, final in pieces].count(True) == 1
+    assert pieces[-1][1] is True
+    np.testing.assert_array_equal(np.concatenate([piece for piece, _ in pieces]), batch)
+
+
+def test_streaming_flush_marks_end_with_empty_piece():
+    segmenter = UtteranceSegmenter(SR, streaming=True)
+    pieces = segmenter.push(np.concatenate([_silence(10), _speech(20)]))
+    assert pieces and all(not final for _, final in pieces)
+
+    # Semua audio sudah dikembalikan push(): flush tetap memberi penanda akhir
+    piece, final = segmenter.flush()
+    assert final is True
+    assert len(piece) == 0
+    assert segmenter.flush() is None
+
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        UtteranceSegmenter(44100)
+    with pytest.raises(ValueError):
+        UtteranceSegmenter(SR, frame_ms=25)
@@ -0,0 +1,213 @@
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+
+import httpx
+import ollama
+
+
+def estimate_tokens(text):
+    """Perkiraan kasar jumlah token: ~4 karakter ASCII per token, 1 token per karakter lain
+
+    Sengaja sedikit berlebih untuk teks non-Latin (CJK, aksara lain) agar
+    anggaran konteks tidak melewati jendela konteks model.
+    """
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars) + 4  # + overhead per pesan
+
+
+class TranslationBackend:
+    """Antarmuka backend LLM yang dipakai ContextAwareTranslator
+
+    chat() menerima daftar pesan chat dan mengembalikan teks jawaban lengkap,
+    atau iterator potongan teks jika stream=True. `model=None` berarti model
+    default backend. Jika `usage` (dict) diberikan, backend mengisinya setelah
+    jawaban selesai dengan statistik yang tersedia: `prompt_eval_count`
+    (token prompt yang benar-benar dievaluasi, tanpa prefix yang diambil dari
+    cache), `prompt_eval_s` dan `eval_count`.
+    """
+    model = None
+
+    def chat(self, messages, model=None, stream=False, usage=None):
+        raise NotImplementedError
+
+    def count_tokens(self, text):
+        """Jumlah token `text` menurut tokenizer backend (default: perkiraan)"""
+        return estimate_tokens(text)
+
+    def warm_up(self):
+        """Siapkan backend sebelum request pertama (opsional)"""
+
+    def close(self):
+        """Lepaskan koneksi/sumber daya backend (opsional)"""
+
+
+class OllamaBackend(TranslationBackend):
+    """Backend Ollama dengan satu client HTTP persisten untuk semua sesi
+
+    Client httpx di dalam ollama.Client menyimpan pool koneksi keep-alive
+    sehingga setiap terjemahan tidak membuka koneksi TCP baru. Jumlah request
+    bersamaan dibatasi `max_concurrency`; `keep_alive` diteruskan ke Ollama
+    agar model tetap dimuat di memori di antara ucapan. Selama model tetap
+    dimuat, Ollama memakai ulang KV cache untuk prefix pesan yang sama
+    dengan request sebelumnya; prompt_eval_count di `usage` hanya menghitung
+    sisanya.
+
+    Jawaban streaming dibaca sampai habis oleh thread terpisah ke antrian
+    lokal; slot konkurensi dilepas begitu Ollama selesai, bukan saat
+    pemanggil selesai memproses token. Sesi yang tertahan backpressure TTS
+    karena itu tidak menahan slot LLM milik sesi lain.
+    """
+    def __init__(self, model="llama2", host=None, timeout=60.0, connect_timeout=5.0,
+                 keep_alive="30m", max_concurrency=2, options=None):
+        self.model = model
+        self.keep_alive = keep_alive
+        self.options = options
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.client = ollama.Client(
+            host=host,
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+        )
+
+    def chat(self, messages, model=None, stream=False, usage=None):
+        if stream:
+            return self._chat_stream(messages, model or self.model, usage)
+        with self.slots:
+            response = self.client.chat(
+                model=model or self.model, messages=messages,
+                keep_alive=self.keep_alive, options=self.options,
+            )
+        self._fill_usage(usage, response)
+        return response['message']['content']
+
+    def _chat_stream(self, messages, model, usage):
+        tokens = queue.Queue()
+        reader = threading.Thread(
+            target=self._read_stream, args=(messages, model, usage, tokens),
+            name="ollama-stream", daemon=True,
+        )
+        reader.start()
+        while True:
+            item = tokens.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def _read_stream(self, messages, model, usage, tokens):
+        """Thread pembaca: kuras stream HTTP ke `tokens`, diakhiri None atau exception"""
+        try:
+            with self.slots:
+                for chunk in self.client.chat(
+                    model=model, messages=messages, stream=True,
+                    keep_alive=self.keep_alive, options=self.options,
+                ):
+                    # Statistik token hanya ada di chunk terakhir (done=True)
+                    if chunk.get('done'):
+                        self._fill_usage(usage, chunk)
+                    tokens.put(chunk['message']['content'])
+        except Exception as e:
+            tokens.put(e)
+            return
+        tokens.put(None)
+
+    @staticmethod
+    def _fill_usage(usage, response):
+        if usage is None:
+            return
+        if response.get('prompt_eval_count') is not None:
+            usage['prompt_eval_count'] = response['prompt_eval_count']
+        if response.get('prompt_eval_duration') is not None:
+            usage['prompt_eval_s'] = response['prompt_eval_duration'] / 1e9
+        if response.get('eval_count') is not None:
+            usage['eval_count'] = response['eval_count']
+
+    def warm_up(self):
+        """Muat model di Ollama dengan prompt kosong agar ucapan pertama tidak menanggung load"""
+        start = time.perf_counter()
+        try:
+            self.client.generate(model=self.model, prompt="", keep_alive=self.keep_alive)
+            print(f"Model Ollama {self.model} siap ({time.perf_counter() - start:.1f} detik)")
+        except Exception as e:
+            print(f"Warm-up Ollama gagal: {e}")
+
+    def close(self):
+        # ollama.Client tidak punya close() publik; tutup pool httpx-nya jika ada
+        http_client = getattr(self.client, '_client', None)
+        if http_client is not None:
+            http_client.close()
+
+
+class StubBackend(TranslationBackend):
+    """Backend lokal deterministik untuk load test dan CI tanpa Ollama
+
+    "Terjemahan" berupa teks sumber dengan penanda bahasa tujuan, misalnya
+    "[en] selamat pagi". Latensi disimulasikan dengan `latency_s` sebelum
+    token pertama dan `token_latency_s` per kata berikutnya.
+
+    Evaluasi prompt juga disimulasikan: backend mengingat `cache_slots`
+    prompt terakhir (beserta jawabannya) seperti KV cache Ollama, dan hanya
+    token setelah prefix bersama terpanjang yang dihitung sebagai
+    prompt_eval_count, masing-masing menunggu `prompt_token_latency_s`.
+    """
+    _PROMPT_TEXT = re.compile(r'ke (\S+): "(.*)"', re.DOTALL)
+
+    def __init__(self, model="stub", latency_s=0.0, token_latency_s=0.0,
+                 prompt_token_latency_s=0.0, cache_slots=4):
+        self.model = model
+        self.latency_s = latency_s
+        self.token_latency_s = token_latency_s
+        self.prompt_token_latency_s = prompt_token_latency_s
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._cached_prompts = deque(maxlen=cache_slots)
+
+    @staticmethod
+    def _render(messages):
+        return "".join(f"<{m['role']}>{m['content']}\n" for m in messages)
+
+    def _evaluate_prompt(self, messages, text, usage):
+        """Hitung token prompt di luar prefix yang ter-cache, simpan prompt + jawaban"""
+        prompt = self._render(messages)
+        with self._lock:
+            self.requests += 1
+            cached = max(
+                (len(os.path.commonprefix([prompt, c])) for c in self._cached_prompts), default=0
+            )
+            self._cached_prompts.append(prompt + self._render([{'role': 'assistant', 'content': text}]))
+        evaluated = self.count_tokens(prompt[cached:]) if cached < len(prompt) else 0
+        if usage is not None:
+            usage['prompt_eval_count'] = evaluated
+            usage['prompt_eval_s'] = evaluated * self.prompt_token_latency_s
+            usage['eval_count'] = len(text.split())
+        return evaluated * self.prompt_token_latency_s
+
+    def _translate(self, messages):
+        content = messages[-1]['content']
+        match = self._PROMPT_TEXT.search(content)
+        if match is None:
+            return content.strip()
+        return f"[{match.group(1)}] {match.group(2)}"
+
+    def chat(self, messages, model=None, stream=False, usage=None):
+        text = self._translate(messages)
+        prompt_s = self._evaluate_prompt(messages, text, usage)
+        if stream:
+            return self._chat_stream(text, prompt_s)
+        time.sleep(prompt_s + self.latency_s + self.token_latency_s * len(text.split()))
+        return text
+
+    def _chat_stream(self, text, prompt_s):
+        time.sleep(prompt_s + self.latency_s)
+        for i, word in enumerate(text.split(" ")):
+            if i:
+                time.sleep(self.token_latency_s)
+            yield word if i == 0 else " " + word
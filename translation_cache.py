@@ -0,0 +1,135 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """Normalisasi teks sumber agar variasi kecil menghasilkan key yang sama"""
+    text = _WHITESPACE.sub(" ", text.strip().lower())
+    return text.strip(" .,!?;:\"'")
+
+
+def make_cache_key(text, target_lang, model_name, context):
+    """Key cache dari teks ternormalisasi, bahasa tujuan, model dan hash konteks"""
+    context_hash = hashlib.sha1(context.encode("utf-8")).hexdigest()
+    raw = "\x1f".join([normalize_text(text), target_lang, model_name, context_hash])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """Cache terjemahan dua tingkat: LRU di memori dan SQLite di disk
+
+    Tingkat memori dibatasi `max_entries`, tingkat disk dibatasi
+    `max_disk_entries`; entri yang lebih tua dari `max_age_s` dianggap
+    kadaluarsa di kedua tingkat. Hit dari disk dipromosikan ke memori.
+    Dengan `db_path=None` hanya tingkat memori yang dipakai.
+    """
+    def __init__(self, max_entries=2048, max_age_s=7 * 24 * 3600, db_path=None,
+                 max_disk_entries=100000, prune_every=256):
+        self.max_entries = max_entries
+        self.max_age_s = max_age_s
+        self.max_disk_entries = max_disk_entries
+        self.prune_every = prune_every
+        self._memory = OrderedDict()  # key -> (translation, created)
+        self._lock = threading.Lock()
+        self._puts_since_prune = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "key TEXT PRIMARY KEY, translation TEXT NOT NULL, "
+                "created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS translations_last_used ON translations(last_used)"
+            )
+            self._db.commit()
+
+    def get(self, key):
+        """Ambil terjemahan dari cache, None jika tidak ada atau kadaluarsa"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[1] <= self.max_age_s:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[0]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT translation, created FROM translations WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] <= self.max_age_s:
+                    self._db.execute(
+                        "UPDATE translations SET last_used = ? WHERE key = ?", (now, key)
+                    )
+                    self._db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key, translation):
+        now = time.time()
+        with self._lock:
+            self._remember(key, translation, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO translations (key, translation, created, last_used) "
+                    "VALUES (?, ?, ?, ?)", (key, translation, now, now)
+                )
+                self._puts_since_prune += 1
+                if self._puts_since_prune >= self.prune_every:
+                    self._prune_disk(now)
+                self._db.commit()
+
+    def _remember(self, key, translation, created):
+        self._memory[key] = (translation, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _prune_disk(self, now):
+        """Hapus entri kadaluarsa dan entri paling lama tidak dipakai di disk"""
+        self._puts_since_prune = 0
+        self._db.execute("DELETE FROM translations WHERE created < ?", (now - self.max_age_s,))
+        self._db.execute(
+            "DELETE FROM translations WHERE key IN ("
+            "SELECT key FROM translations ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        )
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
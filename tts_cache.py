@@ -0,0 +1,183 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def make_waveform_key(text, language, speaker_hash):
+    """Key cache dari teks, bahasa dan hash referensi speaker"""
+    raw = "\x1f".join([" ".join(text.split()), language, speaker_hash or ""])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def file_hash(path):
+    """Hash isi file (misalnya WAV referensi speaker)"""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(65536), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class WaveformCache:
+    """LRU waveform hasil TTS dalam int16, dibatasi jumlah byte
+
+    Waveform disimpan sebagai int16 (separuh ukuran float32). Jika
+    `spill_dir` diisi, entri yang tergusur dari memori ditulis ke disk
+    sebagai .npy dan tetap bisa dipakai, termasuk setelah server restart;
+    isi direktori dibatasi `max_spill_bytes` dengan membuang file tertua.
+
+    I/O disk tidak pernah dilakukan sambil memegang lock cache: korban
+    eviction dipilih di bawah lock lalu ditulis sesudahnya (file sementara
+    lalu os.replace), dan selama ditulis tetap bisa dibaca dari memori.
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024, spill_dir=None,
+                 max_spill_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.max_spill_bytes = max_spill_bytes
+        self._entries = OrderedDict()  # key -> waveform int16
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._spilling = {}  # key -> waveform yang sedang ditulis ke disk
+        self._spill_lock = threading.Lock()  # Melindungi _spill_bytes dan pruning
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._spill_bytes = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._spill_bytes = sum(
+                entry.stat().st_size for entry in os.scandir(spill_dir)
+                if entry.name.endswith(".npy")
+            )
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, key + ".npy")
+
+    def get(self, key):
+        """Ambil waveform float32, None jika tidak ada di memori maupun disk"""
+        with self._lock:
+            pcm = self._entries.get(key)
+            if pcm is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pcm.astype(np.float32) / 32767.0
+            pcm = self._spilling.get(key)
+            if pcm is not None:
+                self.hits += 1
+                return pcm.astype(np.float32) / 32767.0
+            if not self.spill_dir:
+                self.misses += 1
+                return None
+
+        # Baca dari disk tanpa memegang lock
+        path = self._spill_path(key)
+        try:
+            pcm = np.load(path)
+            os.utime(path)
+        except (OSError, ValueError):
+            pcm = None
+        with self._lock:
+            if pcm is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            evicted = self._insert(key, pcm)
+        self._spill_all(evicted)
+        return pcm.astype(np.float32) / 32767.0
+
+    def put(self, key, audio):
+        """Simpan waveform float32 [-1, 1] sebagai int16"""
+        pcm = (np.clip(np.asarray(audio, dtype=np.float32), -1.0, 1.0) * 32767.0).astype(np.int16)
+        if pcm.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            evicted = self._insert(key, pcm)
+        self._spill_all(evicted)
+
+    def _insert(self, key, pcm):
+        """Masukkan entri (dipanggil di bawah lock), return list (key, pcm) yang perlu di-spill"""
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        self._entries[key] = pcm
+        self._bytes += pcm.nbytes
+
+        evicted = []
+        while self._bytes > self.max_bytes:
+            evicted_key, evicted_pcm = self._entries.popitem(last=False)
+            self._bytes -= evicted_pcm.nbytes
+            self.evictions += 1
+            if self.spill_dir:
+                self._spilling[evicted_key] = evicted_pcm
+                evicted.append((evicted_key, evicted_pcm))
+        return evicted
+
+    def _spill_all(self, evicted):
+        """Tulis korban eviction ke disk (tanpa lock cache)"""
+        for key, pcm in evicted:
+            try:
+                self._spill(key, pcm)
+            finally:
+                with self._lock:
+                    if self._spilling.get(key) is pcm:
+                        del self._spilling[key]
+
+    def _spill(self, key, pcm):
+        path = self._spill_path(key)
+        if os.path.exists(path):
+            return
+        # Tulis ke file sementara (bukan .npy) lalu rename atomik agar pembaca
+        # tidak pernah melihat file setengah jadi
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, pcm)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Gagal menulis cache TTS ke disk: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        with self._spill_lock:
+            self._spill_bytes += size
+            if self._spill_bytes > self.max_spill_bytes:
+                self._prune_spill()
+
+    def _prune_spill(self):
+        """Buang file spill tertua sampai di bawah batas (dipanggil di bawah _spill_lock)"""
+        files = sorted(
+            (entry for entry in os.scandir(self.spill_dir) if entry.name.endswith(".npy")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in files:
+            if self._spill_bytes <= self.max_spill_bytes:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+                self._spill_bytes -= size
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
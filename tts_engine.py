@@ -0,0 +1,115 @@
+import numpy as np
+
+XTTS_MODEL = "tts_models/multilingual/multi-dataset/xtts_v2"
+FALLBACK_MODEL = "tts_models/multilingual/multi-dataset/your_tts"
+
+
+class TTSEngine:
+    """Satu model Coqui TTS yang sudah dimuat, beserta registry suaranya
+
+    Model XTTS dimuat lewat Synthesizer tanpa vocoder terpisah (XTTS punya
+    decoder sendiri) dan memakai SpeakerRegistry untuk conditioning latents
+    per suara. Model lain dimuat lewat TTS.api dan mengkloning suara dari
+    WAV referensi setiap kali sintesis. Jika XTTS gagal dimuat, engine jatuh
+    ke `FALLBACK_MODEL`.
+
+    Engine tidak thread-safe; pemanggil harus membatasi sintesis paralel.
+    """
+    def __init__(self, model_name=XTTS_MODEL, reference_speaker=None,
+                 speaker_cache_dir="speaker_cache", use_cuda=None):
+        self.model_name = model_name
+        self.reference_speaker = reference_speaker
+        self.speaker_cache_dir = speaker_cache_dir
+        self.use_cuda = use_cuda
+        self.synthesizer = None
+        self.tts_model = None
+        self.speakers = None
+        self.default_voice = None
+        self.sample_rate = 22050
+
+    def load(self):
+        """Muat model (import TTS baru terjadi di sini), return self"""
+        import torch
+        use_cuda = torch.cuda.is_available() if self.use_cuda is None else self.use_cuda
+        if self.model_name == XTTS_MODEL:
+            try:
+                self._load_xtts(use_cuda)
+                return self
+            except Exception as e:
+                print(f"Error inisialisasi XTTS: {e}")
+                self.synthesizer = None
+                self.model_name = FALLBACK_MODEL
+
+        from TTS.api import TTS
+        self.tts_model = TTS(model_name=self.model_name, progress_bar=False, gpu=use_cuda)
+        self.sample_rate = self.tts_model.synthesizer.output_sample_rate
+        return self
+
+    def _load_xtts(self, use_cuda):
+        from TTS.utils.manage import ModelManager
+        from TTS.utils.synthesizer import Synthesizer
+
+        model_path, config_path, _ = ModelManager().download_model(XTTS_MODEL)
+        self.synthesizer = Synthesizer(
+            tts_checkpoint=model_path,
+            tts_config_path=config_path,
+            tts_speakers_file=None,
+            tts_languages_file=None,
+            vocoder_checkpoint=None,
+            vocoder_config=None,
+            encoder_checkpoint=None,
+            encoder_config=None,
+            use_cuda=use_cuda,
+        )
+        self.sample_rate = self.synthesizer.output_sample_rate
+        self._setup_speaker_registry()
+
+    def _setup_speaker_registry(self):
+        """Hitung conditioning latents XTTS untuk suara default sekali saja"""
+        xtts = getattr(self.synthesizer, 'tts_model', None)
+        if self.reference_speaker is None or not hasattr(xtts, 'get_conditioning_latents'):
+            return
+        try:
+            from speaker_registry import SpeakerRegistry
+            self.speakers = SpeakerRegistry(xtts, self.speaker_cache_dir)
+            self.default_voice = self.speakers.register(self.reference_speaker)
+        except Exception as e:
+            print(f"Error menyiapkan speaker registry: {e}")
+            self.speakers = None
+            self.default_voice = None
+
+    def register_voice(self, audio, sample_rate):
+        """Daftarkan suara dari rekaman float32, return voice id atau None jika tidak didukung"""
+        if self.speakers is None:
+            return None
+        return self.speakers.register_audio(audio, sample_rate)
+
+    def synthesize(self, text, language, voice_id=None):
+        """Sintesis teks, return waveform float32 pada `sample_rate`"""
+        language = language.split("_")[0]
+        voice_id = voice_id or self.default_voice
+        if self.speakers is not None and voice_id is not None:
+            # Latents suara sudah di-cache, tanpa ekstraksi ulang dari WAV
+            return self.speakers.synthesize(text, language, voice_id)
+
+        if self.synthesizer is not None:
+            wav = self.synthesizer.tts(
+                text=text,
+                speaker_name="default",
+                language=language,
+                speaker_wav=self.reference_speaker
+            )
+            return np.array(wav, dtype=np.float32)
+
+        wav = self.tts_model.tts(
+            text=text,
+            speaker_wav=self.reference_speaker,
+            language=language
+        )
+        return np.array(wav, dtype=np.float32)
+
+    def close(self):
+        """Lepas referensi model agar memorinya bisa dibebaskan"""
+        self.synthesizer = None
+        self.tts_model = None
+        self.speakers = None
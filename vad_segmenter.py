@@ -0,0 +1,189 @@
+import numpy as np
+import webrtcvad
+
+
+class UtteranceSegmenter:
+    """Segmenter VAD streaming yang mengeluarkan ucapan utuh
+
+    Audio yang masuk dipotong menjadi frame 10/20/30 ms sesuai kebutuhan
+    webrtcvad. Sisa sampel yang belum genap satu frame disimpan untuk chunk
+    berikutnya, sehingga batas chunk jaringan tidak mempengaruhi hasil.
+    Sebelum ucapan terdeteksi, frame terakhir disimpan di ring buffer
+    pre-roll agar awal kata tidak terpotong. Ucapan dianggap selesai setelah
+    hening selama `hangover_ms`, atau dipotong paksa saat mencapai
+    `max_utterance_s`.
+
+    Dengan `streaming=True`, push() tidak menunggu ucapan selesai tetapi
+    mengembalikan potongan audio ucapan yang sedang berjalan sebagai tuple
+    (audio, is_final). Potongan terakhir sebuah ucapan bertanda is_final=True.
+    """
+    def __init__(self, sample_rate=16000, frame_ms=30, vad_aggressiveness=2,
+                 preroll_ms=300, hangover_ms=450, trigger_ratio=0.6,
+                 min_speech_ms=200, max_utterance_s=15.0, streaming=False):
+        if sample_rate not in (8000, 16000, 32000, 48000):
+            raise ValueError(f"Sample rate tidak didukung webrtcvad: {sample_rate}")
+        if frame_ms not in (10, 20, 30):
+            raise ValueError(f"Panjang frame VAD harus 10, 20 atau 30 ms: {frame_ms}")
+
+        self.sample_rate = sample_rate
+        self.streaming = streaming
+        self.frame_len = sample_rate * frame_ms // 1000
+        self.vad = webrtcvad.Vad(vad_aggressiveness)
+
+        self.preroll_frames = max(1, preroll_ms // frame_ms)
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.trigger_count = max(1, int(round(trigger_ratio * self.preroll_frames)))
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.max_frames = max(self.preroll_frames + 1, int(max_utterance_s * 1000) // frame_ms)
+
+        # Semua buffer dialokasikan sekali di awal
+        self._pending = np.zeros(self.frame_len, dtype=np.float32)
+        self._pending_len = 0
+        self._pcm = np.zeros(self.frame_len, dtype=np.int16)
+        self._scaled = np.zeros(self.frame_len, dtype=np.float32)
+
+        self._preroll = np.zeros((self.preroll_frames, self.frame_len), dtype=np.float32)
+        self._preroll_voiced = np.zeros(self.preroll_frames, dtype=bool)
+        self._preroll_pos = 0
+
+        self._utterance = np.zeros(self.max_frames * self.frame_len, dtype=np.float32)
+        self._utt_frames = 0
+
+        self.reset()
+
+    def reset(self):
+        """Buang semua state, misalnya saat koneksi baru"""
+        self._pending_len = 0
+        self._preroll_voiced[:] = False
+        self._preroll_pos = 0
+        self._preroll_count = 0
+        self._utt_frames = 0
+        self._stream_frames = 0
+        self._speech_frames = 0
+        self._silence_run = 0
+        self.triggered = False
+
+    def is_speech(self, frame):
+        """Klasifikasi satu frame float32 dengan webrtcvad"""
+        np.multiply(frame, 32767.0, out=self._scaled)
+        np.clip(self._scaled, -32768.0, 32767.0, out=self._scaled)
+        np.copyto(self._pcm, self._scaled, casting="unsafe")
+        return self.vad.is_speech(self._pcm.tobytes(), self.sample_rate)
+
+    def push(self, audio):
+        """Masukkan chunk audio, return list ucapan yang selesai (bisa kosong)
+
+        Dalam mode streaming, isinya tuple (audio, is_final) berupa potongan
+        ucapan yang sedang berjalan.
+        """
+        utterances = []
+        audio = np.asarray(audio, dtype=np.float32)
+        pos = 0
+        total = len(audio)
+
+        # Lengkapi frame yang tertunda dari chunk sebelumnya
+        if self._pending_len:
+            take = min(self.frame_len - self._pending_len, total)
+            self._pending[self._pending_len:self._pending_len + take] = audio[:take]
+            self._pending_len += take
+            pos = take
+            if self._pending_len < self.frame_len:
+                return utterances
+            self._pending_len = 0
+            self._process_frame(self._pending, utterances)
+
+        while pos + self.frame_len <= total:
+            self._process_frame(audio[pos:pos + self.frame_len], utterances)
+            pos += self.frame_len
+
+        remainder = total - pos
+        if remainder:
+            self._pending[:remainder] = audio[pos:]
+            self._pending_len = remainder
+
+        if self.streaming and self.triggered and self._speech_frames >= self.min_speech_frames:
+            piece = self._take_stream_piece()
+            if len(piece):
+                utterances.append((piece, False))
+
+        return utterances
+
+    def flush(self):
+        """Keluarkan ucapan yang sedang berjalan, misalnya saat client putus
+
+        Di mode streaming potongan final bisa kosong jika semua audio sudah
+        dikembalikan push(); tuple (array kosong, True) tetap dikembalikan
+        sebagai penanda akhir ucapan bagi decoder streaming.
+        """
+        utterance = None
+        if self.triggered and self._speech_frames >= self.min_speech_frames:
+            if self.streaming:
+                utterance = (self._take_stream_piece(), True)
+            else:
+                utterance = self._utterance[:self._utt_frames * self.frame_len].copy()
+        self.reset()
+        return utterance
+
+    def _take_stream_piece(self):
+        """Ambil frame ucapan yang belum pernah dikembalikan di mode streaming"""
+        piece = self._utterance[self._stream_frames * self.frame_len:
+                                self._utt_frames * self.frame_len].copy()
+        self._stream_frames = self._utt_frames
+        return piece
+
+    def _append_frame(self, frame):
+        start = self._utt_frames * self.frame_len
+        self._utterance[start:start + self.frame_len] = frame
+        self._utt_frames += 1
+
+    def _start_utterance(self):
+        """Pindahkan isi pre-roll (urut kronologis) ke buffer ucapan"""
+        self.triggered = True
+        self._utt_frames = 0
+        self._stream_frames = 0
+        self._speech_frames = int(np.count_nonzero(self._preroll_voiced))
+        self._silence_run = 0
+        count = min(self._preroll_count, self.preroll_frames)
+        for i in range(self.preroll_frames - count, self.preroll_frames):
+            idx = (self._preroll_pos + i) % self.preroll_frames
+            self._append_frame(self._preroll[idx])
+        self._preroll_voiced[:] = False
+        self._preroll_count = 0
+
+    def _emit(self, utterances):
+        if self._speech_frames >= self.min_speech_frames:
+            if self.streaming:
+                utterances.append((self._take_stream_piece(), True))
+            else:
+                utterances.append(self._utterance[:self._utt_frames * self.frame_len].copy())
+        self._utt_frames = 0
+        self._stream_frames = 0
+        self._speech_frames = 0
+        self._silence_run = 0
+
+    def _process_frame(self, frame, utterances):
+        voiced = self.is_speech(frame)
+
+        if not self.triggered:
+            self._preroll[self._preroll_pos] = frame
+            self._preroll_voiced[self._preroll_pos] = voiced
+            self._preroll_pos = (self._preroll_pos + 1) % self.preroll_frames
+            self._preroll_count += 1
+            if np.count_nonzero(self._preroll_voiced) >= self.trigger_count:
+                self._start_utterance()
+            return
+
+        self._append_frame(frame)
+        if voiced:
+            self._speech_frames += 1
+            self._silence_run = 0
+        else:
+            self._silence_run += 1
+
+        if self._silence_run >= self.hangover_frames:
+            # Akhir ucapan: hangover sudah termasuk di buffer sebagai padding
+            self._emit(utterances)
+            self.triggered = False
+        elif self._utt_frames >= self.max_frames:
+            # Potong ucapan yang terlalu panjang, tetap dalam mode bicara
+            self._emit(utterances)
@@ -0,0 +1,63 @@
+import torch
+import whisper
+
+# Mode inferensi Whisper yang bisa dipilih
+ASR_MODES = ("auto", "cpu", "cpu-int8")
+
+_threads_configured = False
+
+
+def configure_torch_threads(intra_op=None, inter_op=None):
+    """Atur jumlah thread intra-op dan inter-op torch
+
+    Pengaturan ini berlaku untuk seluruh proses. Jumlah thread inter-op hanya
+    bisa diatur sekali sebelum ada pekerjaan paralel torch, jadi panggilan
+    berikutnya diabaikan.
+    """
+    global _threads_configured
+    if intra_op:
+        torch.set_num_threads(intra_op)
+    if inter_op and not _threads_configured:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError as e:
+            print(f"Thread inter-op torch tidak bisa diubah lagi: {e}")
+    _threads_configured = True
+
+
+def _to_plain_linear(model):
+    """Ubah whisper.model.Linear menjadi nn.Linear biasa
+
+    Whisper memakai subclass Linear yang hanya meng-cast bobot ke dtype input.
+    quantize_dynamic hanya menukar modul bertipe persis nn.Linear, dan di CPU
+    semua bobot sudah float32, jadi mengganti kelasnya aman.
+    """
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear) and type(module) is not torch.nn.Linear:
+            module.__class__ = torch.nn.Linear
+    return model
+
+
+def load_whisper_model(name, mode="auto"):
+    """Muat model Whisper sesuai mode inferensi
+
+    - "auto": GPU (fp16) jika tersedia, selain itu CPU fp32
+    - "cpu": selalu CPU fp32
+    - "cpu-int8": CPU dengan kuantisasi dinamis int8 untuk semua layer Linear
+      (encoder, decoder dan proyeksi attention); bobot disimpan int8 dan
+      aktivasi dikuantisasi per batch saat inferensi.
+    """
+    if mode not in ASR_MODES:
+        raise ValueError(f"Mode ASR tidak dikenal: {mode} (pilih {', '.join(ASR_MODES)})")
+    device = None if mode == "auto" else "cpu"
+    model = whisper.load_model(name, device=device)
+    if mode == "cpu-int8":
+        model = torch.ao.quantization.quantize_dynamic(
+            _to_plain_linear(model).eval(), {torch.nn.Linear}, dtype=torch.qint8
+        )
+    return model
+
+
+def uses_fp16(model):
+    """fp16 hanya dipakai di GPU; di CPU Whisper akan jatuh ke fp32 sambil memberi peringatan"""
+    return model.device.type == "cuda"